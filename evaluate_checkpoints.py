@@ -0,0 +1,41 @@
+from src.leaderboard import evaluate_checkpoints
+from src.evaluation import EPISODE_TIME
+import argparse
+
+
+def main() -> None:
+    """
+    Entry point into ranking the best genomes of a directory of checkpoints across tracks
+    """
+    parser = argparse.ArgumentParser(description="Evaluate NEAT Driver checkpoints headless and write a leaderboard")
+    parser.add_argument("checkpoint_dir", help="directory holding neat-checkpoint-* files")
+    parser.add_argument("tracks", nargs="+", help="track xml files to evaluate on")
+    parser.add_argument("--output", default="leaderboard.csv", help="path of the csv leaderboard to write")
+    parser.add_argument("--num-best", type=int, default=3, help="number of genomes to evaluate per checkpoint")
+    parser.add_argument("--processes", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--tick-time", type=float, default=1 / 20, help="time between updates in seconds")
+    parser.add_argument("--episode-time", type=float, default=EPISODE_TIME, help="duration of an episode in seconds")
+    parser.add_argument("--images-dir", default="assets/images/", help="directory holding the track images")
+    parser.add_argument("--cache-dir", default="assets/cache/", help="directory to store compiled tracks in")
+    args = parser.parse_args()
+
+    rows = evaluate_checkpoints(
+        args.checkpoint_dir,
+        args.tracks,
+        args.output,
+        args.num_best,
+        args.processes,
+        args.tick_time,
+        args.episode_time,
+        args.images_dir,
+        args.cache_dir
+    )
+
+    for row in rows[:10]:
+        print(f"{row['rank']:>3}. {row['checkpoint']} genome {row['genome_id']}: {row['mean_fitness']:.2f}")
+
+    print(f"Wrote {len(rows)} entries to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,17 @@
 from pyray import *
-from src import Simulation, TexturePack, AiDriver
+from src import Simulation, TexturePack, AiDriver, SensorTable, FastSpeciesSet, StreamingStatisticsReporter
+from src import ArrayCheckpointer, ParallelReproduction
+from src.evaluation import EPISODE_TIME, reward_survivors, run_episode
+from src.frame_stream import FramePublisher, run_viewer
+from src.remote_evaluation import AUTHKEY_ENV, RemoteEvaluator
+from src.fitness_journal import FitnessJournal
+from src.islands import run_islands
+from src.multi_fidelity import MultiFidelityEvaluator
+from src.telemetry import Telemetry
+from src.memory_profiling import AllocationReporter
+import multiprocessing
 import neat
+import secrets
 import sys
 import os
 
@@ -19,8 +30,8 @@ def initialize_window() -> None:
     set_window_state(ConfigFlags.FLAG_WINDOW_RESIZABLE)
     set_target_fps(60)
 
-    # Load all image assets
-    TexturePack.load_all("assets/images/")
+    # Load all image assets, packing the car and obstacle sprites into a single atlas
+    TexturePack.load_all("assets/images/", ("car.png", "box.png"))
 
 
 def terminate_window() -> None:
@@ -31,28 +42,37 @@ def terminate_window() -> None:
     close_window()
 
 
-def load_population_from_config_file(path: str, checkpoint_save_path: str | None) -> neat.Population:
+def load_population_from_config_file(
+    path: str,
+    checkpoint_save_path: str | None,
+    reproduction_type: type = neat.DefaultReproduction
+) -> neat.Population:
     """
     Create a population given the path to the neat configuration file
 
     :param path: path to the neat configuration file
     :param checkpoint_save_path: path to save checkpoints to
+    :param reproduction_type: the reproduction scheme, `ParallelReproduction` creates the offspring of large populations
+        in parallel
     :return: the created population
     """
     # Load the configuration file
-    neat_types = (neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet, neat.DefaultStagnation)
+    neat_types = (neat.DefaultGenome, reproduction_type, FastSpeciesSet, neat.DefaultStagnation)
     config = neat.Config(*neat_types, path)
 
-    # Create the population and add reporters for debugging
+    # Create the population and add reporters for debugging (statistics are stored next to the checkpoints, starting
+    # over for the new run)
+    statistics_path = "assets/statistics" if checkpoint_save_path is None else f"{checkpoint_save_path}/statistics"
     population = neat.Population(config)
     population.add_reporter(neat.StdOutReporter(True))
-    population.add_reporter(neat.StatisticsReporter())
+    population.add_reporter(StreamingStatisticsReporter(statistics_path))
 
     if checkpoint_save_path is not None:
         if not os.path.exists(checkpoint_save_path):
             os.makedirs(checkpoint_save_path)
 
-        checkpointer = neat.Checkpointer(5, None, f"{checkpoint_save_path}/neat-checkpoint-")
+        # Array checkpoints are small enough to keep one for every generation
+        checkpointer = ArrayCheckpointer(1, None, f"{checkpoint_save_path}/neat-checkpoint-")
         population.add_reporter(checkpointer)
 
     return population
@@ -62,27 +82,71 @@ def load_population_from_checkpoint(checkpoint_path: str) -> neat.Population:
     """
     Load a population from a saved checkpoint
 
+    Both array checkpoints (`.npz`) and pickled `neat.Checkpointer` checkpoints can be loaded, new checkpoints are
+    always saved as arrays
+
     :param checkpoint_path: the path to the saved checkpoint
     :return: the created population
     """
-    population = neat.Checkpointer.restore_checkpoint(checkpoint_path)
+    if checkpoint_path.endswith(".npz"):
+        population = ArrayCheckpointer.restore_checkpoint(checkpoint_path)
+    else:
+        population = neat.Checkpointer.restore_checkpoint(checkpoint_path)
+
     population.add_reporter(neat.StdOutReporter(True))
-    population.add_reporter(neat.StatisticsReporter())
-    population.add_reporter(neat.Checkpointer(5, None, f"{os.path.dirname(checkpoint_path)}/neat-checkpoint-"))
+    statistics_path = f"{os.path.dirname(checkpoint_path)}/statistics"
+    population.add_reporter(StreamingStatisticsReporter(statistics_path, resume_generation=population.generation))
+    population.add_reporter(ArrayCheckpointer(1, None, f"{os.path.dirname(checkpoint_path)}/neat-checkpoint-"))
 
     return population
 
 
-def run_simulation(population: neat.Population, track_filepath: str, tick_time: float = 1 / 20) -> None:
+def close_population(population: neat.Population) -> None:
+    """
+    Stop the worker processes of the reproduction scheme of a population, if it has any
+
+    :param population: the population that finished training
+    """
+    if isinstance(population.reproduction, ParallelReproduction):
+        population.reproduction.close()
+
+
+def run_simulation(
+    population: neat.Population,
+    track_filepath: str,
+    tick_time: float = 1 / 20,
+    use_sensor_table: bool = False,
+    telemetry_address: tuple[str, int] | str | None = None,
+    control_frequency: float | None = None,
+    track_allocations: bool = False
+) -> None:
     """
     Run the driving simulation and train the population of drivers
 
     :param population: the population to train
     :param track_filepath: path to the xml file describing the track to use
     :param tick_time: the time between updates in seconds
+    :param use_sensor_table: whether drivers should sense the track through a precomputed lookup table
+    :param telemetry_address: the (host, port) or Unix socket path to serve live metrics on, disabled if not provided
+    :param control_frequency: the number of times per simulated second drivers sense and decide, every update if not
+        provided
+    :param track_allocations: whether to sample memory and report the top allocation sites every generation
     """
     simulation = Simulation()
-    simulation.xml_load(track_filepath)
+    simulation.load_compiled(track_filepath)
+    sensor = SensorTable(simulation.get_track()) if use_sensor_table else None
+    telemetry = None
+    allocation_reporter = None
+
+    if telemetry_address is not None:
+        telemetry = Telemetry()
+        telemetry.watch_simulation(simulation)
+        telemetry.serve(telemetry_address)
+        population.add_reporter(telemetry)
+
+    if track_allocations:
+        allocation_reporter = AllocationReporter()
+        population.add_reporter(allocation_reporter)
 
     def evaluate_genomes(genomes: list[tuple[int, neat.DefaultGenome]], config: neat.Config) -> None:
         """
@@ -95,14 +159,14 @@ def run_simulation(population: neat.Population, track_filepath: str, tick_time:
         simulation.purge_drivers()
 
         for genome_id, genome in genomes:
-            driver = AiDriver(simulation.get_track(), genome, config)
+            driver = AiDriver(simulation.get_track(), genome, config, sensor, control_frequency=control_frequency)
             simulation.add_driver(driver)
 
         # Run the simulation until all drivers are off-track or the
         time_since_start = 0
         time_since_last_update = 0
 
-        while time_since_start < 60 and not simulation.all_drivers_off_track():
+        while time_since_start < EPISODE_TIME and not simulation.all_drivers_off_track():
             # Close the window gracefully if requested by the user
             if window_should_close():
                 terminate_window()
@@ -123,12 +187,166 @@ def run_simulation(population: neat.Population, track_filepath: str, tick_time:
             end_drawing()
 
         # Add a bonus to the drivers that are still alive after the alotted time ends
-        for driver in simulation._drivers:
-            if isinstance(driver, AiDriver) and not driver.is_off_track():
-                driver._genome.fitness *= 1.2
+        reward_survivors(simulation)
 
     # Train the population
-    population.run(evaluate_genomes)
+    try:
+        population.run(evaluate_genomes)
+    finally:
+        close_population(population)
+
+        if telemetry is not None:
+            telemetry.close()
+
+        if allocation_reporter is not None:
+            allocation_reporter.close()
+
+
+def run_with_viewer(
+    population: neat.Population,
+    track_filepath: str,
+    tick_time: float = 1 / 20,
+    publish_interval: int = 3,
+    open_viewer: bool = True
+) -> None:
+    """
+    Train the population of drivers headless, publishing the drivers to a viewer running in its own process
+
+    Training never waits for the viewer, so it runs as fast as a headless run whether the viewer is open, closed, or
+    stalled. The viewer is opened here, or can be attached later with `viewer.py` and the printed name.
+
+    :param population: the population to train
+    :param track_filepath: path to the xml file describing the track to use
+    :param tick_time: the time between updates in seconds
+    :param publish_interval: the number of updates between frames published to the viewer
+    :param open_viewer: whether to open a viewer right away
+    """
+    simulation = Simulation()
+    simulation.load_compiled(track_filepath)
+    # Leave room for neat breeding more genomes than the population size (at least a few per species)
+    publisher = FramePublisher(track_filepath, 2 * population.config.pop_size)
+    print(f"Publishing frames to '{publisher.get_name()}'")
+
+    if open_viewer:
+        context = multiprocessing.get_context("spawn")
+        viewer = context.Process(target=run_viewer, args=(publisher.get_name(),), daemon=True)
+        viewer.start()
+
+    def evaluate_genomes(genomes: list[tuple[int, neat.DefaultGenome]], config: neat.Config) -> None:
+        """
+        Inner function to evaluate the current generation of drivers
+
+        :param genomes: the (genome_id, genome) for each individual of the population
+        :param config: the current neat configuration
+        """
+        run_episode(simulation, genomes, config, tick_time, publisher=publisher, publish_interval=publish_interval)
+
+    try:
+        population.run(evaluate_genomes)
+    finally:
+        close_population(population)
+        publisher.close()
+
+
+def run_distributed(
+    population: neat.Population,
+    track_filepath: str,
+    host: str = "127.0.0.1",
+    port: int = 5555,
+    batch_size: int = 10,
+    telemetry_address: tuple[str, int] | str | None = None,
+    journal_filepath: str | None = None,
+    authkey: str | None = None
+) -> None:
+    """
+    Train the population of drivers headless, evaluating genomes on remote workers (see `remote_worker.py`)
+
+    :param population: the population to train
+    :param track_filepath: path to the xml file describing the track to use
+    :param host: the interface to listen for workers on (only this host by default, use "0.0.0.0" for workers on
+        other hosts)
+    :param port: the port to listen for workers on
+    :param batch_size: the number of genomes sent to a worker at once
+    :param telemetry_address: the (host, port) or Unix socket path to serve live metrics on, disabled if not provided
+    :param journal_filepath: the path of a journal recording every fitness result, so a restarted run skips the genomes
+        of the interrupted generation that were already evaluated, disabled if not provided
+    :param authkey: the key workers must authenticate with, read from `NEAT_DRIVER_AUTHKEY` or generated (and printed)
+        if not provided
+    """
+    # Workers must hold the same key to connect (see `remote_worker.py`)
+    if authkey is None and not os.environ.get(AUTHKEY_ENV):
+        authkey = secrets.token_hex(16)
+        print(f"Workers authenticate with {AUTHKEY_ENV}={authkey}")
+
+    journal = None if journal_filepath is None else FitnessJournal(journal_filepath)
+    evaluator = RemoteEvaluator(track_filepath, host, port, batch_size, journal=journal, authkey=authkey)
+    print(f"Waiting for workers on {host}:{port}")
+    telemetry = None
+
+    if telemetry_address is not None:
+        telemetry = Telemetry()
+        telemetry.watch_evaluator(evaluator)
+        telemetry.serve(telemetry_address)
+        population.add_reporter(telemetry)
+
+    try:
+        population.run(evaluator.evaluate if journal is None else journal.wrap(evaluator.evaluate))
+    finally:
+        close_population(population)
+        evaluator.close()
+
+        if journal is not None:
+            journal.close()
+
+        if telemetry is not None:
+            telemetry.close()
+
+
+def run_multi_fidelity(
+    population: neat.Population,
+    track_filepath: str,
+    promote_fraction: float = 0.25,
+    tick_time: float = 1 / 20
+) -> None:
+    """
+    Train the population of drivers headless, screening every generation cheaply and only scoring the best of the
+    screening at full fidelity (see `MultiFidelityEvaluator`)
+
+    :param population: the population to train
+    :param track_filepath: path to the xml file describing the track to use
+    :param promote_fraction: the fraction of each generation scored at full fidelity
+    :param tick_time: the time between updates at full fidelity in seconds
+    """
+    evaluator = MultiFidelityEvaluator(track_filepath, promote_fraction, tick_time=tick_time)
+
+    try:
+        population.run(evaluator.evaluate)
+    finally:
+        close_population(population)
+
+
+def run_island_model(
+    islands: list[tuple[str, str]],
+    checkpoint_dir: str,
+    num_generations: int,
+    migration_interval: int = 10,
+    num_migrants: int = 1
+) -> None:
+    """
+    Train several populations headless in parallel processes, migrating champions between them (see `run_islands`)
+
+    :param islands: the (neat configuration filepath, track filepath) of every island
+    :param checkpoint_dir: the directory to save the checkpoints of every island in
+    :param num_generations: the number of generations to train every island for
+    :param migration_interval: the number of generations between migrations
+    :param num_migrants: the number of champions sent by an island on each migration
+    """
+    results = run_islands(
+        islands, checkpoint_dir, load_population_from_config_file, num_generations, migration_interval, num_migrants
+    )
+
+    for index, (best_genome, num_received) in enumerate(results):
+        print(f"Island {index}: best fitness {best_genome.fitness:.2f}, received {num_received} migrants")
 
 
 def main() -> None:
@@ -142,8 +360,11 @@ def main() -> None:
     checkpoint_save_path = "assets/checkpoints/oval"
     population = load_population_from_config_file(config_filepath, checkpoint_save_path)
 
+    # Create the offspring of large populations in parallel
+    #population = load_population_from_config_file(config_filepath, checkpoint_save_path, ParallelReproduction)
+
     # Load the population from a checkpoint
-    #population = load_population_from_checkpoint("assets/checkpoints/windy/neat-checkpoint-59")
+    #population = load_population_from_checkpoint("assets/checkpoints/windy/neat-checkpoint-59.npz")
 
     run_simulation(population, "assets/tracks/oval.xml")
     terminate_window()
@@ -0,0 +1,23 @@
+from src.remote_evaluation import AUTHKEY_ENV, run_worker
+import argparse
+
+
+def main() -> None:
+    """
+    Entry point into running a headless evaluation worker for a remote coordinator
+    """
+    parser = argparse.ArgumentParser(description="Evaluate genomes for a NEAT Driver coordinator")
+    parser.add_argument("host", help="host of the coordinator")
+    parser.add_argument("port", type=int, help="port of the coordinator")
+    parser.add_argument("--images-dir", default="assets/images/", help="directory holding the track images")
+    parser.add_argument("--cache-dir", default="assets/cache/", help="directory to store compiled tracks in")
+    parser.add_argument(
+        "--authkey", default=None, help=f"key shared with the coordinator, prefer setting {AUTHKEY_ENV} instead"
+    )
+    args = parser.parse_args()
+
+    run_worker(args.host, args.port, args.images_dir, args.cache_dir, authkey=args.authkey)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+from src.memory_profiling import run_soak
+from src.evaluation import EPISODE_TIME
+import argparse
+
+
+def main() -> None:
+    """
+    Entry point into soaking a headless training run and reporting its memory every generation
+    """
+    parser = argparse.ArgumentParser(description="Soak NEAT Driver training headless, sampling memory every generation")
+    parser.add_argument("--config", default="assets/configs/config-feedforward.txt", help="neat configuration file")
+    parser.add_argument("--track", default="assets/tracks/oval.xml", help="track xml file to train on")
+    parser.add_argument("--generations", type=int, default=200, help="number of generations to run")
+    parser.add_argument("--top", type=int, default=10, help="number of allocation sites reported per generation")
+    parser.add_argument("--frames", type=int, default=1, help="number of stack frames identifying an allocation site")
+    parser.add_argument("--output", default=None, help="json lines file to append the samples to")
+    parser.add_argument("--seed", type=int, default=None, help="seed of the random number generator")
+    parser.add_argument("--tick-time", type=float, default=1 / 20, help="time between updates in seconds")
+    parser.add_argument("--episode-time", type=float, default=EPISODE_TIME, help="duration of an episode in seconds")
+    parser.add_argument("--images-dir", default="assets/images/", help="directory holding the track images")
+    parser.add_argument("--cache-dir", default="assets/cache/", help="directory to store compiled tracks in")
+    args = parser.parse_args()
+
+    reporter = run_soak(
+        args.config,
+        args.track,
+        args.generations,
+        args.top,
+        args.frames,
+        args.output,
+        args.seed,
+        args.tick_time,
+        args.episode_time,
+        args.images_dir,
+        args.cache_dir
+    )
+    samples = reporter.get_samples()
+
+    if samples:
+        first, last = samples[0], samples[-1]
+        rss_range = f"{first['rss'] / 2 ** 20:.1f} MiB -> {last['rss'] / 2 ** 20:.1f} MiB"
+        print(f"RSS {rss_range} over {len(samples)} generations")
+        print(f"RSS growth after warm-up: {reporter.get_rss_growth() / 1024:+.1f} KiB per generation")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,11 @@
 from .simulation import Simulation
 from .texture_pack import TexturePack
 from .ai_driver import AiDriver
+from .sensors import PatchSensor, RaySensor, SensorTable, SparseRaySensor
+from .compiled_track import CompiledTrack
+from .vector_env import VectorEnv
+from .species_set import FastSpeciesSet
+from .streaming_statistics import StreamingStatisticsReporter
+from .start_state_bank import StartStateBank
+from .genome_codec import ArrayCheckpointer
+from .reproduction import ParallelReproduction
@@ -1,30 +1,151 @@
 from pyray import *
 from .driver_base import DriverBase
 from .track import Track
+from .sensors import PatchSensor, RaySensor
 import neat
-import math
 
 
 class AiDriver(DriverBase):
     """
     A driver that is controlled by the NEAT neural network
+
+    The physics of the car are integrated on every update, but the track is only sensed and the network only activated
+    on control steps. Between control steps the driver holds the controls chosen on the last one.
     """
-    def __init__(self, track: Track, genome: neat.DefaultGenome, config: neat.Config) -> None:
+    def __init__(
+        self,
+        track: Track,
+        genome: neat.DefaultGenome,
+        config: neat.Config,
+        sensor: RaySensor | PatchSensor | None = None,
+        control_interval: int = 1,
+        control_frequency: float | None = None
+    ) -> None:
+        """
+        Constructor
+
+        :param track: the track to drive on
+        :param genome: the genome controlling this driver
+        :param config: the current neat configuration
+        :param sensor: the sensor used to measure the track (casts rays directly if not provided)
+        :param control_interval: the number of updates between control steps
+        :param control_frequency: the number of control steps per simulated second, if provided (control steps then
+            happen on the first update at least 1 / frequency seconds after the previous one)
+        """
+        if control_interval < 1:
+            raise ValueError("[ERROR]: The control interval must be at least one update")
+
+        if control_frequency is not None and control_frequency <= 0:
+            raise ValueError("[ERROR]: The control frequency must be positive")
+
         super().__init__(track)
+        self._sensor = RaySensor() if sensor is None else sensor
         self._genome = genome
         self._genome.fitness = 0
         self._network = neat.nn.FeedForwardNetwork.create(genome, config)
         self._time_stagnant = 0
 
+        # The controls held between control steps, chosen on the first update
+        self._control_interval = control_interval
+        self._control_period = 0 if control_frequency is None else 1 / control_frequency
+        self._updates_since_control = 0
+        self._time_since_control = 0
+        self._controls = None
+        self._is_updating = False
+
+    def get_genome(self) -> neat.DefaultGenome:
+        """
+        Get the genome controlling this driver
+
+        :return: the genome
+        """
+        return self._genome
+
+    def get_control_interval(self) -> int:
+        """
+        Get the number of updates between control steps
+
+        :return: the control interval
+        """
+        return self._control_interval
+
+    def set_control_interval(self, control_interval: int) -> None:
+        """
+        Set the number of updates between control steps
+
+        :param control_interval: the new control interval
+        """
+        if control_interval < 1:
+            raise ValueError("[ERROR]: The control interval must be at least one update")
+
+        self._control_interval = control_interval
+
+    def get_state(self) -> tuple:
+        """
+        Get a snapshot of the state of this driver, including its stagnant time, the fitness of its genome, and the
+        progress towards its next control step
+
+        :return: the state of `DriverBase.get_state` followed by the (time stagnant, fitness, updates since control,
+            time since control, held controls)
+        """
+        return super().get_state() + (
+            self._time_stagnant, self._genome.fitness, self._updates_since_control, self._time_since_control,
+            self._controls
+        )
+
+    def set_state(self, state: tuple) -> None:
+        """
+        Restore a snapshot of the state of this driver
+
+        A base driver state (without the stagnant time and fitness) only restores the physical state of the car. A state
+        without the control progress makes the next update a control step.
+
+        :param state: a state returned by `get_state`
+        """
+        super().set_state(state)
+
+        if len(state) > 6:
+            self._time_stagnant, self._genome.fitness = state[6:8]
+
+        if len(state) > 8:
+            self._updates_since_control, self._time_since_control, self._controls = state[8:11]
+        else:
+            self._updates_since_control, self._time_since_control, self._controls = 0, 0, None
+
+    def get_sensor(self) -> RaySensor | PatchSensor:
+        """
+        Get the sensor used to measure the track
+
+        :return: the sensor
+        """
+        return self._sensor
+
     def update(self, delta_time: float) -> None:
         """
         Update this driver
 
         :param delta_time: elapsed time since the last update in seconds
         """
+        if self.begin_update(delta_time):
+            self.end_update(delta_time, self._sensor.sense(self._track, self.get_position(), self.get_angle()))
+        else:
+            self.end_update(delta_time)
+
+    def begin_update(self, delta_time: float) -> bool:
+        """
+        Move this driver, the first half of an update
+
+        Splitting the update lets a simulation sense the track for many drivers at once in between the two halves
+
+        :param delta_time: elapsed time since the last update in seconds
+        :return: `True` if this update is a control step, and `end_update` needs the sensor readings at the new
+            position of the driver
+        """
+        self._is_updating = False
+
         # No need to update this driver if it's currently off track (dead)
         if self.is_off_track():
-            return
+            return False
 
         # Keep track of the amount of time spent stagnant (some drivers haven't learned to press the gas)
         if self.get_speed() == 0:
@@ -36,37 +157,55 @@ class AiDriver(DriverBase):
         if self._track.is_off_track(self.get_position()) or self._time_stagnant >= 2:
             self.set_off_track(True)
             self._genome.fitness *= 0.5
-            return
+            return False
 
         # Update the driver and the fitness of the genome
         prev_pos = self.get_position()
         super().update(delta_time)
         distance_traveled = vector2_length(vector2_subtract(self.get_position(), prev_pos))
         self._genome.fitness += distance_traveled
+        self._is_updating = True
+
+        # Sense the track and choose new controls only on control steps
+        self._updates_since_control += 1
+        self._time_since_control += delta_time
+
+        return self._controls is None or (
+            self._updates_since_control >= self._control_interval
+            and self._time_since_control >= self._control_period - 1e-9
+        )
+
+    def end_update(self, delta_time: float, readings: list[float] | None = None) -> None:
+        """
+        Choose and take the controls of this driver, the second half of an update
+
+        :param delta_time: elapsed time since the last update in seconds
+        :param readings: the sensor readings at the position of the driver on a control step, None otherwise
+        """
+        if not self._is_updating:
+            return
 
-        # Calculate the inputs for neat
-        inputs = [self.get_speed(), self.get_steering_angle()]
+        self._is_updating = False
 
-        pos = self.get_position()
-        angle = self.get_angle()
-        num_casts = 12
-        fov = math.pi
-        angle_delta = fov / num_casts
+        if readings is not None:
+            self._updates_since_control = 0
+            self._time_since_control = 0
 
-        for i in range(num_casts):
-            ray_end = self._track.ray_collision(pos, angle - fov / 2 + i * angle_delta)
-            inputs.append(vector2_length(vector2_subtract(ray_end, pos)))
+            # Calculate the inputs for neat
+            inputs = [self.get_speed(), self.get_steering_angle()]
+            inputs.extend(readings)
 
-        # Calculate the outputs of the network and take corresponding actions
-        outputs = self._network.activate(inputs)
+            # Calculate the outputs of the network and hold the corresponding controls
+            self._controls = tuple(output > 0.5 for output in self._network.activate(inputs))
 
-        if outputs[0] > 0.5:
+        # Take the held actions
+        if self._controls[0]:
             self.press_gas(delta_time)
-        if outputs[1] > 0.5:
+        if self._controls[1]:
             self.press_gas(delta_time)
-        if outputs[2] > 0.5:
+        if self._controls[2]:
             self.turn_left(delta_time)
-        if outputs[3] > 0.5:
+        if self._controls[3]:
             self.turn_right(delta_time)
 
     def draw(self) -> None:
@@ -0,0 +1,237 @@
+from pyray import *
+from .track import Track
+from xml.etree import ElementTree
+from xml.etree.ElementTree import Element
+import numpy as np
+import hashlib
+import glob
+import json
+import os
+import re
+
+
+class CompiledTrack:
+    """
+    A load-ready binary bundle holding everything derived from a track xml file
+
+    The bundle is a single file made of a small json header followed by raw, aligned arrays (the occupancy mask, the
+    distance field, and the checkpoints). Loading a bundle memory-maps the file, so no image decoding or derived
+    structure is rebuilt and every process loading the same track shares the same pages. Tracks using a tiled map keep
+    referencing their tiled mask file instead of copying it into the bundle.
+    """
+    MAGIC = b"NDTRACK\0"
+    FORMAT_VERSION = 1
+    ALIGNMENT = 64
+    KEY_LENGTH = 32
+    SOURCE_KEY_LENGTH = 8
+    IMAGE_ATTRIBUTES = ("texture", "map")
+
+    def __init__(self, filepath: str) -> None:
+        """
+        Constructor
+
+        :param filepath: the path to the compiled bundle to load
+        """
+        self._filepath = filepath
+        self._data = np.memmap(filepath, dtype=np.uint8, mode="r")
+
+        if bytes(self._data[:len(self.MAGIC)]) != self.MAGIC:
+            raise ValueError(f"[ERROR]: '{filepath}' is not a compiled track")
+
+        # Read the header describing the track attributes and where each array is stored
+        header_start = len(self.MAGIC) + 8
+        header_length = int(self._data[len(self.MAGIC):header_start].view(np.uint64)[0])
+        header = json.loads(bytes(self._data[header_start:header_start + header_length]))
+
+        self._attributes = header["attributes"]
+        self._arrays = {}
+
+        for name, info in header["arrays"].items():
+            dtype = np.dtype(info["dtype"])
+            size = int(np.prod(info["shape"])) * dtype.itemsize
+            self._arrays[name] = self._data[info["offset"]:info["offset"] + size].view(dtype).reshape(info["shape"])
+
+    @classmethod
+    def compile(
+        cls,
+        xml_filepath: str,
+        images_dir: str = "assets/images/",
+        cache_dir: str = "assets/cache/"
+    ) -> "CompiledTrack":
+        """
+        Load the compiled bundle for a track xml file, (re)building it if the xml or its images changed
+
+        :param xml_filepath: the path to the track xml file
+        :param images_dir: the directory holding the images referenced by the xml file
+        :param cache_dir: the directory to store compiled bundles in
+        :return: the loaded bundle
+        """
+        # Bundles are named after the track, where its sources live, and what they hold, so tracks sharing a file name
+        # in different directories never replace each other's bundles
+        name = os.path.splitext(os.path.basename(xml_filepath))[0]
+        source = (os.path.abspath(xml_filepath), os.path.abspath(images_dir))
+        source_key = hashlib.sha256(repr(source).encode()).hexdigest()[:cls.SOURCE_KEY_LENGTH]
+        prefix = f"{name}-{source_key}-"
+        filepath = os.path.join(cache_dir, f"{prefix}{cls.compute_key(xml_filepath, images_dir)}.track")
+
+        if not os.path.exists(filepath):
+            # Remove bundles built from older versions of the same track before building the new one, leaving the
+            # bundles of other tracks alone
+            stale_pattern = re.compile(rf"{re.escape(prefix)}[0-9a-f]{{{cls.KEY_LENGTH}}}\.track")
+
+            for stale_filepath in glob.glob(os.path.join(glob.escape(cache_dir), f"{glob.escape(prefix)}*.track")):
+                if stale_pattern.fullmatch(os.path.basename(stale_filepath)):
+                    # Another process may have removed it first
+                    try:
+                        os.remove(stale_filepath)
+                    except FileNotFoundError:
+                        pass
+
+            cls._build(xml_filepath, images_dir, filepath)
+
+        return cls(filepath)
+
+    @classmethod
+    def compute_key(cls, xml_filepath: str, images_dir: str) -> str:
+        """
+        Hash the contents of a track xml file and the images it references
+
+        :param xml_filepath: the path to the track xml file
+        :param images_dir: the directory holding the images referenced by the xml file
+        :return: the hex digest identifying the compiled bundle
+        """
+        digest = hashlib.sha256(str(cls.FORMAT_VERSION).encode())
+
+        with open(xml_filepath, "rb") as file:
+            digest.update(file.read())
+
+        root = ElementTree.parse(xml_filepath).getroot()
+
+        for attribute in cls.IMAGE_ATTRIBUTES:
+            if (filename := root.get(attribute)) is not None:
+                image_filepath = os.path.join(images_dir, filename)
+
+                if os.path.exists(image_filepath):
+                    with open(image_filepath, "rb") as file:
+                        digest.update(file.read())
+
+        # Tiled maps can be far too large to hash, so they are identified by their size and modification time instead
+        if (tiled_map_filepath := root.get("tiled_map")) is not None:
+            stat = os.stat(tiled_map_filepath)
+            digest.update(repr((tiled_map_filepath, stat.st_size, stat.st_mtime_ns)).encode())
+
+        return digest.hexdigest()[:cls.KEY_LENGTH]
+
+    @classmethod
+    def _build(cls, xml_filepath: str, images_dir: str, filepath: str) -> None:
+        """
+        Convenience function to derive all arrays of a track and write them to a bundle
+
+        :param xml_filepath: the path to the track xml file
+        :param images_dir: the directory holding the images referenced by the xml file
+        :param filepath: the path to write the bundle to
+        """
+        root = ElementTree.parse(xml_filepath).getroot()
+        track = Track()
+        track.xml_load(root)
+        arrays = {
+            "checkpoints": np.array(
+                [(start.x, start.y, end.x, end.y) for start, end in track.get_checkpoints()],
+                dtype=np.float32
+            ).reshape(-1, 4),
+        }
+
+        # Decode the map directly, the texture pack may not be loaded (e.g. in headless worker processes). Tiled maps are
+        # already memory-mapped, so they are referenced by the attributes rather than copied into the bundle
+        if root.get("tiled_map") is None:
+            map_image = load_image(os.path.join(images_dir, root.get("map")))
+            track.set_map(map_image)
+            arrays["mask"] = np.array(track.get_mask(), dtype=bool)
+            arrays["distance_field"] = track.get_distance_field()
+            unload_image(map_image)
+
+        cls.write(filepath, dict(root.attrib), arrays)
+
+    @classmethod
+    def write(cls, filepath: str, attributes: dict[str, str], arrays: dict[str, np.ndarray]) -> None:
+        """
+        Write a bundle to disk
+
+        The bundle is written to a temporary file first, so other processes never map a partially written bundle
+
+        :param filepath: the path to write the bundle to
+        :param attributes: the attributes of the track xml node
+        :param arrays: the derived arrays to store
+        """
+        def align(offset: int) -> int:
+            return (offset + cls.ALIGNMENT - 1) // cls.ALIGNMENT * cls.ALIGNMENT
+
+        # Lay out the arrays after the header, leaving enough room for the header itself
+        arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+        layout = {name: {"dtype": array.dtype.str, "shape": list(array.shape)} for name, array in arrays.items()}
+        header_size = len(json.dumps({"attributes": attributes, "arrays": layout}).encode()) + 64 * (len(arrays) + 1)
+        offset = align(len(cls.MAGIC) + 8 + header_size)
+
+        for name, array in arrays.items():
+            layout[name]["offset"] = offset
+            offset = align(offset + array.nbytes)
+
+        header = json.dumps({"attributes": attributes, "arrays": layout}).encode()
+
+        os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+        temp_filepath = f"{filepath}.{os.getpid()}.tmp"
+
+        with open(temp_filepath, "wb") as file:
+            file.write(cls.MAGIC)
+            file.write(np.uint64(len(header)).tobytes())
+            file.write(header)
+
+            for name, array in arrays.items():
+                file.seek(layout[name]["offset"])
+                file.write(array.tobytes())
+
+            file.truncate(max(offset, file.tell()))
+
+        os.replace(temp_filepath, filepath)
+
+    def get_filepath(self) -> str:
+        """
+        Get the path of the bundle
+
+        :return: the path to the bundle file
+        """
+        return self._filepath
+
+    def get_attributes(self) -> dict[str, str]:
+        """
+        Get the attributes of the track xml node
+
+        :return: the attribute names mapped to their values
+        """
+        return self._attributes
+
+    def get_array(self, name: str) -> np.ndarray:
+        """
+        Get a derived array stored in the bundle
+
+        :param name: the name of the array
+        :return: a read-only, memory-mapped view of the array
+        """
+        return self._arrays[name]
+
+    def load_into(self, track: Track) -> None:
+        """
+        Load the attributes and derived arrays of this bundle into a track
+
+        :param track: the track to load into
+        """
+        track.xml_load(Element("track", self._attributes))
+
+        if "mask" in self._arrays:
+            track.set_mask(self.get_array("mask"))
+            track.set_distance_field(self.get_array("distance_field"))
+
+        track.set_checkpoints([
+            (Vector2(float(x1), float(y1)), Vector2(float(x2), float(y2)))
+            for x1, y1, x2, y2 in self.get_array("checkpoints")
+        ])
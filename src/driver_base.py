@@ -14,12 +14,14 @@ class DriverBase(SimObject):
 	DRAG = 0.001
 	HORSEPOWER = 40
 	BRAKE_POWER = 30
+	WIDTH = 5.5
+	HEIGHT = 2
 
 	def __init__(self, track: Track) -> None:
 		"""
 		Constructor
 		"""
-		super().__init__(Vector2(5.5, 2), "car.png")
+		super().__init__(Vector2(self.WIDTH, self.HEIGHT), "car.png")
 		self._track = track
 		self._speed = 0
 		self._steering_angle = 0
@@ -75,6 +77,28 @@ class DriverBase(SimObject):
 		"""
 		self._off_tack = off_track
 
+	def get_state(self) -> tuple:
+		"""
+		Get a snapshot of the state of this driver
+
+		:return: the (x, y, angle, speed, steering angle, off track) of this driver
+		"""
+		pos = self.get_position()
+		return pos.x, pos.y, self.get_angle(), self._speed, self._steering_angle, self._off_tack
+
+	def set_state(self, state: tuple) -> None:
+		"""
+		Restore a snapshot of the state of this driver
+
+		:param state: a state returned by `get_state`
+		"""
+		x, y, angle, speed, steering_angle, off_track = state[:6]
+		self.set_position(Vector2(x, y))
+		self.set_angle(angle)
+		self._speed = speed
+		self._steering_angle = steering_angle
+		self._off_tack = off_track
+
 	def turn_left(self, delta_time: float) -> None:
 		"""
 		Turn to the left by one tick
@@ -0,0 +1,129 @@
+from .simulation import Simulation
+from .ai_driver import AiDriver
+from .sensors import PatchSensor, RaySensor
+from .start_state_bank import StartStateBank
+from .frame_stream import FramePublisher
+import neat
+
+EPISODE_TIME = 60
+SURVIVAL_BONUS = 1.2
+
+
+def reward_survivors(simulation: Simulation) -> None:
+    """
+    Add a bonus to the drivers that are still alive after the allotted time ends
+
+    :param simulation: the simulation whose episode just ended
+    """
+    for driver in simulation.get_drivers():
+        if isinstance(driver, AiDriver) and not driver.is_off_track():
+            driver.get_genome().fitness *= SURVIVAL_BONUS
+
+
+def run_episode(
+    simulation: Simulation,
+    genomes: list[tuple[int, neat.DefaultGenome]],
+    config: neat.Config,
+    tick_time: float = 1 / 20,
+    episode_time: float = EPISODE_TIME,
+    sensor: RaySensor | PatchSensor | None = None,
+    bank: StartStateBank | None = None,
+    record_interval: float = 1,
+    control_interval: int = 1,
+    publisher: FramePublisher | None = None,
+    publish_interval: int = 1
+) -> None:
+    """
+    Evaluate genomes without drawing, stepping the simulation at a fixed rate as fast as possible
+
+    The fitness of every genome is set the same way the visual trainer sets it
+
+    :param simulation: the simulation (with a loaded track) to evaluate in
+    :param genomes: the (genome_id, genome) for each individual to evaluate
+    :param config: the current neat configuration
+    :param tick_time: the time between updates in seconds
+    :param episode_time: the simulated duration of the episode in seconds
+    :param sensor: the sensor used by the drivers (casts rays directly if not provided)
+    :param bank: a start state bank to record the states of the strongest drivers into, if provided
+    :param record_interval: the simulated time between recordings into the bank in seconds
+    :param control_interval: the number of updates between the control steps of the drivers (see `AiDriver`)
+    :param publisher: a publisher to publish the poses of the drivers to a viewer with, if provided
+    :param publish_interval: the number of updates between published frames
+    """
+    # Purge all current drivers and create one per genome
+    simulation.purge_drivers()
+
+    for genome_id, genome in genomes:
+        simulation.add_driver(AiDriver(simulation.get_track(), genome, config, sensor, control_interval))
+
+    # Run the simulation until all drivers are off-track or the time runs out
+    time_since_start = 0
+    time_since_record = 0
+
+    while time_since_start < episode_time and not simulation.all_drivers_off_track():
+        simulation.update(tick_time)
+        time_since_start += tick_time
+        time_since_record += tick_time
+
+        if bank is not None and time_since_record >= record_interval:
+            bank.record(simulation)
+            time_since_record = 0
+
+        if publisher is not None and simulation.get_num_ticks() % publish_interval == 0:
+            publisher.publish(simulation)
+
+    reward_survivors(simulation)
+
+
+def run_rollouts(
+    simulation: Simulation,
+    genomes: list[tuple[int, neat.DefaultGenome]],
+    config: neat.Config,
+    bank: StartStateBank,
+    num_rollouts: int = 8,
+    rollout_time: float = 5,
+    tick_time: float = 1 / 20,
+    sensor: RaySensor | PatchSensor | None = None,
+    control_interval: int = 1
+) -> None:
+    """
+    Evaluate genomes with short rollouts starting from states sampled around the track
+
+    Every genome drives from the same sampled start states, one rollout after the other. Each rollout is scored like an
+    episode of `run_episode` (including the survival bonus), and the fitness of a genome is the sum of its rollout
+    scores. The drivers are created once and restored to each start state, so rollouts cost no extra setup.
+
+    :param simulation: the simulation (with a loaded track) to evaluate in
+    :param genomes: the (genome_id, genome) for each individual to evaluate
+    :param config: the current neat configuration
+    :param bank: the bank to sample the start states from
+    :param num_rollouts: the number of rollouts per genome
+    :param rollout_time: the simulated duration of each rollout in seconds
+    :param tick_time: the time between updates in seconds
+    :param sensor: the sensor used by the drivers (casts rays directly if not provided)
+    :param control_interval: the number of updates between the control steps of the drivers (see `AiDriver`)
+    """
+    simulation.purge_drivers()
+
+    for genome_id, genome in genomes:
+        simulation.add_driver(AiDriver(simulation.get_track(), genome, config, sensor, control_interval))
+
+    totals = [0.0] * len(genomes)
+
+    for start_state in bank.sample(num_rollouts):
+        # Place every driver at the start state, with a fresh stagnant time and fitness
+        simulation.restore([start_state + (False, 0, 0)] * len(genomes))
+
+        time_since_start = 0
+
+        while time_since_start < rollout_time and not simulation.all_drivers_off_track():
+            simulation.update(tick_time)
+            time_since_start += tick_time
+
+        reward_survivors(simulation)
+
+        for i, (_, genome) in enumerate(genomes):
+            totals[i] += genome.fitness
+
+    for (_, genome), total in zip(genomes, totals):
+        genome.fitness = total
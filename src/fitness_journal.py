@@ -0,0 +1,207 @@
+from typing import Callable
+import neat
+import hashlib
+import json
+import os
+
+
+def genome_fingerprint(genome: neat.DefaultGenome) -> str:
+    """
+    Compute a fingerprint of the structure and parameters of a genome
+
+    Genomes with the same genes (keys and attribute values) have the same fingerprint, whatever their genome id
+
+    :param genome: the genome to fingerprint
+    :return: the fingerprint as a hexadecimal string
+    """
+    genes = [
+        (key, tuple(getattr(gene, attribute.name) for attribute in gene._gene_attributes))
+        for genes in (genome.nodes, genome.connections) for key, gene in sorted(genes.items())
+    ]
+    return hashlib.blake2b(repr(genes).encode(), digest_size=16).hexdigest()
+
+
+def _round_fingerprint(genomes: list[tuple[int, neat.DefaultGenome]]) -> str:
+    """
+    Convenience function to identify a generation by the ids of its genomes
+
+    :param genomes: the (genome_id, genome) of the generation
+    :return: the fingerprint as a hexadecimal string
+    """
+    genome_ids = ",".join(str(genome_id) for genome_id in sorted(genome_id for genome_id, _ in genomes))
+    return hashlib.blake2b(genome_ids.encode(), digest_size=16).hexdigest()
+
+
+class FitnessJournal:
+    """
+    An append-only file of the fitness results of the generation being evaluated, to resume it after a crash
+
+    Every result is written and synced to disk as soon as it is recorded, keyed by the genome id and a fingerprint of
+    the genome (so a different genome that reuses an id is never mistaken for a scored one). A generation is identified
+    by the ids of its genomes rather than its number, as restored populations may number their generations differently.
+    Only the results of the current generation are kept: the journal is emptied when a new generation starts.
+    """
+    def __init__(self, filepath: str) -> None:
+        """
+        Constructor
+
+        Results already in the file (e.g. from a run that crashed) are loaded
+
+        :param filepath: the path of the journal file
+        """
+        self._filepath = filepath
+        self._round = None
+        self._results = {}
+
+        os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+        self._load()
+        self._file = open(filepath, "a")
+
+    def get_filepath(self) -> str:
+        """
+        Get the path of the journal file
+
+        :return: the path
+        """
+        return self._filepath
+
+    def get_num_results(self) -> int:
+        """
+        Get the number of results recorded for the current generation
+
+        :return: the number of results
+        """
+        return len(self._results)
+
+    def _load(self) -> None:
+        """
+        Convenience function to read the results in the journal file, dropping a line left incomplete by a crash
+        """
+        if not os.path.exists(self._filepath):
+            return
+
+        with open(self._filepath, "rb+") as file:
+            data = file.read()
+
+            if not data.endswith(b"\n"):
+                data = data[:data.rfind(b"\n") + 1]
+                file.truncate(len(data))
+
+        for line in data.splitlines():
+            entry = json.loads(line)
+
+            if entry["round"] != self._round:
+                self._round = entry["round"]
+                self._results.clear()
+
+            self._results[entry["genome_id"]] = (entry["fingerprint"], entry["fitness"])
+
+    def begin_generation(self, genomes: list[tuple[int, neat.DefaultGenome]]) -> None:
+        """
+        Start the evaluation of a generation, discarding the results of any other generation
+
+        :param genomes: the (genome_id, genome) of the generation
+        """
+        round_fingerprint = _round_fingerprint(genomes)
+
+        if round_fingerprint != self._round:
+            self._round = round_fingerprint
+            self._results.clear()
+            self._file.truncate(0)
+            self._sync()
+
+    def lookup(self, genome_id: int, genome: neat.DefaultGenome) -> float | None:
+        """
+        Look up the recorded fitness of a genome of the current generation
+
+        :param genome_id: the id of the genome
+        :param genome: the genome
+        :return: the fitness if recorded, None otherwise
+        """
+        if (result := self._results.get(genome_id)) is None:
+            return None
+
+        fingerprint, fitness = result
+        return fitness if fingerprint == genome_fingerprint(genome) else None
+
+    def record(self, genomes: list[tuple[int, neat.DefaultGenome]]) -> None:
+        """
+        Record the fitness of evaluated genomes of the current generation and sync it to disk
+
+        Genomes already recorded are skipped
+
+        :param genomes: the (genome_id, genome) of the evaluated genomes
+        """
+        if self._round is None:
+            raise RuntimeError("[ERROR]: Cannot record results before a generation begins")
+
+        lines = []
+
+        for genome_id, genome in genomes:
+            fingerprint = genome_fingerprint(genome)
+
+            if self._results.get(genome_id) == (fingerprint, genome.fitness):
+                continue
+
+            self._results[genome_id] = (fingerprint, genome.fitness)
+            lines.append(json.dumps({
+                "round": self._round, "genome_id": genome_id, "fingerprint": fingerprint, "fitness": genome.fitness
+            }) + "\n")
+
+        if lines:
+            self._file.writelines(lines)
+            self._sync()
+
+    def wrap(
+        self,
+        evaluate: Callable[[list[tuple[int, neat.DefaultGenome]], neat.Config], None],
+        chunk_size: int | None = None
+    ) -> Callable[[list[tuple[int, neat.DefaultGenome]], neat.Config], None]:
+        """
+        Wrap a fitness function so it only evaluates the genomes without a recorded fitness and records the results
+
+        Genomes are evaluated in chunks, recording the results of each chunk as soon as it is done, so a crash loses
+        at most the chunk being evaluated. An evaluator that records results itself (e.g. a `RemoteEvaluator` given
+        this journal) can be given all the genomes at once.
+
+        :param evaluate: the fitness function to wrap, called with (genomes, config)
+        :param chunk_size: the number of genomes evaluated between recordings, all at once if not provided
+        :return: the wrapped fitness function
+        """
+        def evaluate_genomes(genomes: list[tuple[int, neat.DefaultGenome]], config: neat.Config) -> None:
+            """
+            Inner function to evaluate the genomes without a recorded fitness
+
+            :param genomes: the (genome_id, genome) for each individual of the population
+            :param config: the current neat configuration
+            """
+            self.begin_generation(genomes)
+            remaining = []
+
+            for genome_id, genome in genomes:
+                if (fitness := self.lookup(genome_id, genome)) is not None:
+                    genome.fitness = fitness
+                else:
+                    remaining.append((genome_id, genome))
+
+            size = len(remaining) if chunk_size is None else chunk_size
+
+            for i in range(0, len(remaining), max(size, 1)):
+                chunk = remaining[i:i + size]
+                evaluate(chunk, config)
+                self.record(chunk)
+
+        return evaluate_genomes
+
+    def _sync(self) -> None:
+        """
+        Convenience function to push the written results to disk
+        """
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        """
+        Close the journal file
+        """
+        self._file.close()
@@ -0,0 +1,331 @@
+from pyray import *
+from .simulation import Simulation
+from .driver_base import DriverBase
+from .texture_pack import TexturePack
+from multiprocessing import resource_tracker, shared_memory
+import multiprocessing
+import numpy as np
+import os
+import time
+
+
+class FramePublisher:
+    """
+    Publishes the driver poses of a simulation into a shared-memory ring buffer, to be drawn by a separate viewer
+
+    The buffer holds a few frames (slots). Every slot is guarded by a sequence lock: the publisher makes the sequence
+    number odd while it writes a slot and even once the slot is complete, then marks the slot as the latest frame.
+    Readers copy the latest slot and retry if its sequence number changed meanwhile, so the publisher never waits for a
+    reader, whether a reader is attached, gone, or stalled.
+    """
+    # The layout of the header: the capacity, number of slots, latest slot (-1 before the first frame), and length of
+    # the track filepath, followed by the track filepath itself
+    HEADER_SIZE = 4
+    CAPACITY, NUM_SLOTS, LATEST_SLOT, TRACK_FILEPATH_LENGTH = range(HEADER_SIZE)
+    MAX_TRACK_FILEPATH_LENGTH = 1024
+
+    # The layout of the metadata of a slot: the sequence number, frame index, and number of drivers
+    SLOT_HEADER_SIZE = 3
+    SEQUENCE, FRAME_INDEX, NUM_DRIVERS = range(SLOT_HEADER_SIZE)
+
+    def __init__(self, track_filepath: str, capacity: int, num_slots: int = 4, name: str | None = None) -> None:
+        """
+        Constructor
+
+        :param track_filepath: the path to the xml file of the track the drivers are on
+        :param capacity: the maximum number of drivers in a frame
+        :param num_slots: the number of frames held by the ring buffer
+        :param name: the name of the shared memory block, chosen by the system if not provided
+        """
+        track_filepath = os.path.abspath(track_filepath).encode()
+
+        if len(track_filepath) > self.MAX_TRACK_FILEPATH_LENGTH:
+            raise ValueError(f"[ERROR]: The track filepath is longer than {self.MAX_TRACK_FILEPATH_LENGTH} bytes")
+
+        self._memory = shared_memory.SharedMemory(name, create=True, size=self.get_size(capacity, num_slots))
+        self._views = _FrameViews(self._memory.buf, capacity, num_slots)
+        self._views.header[:] = (capacity, num_slots, -1, len(track_filepath))
+        self._views.track_filepath[:len(track_filepath)] = np.frombuffer(track_filepath, dtype=np.uint8)
+        self._num_frames = 0
+        self._warned_over_capacity = False
+
+    @classmethod
+    def get_size(cls, capacity: int, num_slots: int) -> int:
+        """
+        Get the size of the ring buffer
+
+        :param capacity: the maximum number of drivers in a frame
+        :param num_slots: the number of frames held by the ring buffer
+        :return: the size in bytes
+        """
+        return _FrameViews.get_offsets(capacity, num_slots)[-1]
+
+    def get_name(self) -> str:
+        """
+        Get the name of the shared memory block, to attach a `FrameSubscriber` to
+
+        :return: the name
+        """
+        return self._memory.name
+
+    def get_num_frames(self) -> int:
+        """
+        Get the number of frames published so far
+
+        :return: the number of frames
+        """
+        return self._num_frames
+
+    def publish(self, simulation: Simulation) -> None:
+        """
+        Publish the current poses of the drivers of a simulation
+
+        Publishing runs on the training path, so drivers past the capacity of the buffer are left out of the frame
+        instead of raising (neat may breed a few more genomes than the population size)
+
+        :param simulation: the simulation to publish
+        """
+        drivers = simulation.get_drivers()
+        views = self._views
+        capacity = len(views.x[0])
+
+        if len(drivers) > capacity:
+            if not self._warned_over_capacity:
+                print(f"[WARNING]: Only publishing {capacity} of {len(drivers)} drivers, the buffer is full")
+                self._warned_over_capacity = True
+
+            drivers = drivers[:capacity]
+
+        # Write the slot after the latest one (the oldest frame), holding the sequence number odd meanwhile
+        slot = self._num_frames % int(views.header[self.NUM_SLOTS])
+        slot_header = views.slot_headers[slot]
+        slot_header[self.SEQUENCE] += 1
+
+        num_drivers = len(drivers)
+        views.x[slot][:num_drivers] = [driver.get_x() for driver in drivers]
+        views.y[slot][:num_drivers] = [driver.get_y() for driver in drivers]
+        views.angle[slot][:num_drivers] = [driver.get_angle() for driver in drivers]
+        views.alive[slot][:num_drivers] = [not driver.is_off_track() for driver in drivers]
+        slot_header[self.FRAME_INDEX] = self._num_frames
+        slot_header[self.NUM_DRIVERS] = num_drivers
+
+        slot_header[self.SEQUENCE] += 1
+        views.header[self.LATEST_SLOT] = slot
+        self._num_frames += 1
+
+    def close(self) -> None:
+        """
+        Release the ring buffer, attached subscribers keep their mapping until they close
+        """
+        self._views = None
+        self._memory.close()
+        self._memory.unlink()
+
+
+class FrameSubscriber:
+    """
+    Reads the latest frame published by a `FramePublisher`
+    """
+    def __init__(self, name: str) -> None:
+        """
+        Constructor
+
+        :param name: the name of the shared memory block of the publisher
+        """
+        self._memory = shared_memory.SharedMemory(name)
+
+        # The publisher owns the block, a process of our own must not remove it when it exits
+        if multiprocessing.parent_process() is None:
+            resource_tracker.unregister(self._memory._name, "shared_memory")
+
+        header = np.ndarray((FramePublisher.HEADER_SIZE,), dtype=np.int64, buffer=self._memory.buf)
+        capacity, num_slots = int(header[FramePublisher.CAPACITY]), int(header[FramePublisher.NUM_SLOTS])
+        self._views = _FrameViews(self._memory.buf, capacity, num_slots)
+
+    def get_track_filepath(self) -> str:
+        """
+        Get the path to the xml file of the track the drivers are on
+
+        :return: the track filepath
+        """
+        length = int(self._views.header[FramePublisher.TRACK_FILEPATH_LENGTH])
+        return self._views.track_filepath[:length].tobytes().decode()
+
+    def get_capacity(self) -> int:
+        """
+        Get the maximum number of drivers in a frame
+
+        :return: the capacity
+        """
+        return int(self._views.header[FramePublisher.CAPACITY])
+
+    def read(self, max_attempts: int = 8) -> tuple[int, np.ndarray, np.ndarray, np.ndarray, np.ndarray] | None:
+        """
+        Read the latest complete frame
+
+        :param max_attempts: the number of times to retry when the publisher overwrites the frame while it is read
+        :return: the (frame index, x, y, angle, alive) of the frame, None if no frame could be read
+        """
+        views = self._views
+
+        for _ in range(max_attempts):
+            slot = int(views.header[FramePublisher.LATEST_SLOT])
+
+            if slot < 0:
+                return None
+
+            slot_header = views.slot_headers[slot]
+            sequence = int(slot_header[FramePublisher.SEQUENCE])
+
+            if sequence % 2 == 1:
+                continue
+
+            frame_index = int(slot_header[FramePublisher.FRAME_INDEX])
+            num_drivers = int(slot_header[FramePublisher.NUM_DRIVERS])
+            frame = (
+                frame_index,
+                views.x[slot][:num_drivers].copy(),
+                views.y[slot][:num_drivers].copy(),
+                views.angle[slot][:num_drivers].copy(),
+                views.alive[slot][:num_drivers].astype(bool)
+            )
+
+            if int(slot_header[FramePublisher.SEQUENCE]) == sequence:
+                return frame
+
+        return None
+
+    def close(self) -> None:
+        """
+        Detach from the ring buffer
+        """
+        self._views = None
+        self._memory.close()
+
+
+class _FrameViews:
+    """
+    Convenience class holding numpy views of the sections of a ring buffer
+    """
+    def __init__(self, buffer: memoryview, capacity: int, num_slots: int) -> None:
+        """
+        Constructor
+
+        :param buffer: the shared memory of the ring buffer
+        :param capacity: the maximum number of drivers in a frame
+        :param num_slots: the number of frames held by the ring buffer
+        """
+        header, track_filepath, slot_headers, x, y, angle, alive, _ = self.get_offsets(capacity, num_slots)
+        self.header = np.ndarray((FramePublisher.HEADER_SIZE,), np.int64, buffer, header)
+        self.track_filepath = np.ndarray((FramePublisher.MAX_TRACK_FILEPATH_LENGTH,), np.uint8, buffer, track_filepath)
+        self.slot_headers = np.ndarray((num_slots, FramePublisher.SLOT_HEADER_SIZE), np.int64, buffer, slot_headers)
+        self.x = np.ndarray((num_slots, capacity), np.float32, buffer, x)
+        self.y = np.ndarray((num_slots, capacity), np.float32, buffer, y)
+        self.angle = np.ndarray((num_slots, capacity), np.float32, buffer, angle)
+        self.alive = np.ndarray((num_slots, capacity), np.uint8, buffer, alive)
+
+    @staticmethod
+    def get_offsets(capacity: int, num_slots: int) -> list[int]:
+        """
+        Get the byte offsets of the sections of a ring buffer, each aligned to 8 bytes
+
+        :param capacity: the maximum number of drivers in a frame
+        :param num_slots: the number of frames held by the ring buffer
+        :return: the offsets of the header, track filepath, slot headers, x, y, angle, and alive sections, followed by
+            the total size
+        """
+        sizes = [
+            FramePublisher.HEADER_SIZE * 8,
+            FramePublisher.MAX_TRACK_FILEPATH_LENGTH,
+            num_slots * FramePublisher.SLOT_HEADER_SIZE * 8,
+            num_slots * capacity * 4,
+            num_slots * capacity * 4,
+            num_slots * capacity * 4,
+            num_slots * capacity
+        ]
+        offsets = [0]
+
+        for size in sizes:
+            offsets.append(offsets[-1] + (size + 7) // 8 * 8)
+
+        return offsets
+
+
+class _ViewerDriver(DriverBase):
+    """
+    A driver drawn by the viewer at the pose read from a frame
+    """
+    def draw(self) -> None:
+        """
+        Draw this driver to the screen
+        """
+        if not self.is_off_track():
+            super().draw()
+
+
+def run_viewer(
+    name: str,
+    images_dir: str = "assets/images/",
+    cache_dir: str = "assets/cache/",
+    attach_timeout: float = 30
+) -> None:
+    """
+    Open a window drawing the latest frames published by a `FramePublisher` until the window is closed
+
+    The viewer only reads the ring buffer, so closing, resizing or stalling its window never slows down the publisher
+
+    :param name: the name of the shared memory block of the publisher
+    :param images_dir: the directory holding the track images
+    :param cache_dir: the directory holding the compiled tracks
+    :param attach_timeout: the number of seconds to keep retrying to attach to the publisher
+    """
+    # The publisher may not be up yet, so keep retrying for a while
+    give_up_time = time.monotonic() + attach_timeout
+
+    while True:
+        try:
+            subscriber = FrameSubscriber(name)
+            break
+        except FileNotFoundError:
+            if time.monotonic() > give_up_time:
+                raise
+
+            time.sleep(0.1)
+
+    init_window(800, 600, "NEAT Driver")
+
+    if not is_window_ready():
+        raise RuntimeError("[ERROR]: Failed to initialize the window")
+
+    set_window_state(ConfigFlags.FLAG_WINDOW_RESIZABLE)
+    set_target_fps(60)
+    TexturePack.load_all(images_dir, ("car.png", "box.png"))
+
+    simulation = Simulation()
+    simulation.load_compiled(subscriber.get_track_filepath(), images_dir, cache_dir)
+
+    # Place a driver for every possible car of a frame, unused ones are hidden off the track
+    for _ in range(subscriber.get_capacity()):
+        driver = _ViewerDriver(simulation.get_track())
+        driver.set_off_track(True)
+        simulation.add_driver(driver)
+
+    try:
+        while not window_should_close():
+            if (frame := subscriber.read()) is not None:
+                _, xs, ys, angles, alive = frame
+
+                for i, driver in enumerate(simulation.get_drivers()):
+                    if i < len(xs):
+                        driver.set_state((float(xs[i]), float(ys[i]), float(angles[i]), 0, 0, not alive[i]))
+                    else:
+                        driver.set_off_track(True)
+
+            begin_drawing()
+            clear_background(BLACK)
+            simulation.draw()
+            end_drawing()
+    finally:
+        TexturePack.unload_all()
+        close_window()
+        subscriber.close()
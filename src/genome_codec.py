@@ -0,0 +1,399 @@
+from itertools import count, islice
+import neat
+import numpy as np
+import pickle
+import random
+
+# The version of the array layout, stored in every file to detect incompatible files
+FORMAT_VERSION = 1
+
+
+def _gene_attribute_names(gene_type: type) -> list[str]:
+    """
+    Convenience function to get the names of the evolved attributes of a gene type
+
+    :param gene_type: the node or connection gene class
+    :return: the attribute names, in declaration order
+    """
+    return [attribute.name for attribute in gene_type._gene_attributes]
+
+
+def _optional_floats(values: list[float | None]) -> np.ndarray:
+    """
+    Convenience function to store optional floats, missing values are stored as NaN
+
+    :param values: the values to store
+    :return: the stored values
+    """
+    return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+
+def _from_optional_floats(values: np.ndarray) -> list[float | None]:
+    """
+    Convenience function to read back optional floats stored by `_optional_floats`
+
+    :param values: the stored values
+    :return: the values, None where missing
+    """
+    return [None if value != value else value for value in values.tolist()]
+
+
+def _next_index(owner: object, name: str) -> int:
+    """
+    Convenience function to read the next value of a `itertools.count` attribute without skipping it
+
+    :param owner: the object owning the counter
+    :param name: the name of the counter attribute
+    :return: the next value the counter will produce
+    """
+    value = next(getattr(owner, name))
+    setattr(owner, name, count(value))
+    return value
+
+
+def _encode_column(name: str, values: list) -> dict[str, np.ndarray]:
+    """
+    Convenience function to store a column of gene attribute values
+
+    Strings (e.g. activation functions) take only a few distinct values, so they are stored as indices into a table
+    of those values
+
+    :param name: the name of the column
+    :param values: the values of the column
+    :return: the arrays storing the column, keyed by name
+    """
+    column = np.array(values)
+
+    if column.dtype.kind != "U":
+        return {name: column}
+
+    strings, indices = np.unique(column, return_inverse=True)
+    return {name: indices.astype(np.int32), f"{name}_strings": strings}
+
+
+def _decode_column(arrays: dict[str, np.ndarray], name: str) -> list:
+    """
+    Convenience function to read back a column stored by `_encode_column`
+
+    :param arrays: the arrays holding the column
+    :param name: the name of the column
+    :return: the values of the column
+    """
+    column = arrays[name].tolist()
+
+    if (strings := arrays.get(f"{name}_strings")) is None:
+        return column
+
+    strings = strings.tolist()
+    return [strings[index] for index in column]
+
+
+def encode_genomes(genomes: dict[int, neat.DefaultGenome], prefix: str = "genome") -> dict[str, np.ndarray]:
+    """
+    Encode genomes as columnar arrays
+
+    Every genome is a row of the genome table, its node and connection genes are consecutive rows of the node and
+    connection tables (one typed array per gene attribute). The gene attributes are discovered from the gene types, so
+    genomes with custom genes are supported as long as their attribute values are numbers, booleans or strings.
+
+    :param genomes: the genomes to encode, keyed by genome id
+    :param prefix: the prefix of the array names, to store several sets of genomes side by side
+    :return: the arrays, keyed by name
+    """
+    genome_list = list(genomes.values())
+    nodes = [gene for genome in genome_list for gene in genome.nodes.values()]
+    connections = [gene for genome in genome_list for gene in genome.connections.values()]
+
+    arrays = {
+        f"{prefix}_keys": np.array(list(genomes), dtype=np.int64),
+        f"{prefix}_fitness": _optional_floats([genome.fitness for genome in genome_list]),
+        f"{prefix}_num_nodes": np.array([len(genome.nodes) for genome in genome_list], dtype=np.int64),
+        f"{prefix}_num_connections": np.array([len(genome.connections) for genome in genome_list], dtype=np.int64),
+        f"{prefix}_node_key": np.array([gene.key for gene in nodes], dtype=np.int64),
+        f"{prefix}_connection_key": np.array([gene.key for gene in connections], dtype=np.int64).reshape(-1, 2)
+    }
+
+    # One array per gene attribute, typed by numpy from the attribute values
+    if nodes:
+        for name in _gene_attribute_names(type(nodes[0])):
+            arrays.update(_encode_column(f"{prefix}_node_{name}", [getattr(gene, name) for gene in nodes]))
+
+    if connections:
+        for name in _gene_attribute_names(type(connections[0])):
+            arrays.update(_encode_column(f"{prefix}_connection_{name}", [getattr(gene, name) for gene in connections]))
+
+    return arrays
+
+
+def _decode_genes(arrays: dict[str, np.ndarray], table: str, gene_type: type) -> list[neat.genes.BaseGene]:
+    """
+    Convenience function to decode a table of genes
+
+    :param arrays: the arrays holding the table
+    :param table: the name of the table, including the prefix (e.g. "genome_node")
+    :param gene_type: the gene class to create
+    :return: the genes, in table order
+    """
+    keys = arrays[f"{table}_key"]
+    keys = list(zip(keys[:, 0].tolist(), keys[:, 1].tolist())) if keys.ndim == 2 else keys.tolist()
+
+    if not keys:
+        return []
+
+    # Like unpickling, genes are created without their constructor and their attributes filled in column by column
+    genes = [gene_type.__new__(gene_type) for _ in keys]
+
+    for name in ["key"] + _gene_attribute_names(gene_type):
+        values = keys if name == "key" else _decode_column(arrays, f"{table}_{name}")
+
+        for gene, value in zip(genes, values):
+            setattr(gene, name, value)
+
+    return genes
+
+
+def decode_genomes(
+    arrays: dict[str, np.ndarray],
+    config: neat.Config,
+    prefix: str = "genome"
+) -> dict[int, neat.DefaultGenome]:
+    """
+    Decode genomes encoded by `encode_genomes`
+
+    :param arrays: the arrays holding the genomes, keyed by name
+    :param config: the neat configuration the genomes belong to
+    :param prefix: the prefix of the array names
+    :return: the genomes, keyed by genome id
+    """
+    genome_config = config.genome_config
+    nodes = iter(_decode_genes(arrays, f"{prefix}_node", genome_config.node_gene_type))
+    connections = iter(_decode_genes(arrays, f"{prefix}_connection", genome_config.connection_gene_type))
+    genomes = {}
+
+    for key, fitness, num_nodes, num_connections in zip(
+        arrays[f"{prefix}_keys"].tolist(),
+        _from_optional_floats(arrays[f"{prefix}_fitness"]),
+        arrays[f"{prefix}_num_nodes"].tolist(),
+        arrays[f"{prefix}_num_connections"].tolist()
+    ):
+        genome = config.genome_type(key)
+        genome.fitness = fitness
+
+        genome.nodes = {gene.key: gene for gene in islice(nodes, num_nodes)}
+        genome.connections = {gene.key: gene for gene in islice(connections, num_connections)}
+
+        genomes[key] = genome
+
+    return genomes
+
+
+def save_genomes(filepath: str, genomes: dict[int, neat.DefaultGenome]) -> None:
+    """
+    Save genomes to a file
+
+    :param filepath: the path of the .npz file to write
+    :param genomes: the genomes to save, keyed by genome id
+    """
+    np.savez_compressed(filepath, format_version=np.array(FORMAT_VERSION), **encode_genomes(genomes))
+
+
+def load_genomes(filepath: str, config: neat.Config) -> dict[int, neat.DefaultGenome]:
+    """
+    Load genomes saved by `save_genomes`
+
+    :param filepath: the path of the .npz file to read
+    :param config: the neat configuration the genomes belong to
+    :return: the genomes, keyed by genome id
+    """
+    with np.load(filepath) as data:
+        _check_version(filepath, data)
+        return decode_genomes(dict(data), config)
+
+
+def _check_version(filepath: str, data: np.lib.npyio.NpzFile) -> None:
+    """
+    Convenience function to ensure a file was written with a compatible layout
+
+    :param filepath: the path of the file, for the error message
+    :param data: the arrays of the file
+    """
+    if "format_version" not in data or int(data["format_version"]) != FORMAT_VERSION:
+        raise ValueError(f"[ERROR]: '{filepath}' is not a genome file of format version {FORMAT_VERSION}")
+
+
+def save_population(
+    filepath: str,
+    generation: int,
+    config: neat.Config,
+    population: dict[int, neat.DefaultGenome],
+    species_set: neat.DefaultSpeciesSet,
+    random_state: tuple | None = None
+) -> None:
+    """
+    Save the state of a population to a file (the same state as `neat.Checkpointer`)
+
+    Genomes and species are stored as typed arrays. Only the configuration is pickled, as a single byte array.
+
+    :param filepath: the path of the .npz file to write
+    :param generation: the current generation
+    :param config: the neat configuration
+    :param population: the genomes of the population, keyed by genome id
+    :param species_set: the species of the population
+    :param random_state: the state of the `random` module to restore with the population, not stored if not provided
+    """
+    species = list(species_set.species.values())
+
+    # Representatives are normally members of the population, the others are stored alongside it
+    representatives = {
+        s.representative.key: s.representative for s in species
+        if population.get(s.representative.key) is not s.representative
+    }
+
+    arrays = {
+        "format_version": np.array(FORMAT_VERSION),
+        "generation": np.array(generation, dtype=np.int64),
+        "next_species_key": np.array(_next_index(species_set, "indexer"), dtype=np.int64),
+        "config": np.frombuffer(pickle.dumps(config, protocol=pickle.HIGHEST_PROTOCOL), dtype=np.uint8),
+        "species_keys": np.array([s.key for s in species], dtype=np.int64),
+        "species_created": np.array([s.created for s in species], dtype=np.int64),
+        "species_last_improved": np.array([s.last_improved for s in species], dtype=np.int64),
+        "species_fitness": _optional_floats([s.fitness for s in species]),
+        "species_adjusted_fitness": _optional_floats([s.adjusted_fitness for s in species]),
+        "species_representative": np.array([s.representative.key for s in species], dtype=np.int64),
+        "species_num_members": np.array([len(s.members) for s in species], dtype=np.int64),
+        "species_members": np.array([key for s in species for key in s.members], dtype=np.int64),
+        "species_history_length": np.array([len(s.fitness_history) for s in species], dtype=np.int64),
+        "species_history": np.array([f for s in species for f in s.fitness_history], dtype=np.float64),
+        **encode_genomes(population, "genome"),
+        **encode_genomes(representatives, "representative")
+    }
+
+    if random_state is not None:
+        version, internal_state, gauss_next = random_state
+        arrays["random_version"] = np.array(version, dtype=np.int64)
+        arrays["random_internal_state"] = np.array(internal_state, dtype=np.uint32)
+        arrays["random_gauss_next"] = _optional_floats([gauss_next])
+
+    np.savez_compressed(filepath, **arrays)
+
+
+def load_population(
+    filepath: str
+) -> tuple[int, neat.Config, dict[int, neat.DefaultGenome], neat.DefaultSpeciesSet, tuple | None]:
+    """
+    Load the state of a population saved by `save_population`
+
+    :param filepath: the path of the .npz file to read
+    :return: the generation, the neat configuration, the genomes, the species, and the random state (or None)
+    """
+    with np.load(filepath) as data:
+        _check_version(filepath, data)
+        arrays = dict(data)
+
+    config = pickle.loads(arrays["config"].tobytes())
+    population = decode_genomes(arrays, config, "genome")
+    representatives = decode_genomes(arrays, config, "representative")
+
+    # Rebuild the species, sharing the genome objects of the population like the original species did
+    species_set = config.species_set_type(config.species_set_config, neat.reporting.ReporterSet())
+    species_set.indexer = count(int(arrays["next_species_key"]))
+    members = iter(arrays["species_members"].tolist())
+    history = iter(arrays["species_history"].tolist())
+
+    for key, created, last_improved, fitness, adjusted_fitness, representative, num_members, history_length in zip(
+        arrays["species_keys"].tolist(),
+        arrays["species_created"].tolist(),
+        arrays["species_last_improved"].tolist(),
+        _from_optional_floats(arrays["species_fitness"]),
+        _from_optional_floats(arrays["species_adjusted_fitness"]),
+        arrays["species_representative"].tolist(),
+        arrays["species_num_members"].tolist(),
+        arrays["species_history_length"].tolist()
+    ):
+        species = neat.species.Species(key, created)
+        species.last_improved = last_improved
+        species.fitness = fitness
+        species.adjusted_fitness = adjusted_fitness
+        species.fitness_history = [next(history) for _ in range(history_length)]
+        member_keys = [next(members) for _ in range(num_members)]
+        species.update(
+            representatives.get(representative, population.get(representative)),
+            {member_key: population[member_key] for member_key in member_keys}
+        )
+
+        species_set.species[key] = species
+        species_set.genome_to_species.update((member_key, key) for member_key in member_keys)
+
+    random_state = None
+
+    if "random_version" in arrays:
+        random_state = (
+            int(arrays["random_version"]),
+            tuple(arrays["random_internal_state"].tolist()),
+            _from_optional_floats(arrays["random_gauss_next"])[0]
+        )
+
+    return int(arrays["generation"]), config, population, species_set, random_state
+
+
+class ArrayCheckpointer(neat.Checkpointer):
+    """
+    A `neat.Checkpointer` storing populations as compressed typed arrays (see `save_population`) instead of pickles
+
+    Checkpoints are written to `<filename_prefix><generation>.npz`. They are several times smaller and faster to restore
+    than pickled checkpoints, and restoring one also resumes the genome ids where the saved run left off.
+    """
+    def __init__(
+        self,
+        generation_interval: int | None = 1,
+        time_interval_seconds: float | None = None,
+        filename_prefix: str = "neat-checkpoint-"
+    ) -> None:
+        """
+        Constructor
+
+        :param generation_interval: the maximum number of generations between checkpoints, if not None
+        :param time_interval_seconds: the maximum number of seconds between checkpoints, if not None
+        :param filename_prefix: the prefix of the checkpoint filenames (the generation and extension are appended)
+        """
+        super().__init__(generation_interval, time_interval_seconds, filename_prefix)
+
+    def save_checkpoint(
+        self,
+        config: neat.Config,
+        population: dict[int, neat.DefaultGenome],
+        species_set: neat.DefaultSpeciesSet,
+        generation: int
+    ) -> None:
+        """
+        Save a checkpoint of the population
+
+        :param config: the neat configuration
+        :param population: the genomes of the population, keyed by genome id
+        :param species_set: the species of the population
+        :param generation: the current generation
+        """
+        filepath = f"{self.filename_prefix}{generation}.npz"
+        print(f"Saving checkpoint to {filepath}")
+        save_population(filepath, generation, config, population, species_set, random.getstate())
+
+    @staticmethod
+    def restore_checkpoint(filepath: str) -> neat.Population:
+        """
+        Restore a population from a checkpoint
+
+        :param filepath: the path to the checkpoint
+        :return: the restored population
+        """
+        generation, config, genomes, species_set, random_state = load_population(filepath)
+
+        if random_state is not None:
+            random.setstate(random_state)
+
+        population = neat.Population(config, (genomes, species_set, generation))
+        species_set.reporters = population.reporters
+
+        # Continue numbering new genomes after the newest genome of the checkpoint
+        population.reproduction.genome_indexer = count(max(genomes, default=0) + 1)
+
+        return population
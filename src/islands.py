@@ -0,0 +1,333 @@
+from pyray import *
+from .simulation import Simulation
+from .compiled_track import CompiledTrack
+from .evaluation import EPISODE_TIME, run_episode
+from itertools import count
+from typing import Callable
+import multiprocessing
+import multiprocessing.queues
+import multiprocessing.synchronize
+import neat
+import copy
+import os
+import queue
+import random
+
+# The time between checks for failed islands while waiting for messages, in seconds
+POLL_INTERVAL = 0.5
+
+
+class MigrationReporter(neat.reporting.BaseReporter):
+    """
+    A reporter exchanging champions with the neighbouring islands of an island model
+
+    Every `interval` generations, copies of the best genomes just evaluated are sent to the next island, and the genomes
+    received from the previous island replace the newest offspring of the population before it is evaluated. Migrants
+    get new genome ids from this island, so they never collide with its own genomes.
+
+    Islands exchange migrants in lockstep: an island waits for the migrants of the same generation from the previous
+    island. An island that finishes tells the next island, which then stops waiting for it.
+    """
+    def __init__(
+        self,
+        population: neat.Population,
+        inbox: multiprocessing.queues.Queue,
+        outbox: multiprocessing.queues.Queue,
+        interval: int = 10,
+        num_migrants: int = 1,
+        stop_event: multiprocessing.synchronize.Event | None = None
+    ) -> None:
+        """
+        Constructor
+
+        :param population: the population of this island
+        :param inbox: the queue receiving the migrants of the previous island
+        :param outbox: the queue sending migrants to the next island
+        :param interval: the number of generations between migrations
+        :param num_migrants: the number of champions sent on each migration
+        :param stop_event: an event set when the island model is aborted, to stop waiting for migrants
+        """
+        self._population = population
+        self._inbox = inbox
+        self._outbox = outbox
+        self._interval = interval
+        self._num_migrants = num_migrants
+        self._stop_event = stop_event
+        self._generation = None
+        self._champions = []
+        self._is_source_done = False
+        self._num_received = 0
+
+    def get_num_received(self) -> int:
+        """
+        Get the number of migrants received so far
+
+        :return: the number of migrants
+        """
+        return self._num_received
+
+    def start_generation(self, generation: int) -> None:
+        """
+        Called by neat at the start of every generation
+
+        :param generation: the current generation
+        """
+        self._generation = generation
+
+    def post_evaluate(
+        self,
+        config: neat.Config,
+        population: dict[int, neat.DefaultGenome],
+        species: neat.DefaultSpeciesSet,
+        best_genome: neat.DefaultGenome
+    ) -> None:
+        """
+        Called by neat once the generation is evaluated, keeps copies of the champions of the generation
+
+        :param config: the neat configuration
+        :param population: the evaluated genomes
+        :param species: the species of the population
+        :param best_genome: the best genome of the generation
+        """
+        if self._is_migration_due():
+            genomes = sorted(population.values(), key=lambda genome: genome.fitness, reverse=True)
+            self._champions = [copy.deepcopy(genome) for genome in genomes[:self._num_migrants]]
+
+    def end_generation(
+        self,
+        config: neat.Config,
+        population: dict[int, neat.DefaultGenome],
+        species_set: neat.DefaultSpeciesSet
+    ) -> None:
+        """
+        Called by neat once the next generation is created, exchanges migrants with the neighbouring islands
+
+        :param config: the neat configuration
+        :param population: the genomes of the next generation
+        :param species_set: the species of the next generation
+        """
+        if not self._is_migration_due():
+            return
+
+        self._outbox.put((self._generation, self._champions))
+        self._champions = []
+        migrants = self._receive()
+
+        if migrants:
+            self.add_migrants(config, population, species_set, migrants)
+
+    def close(self) -> None:
+        """
+        Tell the next island that this island is done, so it stops waiting for migrants
+        """
+        self._outbox.put((None, []))
+
+    def add_migrants(
+        self,
+        config: neat.Config,
+        population: dict[int, neat.DefaultGenome],
+        species_set: neat.DefaultSpeciesSet,
+        migrants: list[neat.DefaultGenome]
+    ) -> None:
+        """
+        Replace the newest offspring of a population with migrants and speciate it again
+
+        Genomes carried over from the previous generation (the elites, the only ones with a fitness) are kept
+
+        :param config: the neat configuration
+        :param population: the genomes of the population, updated in place
+        :param species_set: the species of the population
+        :param migrants: the genomes to add
+        """
+        replaceable = sorted((key for key, genome in population.items() if genome.fitness is None), reverse=True)
+
+        for key, migrant in zip(replaceable, migrants):
+            del population[key]
+
+            migrant.key = next(self._population.reproduction.genome_indexer)
+            migrant.fitness = None
+            population[migrant.key] = migrant
+            self._num_received += 1
+
+        # New nodes of this island must not reuse the node ids of the migrants
+        genome_config = config.genome_config
+        node_keys = [node_key for migrant in migrants for node_key in migrant.nodes]
+
+        if genome_config.node_indexer is not None and node_keys:
+            next_node_key = next(genome_config.node_indexer)
+            genome_config.node_indexer = count(max(next_node_key, max(node_keys) + 1))
+
+        species_set.speciate(config, population, self._generation)
+
+    def _is_migration_due(self) -> bool:
+        """
+        Convenience function to check if the current generation ends with a migration
+
+        :return: `True` if migrants are exchanged at the end of this generation, `False` otherwise
+        """
+        return (self._generation + 1) % self._interval == 0
+
+    def _receive(self) -> list[neat.DefaultGenome]:
+        """
+        Convenience function to wait for the migrants of the current generation from the previous island
+
+        :return: the received migrants, empty if the previous island is done
+        """
+        while not self._is_source_done:
+            try:
+                generation, migrants = self._inbox.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                if self._stop_event is not None and self._stop_event.is_set():
+                    raise RuntimeError("[ERROR]: The island model was aborted")
+
+                continue
+
+            if generation is None:
+                self._is_source_done = True
+            elif generation == self._generation:
+                return migrants
+
+        return []
+
+
+def _run_island(
+    index: int,
+    config_filepath: str,
+    track_filepath: str,
+    checkpoint_dir: str,
+    population_loader: Callable[[str, str | None], neat.Population],
+    num_generations: int,
+    inbox: multiprocessing.queues.Queue,
+    outbox: multiprocessing.queues.Queue,
+    results: multiprocessing.queues.Queue,
+    stop_event: multiprocessing.synchronize.Event,
+    migration_interval: int,
+    num_migrants: int,
+    seed: int | None,
+    tick_time: float,
+    episode_time: float,
+    images_dir: str,
+    cache_dir: str
+) -> None:
+    """
+    Convenience function to evolve the population of an island (run in its own process)
+
+    See `run_islands` for the parameters
+    """
+    set_trace_log_level(TraceLogLevel.LOG_ERROR)
+
+    # Forked islands inherit the same random state, so every island is seeded on its own
+    random.seed(None if seed is None else seed + index)
+
+    simulation = Simulation()
+    simulation.load_compiled(track_filepath, images_dir, cache_dir)
+
+    population = population_loader(config_filepath, os.path.join(checkpoint_dir, f"island-{index}"))
+    migration = MigrationReporter(population, inbox, outbox, migration_interval, num_migrants, stop_event)
+
+    # Migrate before the other reporters end the generation, so checkpoints include the migrants
+    population.reporters.reporters.insert(0, migration)
+
+    def evaluate_genomes(genomes: list[tuple[int, neat.DefaultGenome]], config: neat.Config) -> None:
+        """
+        Inner function to evaluate a generation of the island headless
+
+        :param genomes: the (genome_id, genome) for each individual of the population
+        :param config: the current neat configuration
+        """
+        run_episode(simulation, genomes, config, tick_time, episode_time)
+
+    try:
+        best_genome = population.run(evaluate_genomes, num_generations)
+    finally:
+        migration.close()
+
+    results.put((index, best_genome, migration.get_num_received()))
+
+
+def run_islands(
+    islands: list[tuple[str, str]],
+    checkpoint_dir: str,
+    population_loader: Callable[[str, str | None], neat.Population],
+    num_generations: int,
+    migration_interval: int = 10,
+    num_migrants: int = 1,
+    seed: int | None = None,
+    tick_time: float = 1 / 20,
+    episode_time: float = EPISODE_TIME,
+    images_dir: str = "assets/images/",
+    cache_dir: str = "assets/cache/"
+) -> list[tuple[neat.DefaultGenome, int]]:
+    """
+    Evolve several independent populations (islands) in parallel processes, migrating champions between them
+
+    Every island evolves its own population on its own track, evaluated headless, and is checkpointed in its own
+    `island-<index>` directory. The islands form a ring: every `migration_interval` generations each island sends its
+    best genomes to the next one. The configurations of all islands must share the same network inputs and outputs.
+
+    :param islands: the (neat configuration filepath, track filepath) of every island
+    :param checkpoint_dir: the directory holding the checkpoint directories of the islands
+    :param population_loader: creates a population from a configuration filepath and a checkpoint directory (e.g.
+        `load_population_from_config_file` of `main.py`), must be picklable
+    :param num_generations: the number of generations to evolve every island for
+    :param migration_interval: the number of generations between migrations
+    :param num_migrants: the number of champions sent by an island on each migration
+    :param seed: the base seed of the random number generators of the islands (island i uses seed + i), random if not
+        provided
+    :param tick_time: the time between updates in seconds
+    :param episode_time: the simulated duration of each episode in seconds
+    :param images_dir: the directory holding the track images
+    :param cache_dir: the directory to store compiled tracks in
+    :return: the (best genome, number of migrants received) of every island, in the order of the islands
+    """
+    if not islands:
+        raise ValueError("[ERROR]: The island model needs at least one island")
+
+    # Compile every track once up front, so the islands only load the bundles
+    for track_filepath in {track_filepath for _, track_filepath in islands}:
+        CompiledTrack.compile(track_filepath, images_dir, cache_dir)
+
+    context = multiprocessing.get_context()
+    inboxes = [context.Queue() for _ in islands]
+    results = context.Queue()
+    stop_event = context.Event()
+    processes = []
+
+    for index, (config_filepath, track_filepath) in enumerate(islands):
+        process = context.Process(
+            target=_run_island,
+            args=(
+                index, config_filepath, track_filepath, checkpoint_dir, population_loader, num_generations,
+                inboxes[index], inboxes[(index + 1) % len(islands)], results, stop_event, migration_interval,
+                num_migrants if len(islands) > 1 else 0, seed, tick_time, episode_time, images_dir, cache_dir
+            ),
+            name=f"island-{index}"
+        )
+        process.start()
+        processes.append(process)
+
+    # Collect the results, aborting every island if one of them fails
+    island_results = {}
+
+    try:
+        while len(island_results) < len(islands):
+            try:
+                index, best_genome, num_received = results.get(timeout=POLL_INTERVAL)
+                island_results[index] = (best_genome, num_received)
+            except queue.Empty:
+                # Islands that exited cleanly already sent their result, it just hasn't been read yet
+                for index, process in enumerate(processes):
+                    if index not in island_results and process.exitcode not in (None, 0):
+                        raise RuntimeError(f"[ERROR]: Island {index} exited with code {process.exitcode}")
+    finally:
+        stop_event.set()
+
+        # An island may be stuck flushing migrants to an island that already finished
+        for process in processes:
+            process.join(POLL_INTERVAL * 10)
+
+            if process.is_alive():
+                process.terminate()
+                process.join()
+
+    return [island_results[index] for index in range(len(islands))]
@@ -0,0 +1,209 @@
+from pyray import *
+from .simulation import Simulation
+from .compiled_track import CompiledTrack
+from .evaluation import EPISODE_TIME, run_episode
+from .genome_codec import load_population
+from concurrent.futures import ProcessPoolExecutor
+import neat
+import csv
+import glob
+import gzip
+import os
+import pickle
+import re
+
+CHECKPOINT_PATTERN = re.compile(r"neat-checkpoint-(\d+)(\.npz)?$")
+
+# The simulations of the tracks loaded by the current (worker) process, keyed by track filepath
+_simulations = {}
+
+
+def find_checkpoints(checkpoint_dir: str) -> list[str]:
+    """
+    Find the checkpoints in a directory
+
+    :param checkpoint_dir: the directory holding `neat-checkpoint-*` files (pickled or array checkpoints)
+    :return: the paths of the checkpoints, ordered by generation
+    """
+    checkpoints = []
+
+    for filepath in glob.glob(os.path.join(checkpoint_dir, "neat-checkpoint-*")):
+        if (match := CHECKPOINT_PATTERN.search(filepath)) is not None:
+            checkpoints.append((int(match.group(1)), filepath))
+
+    return [filepath for _, filepath in sorted(checkpoints)]
+
+
+def load_best_genomes(
+    checkpoint_path: str,
+    num_best: int | None = None
+) -> tuple[int, neat.Config, list[tuple[int, neat.DefaultGenome]]]:
+    """
+    Load the best genomes of a checkpoint
+
+    A checkpoint holds the population right after reproduction, so only the genomes carried over from the previous
+    generation (the elites) still have a fitness. The best genomes are those, ordered by that fitness. If no genome
+    has a fitness, every genome is considered.
+
+    :param checkpoint_path: the path to the checkpoint
+    :param num_best: the number of genomes to load, all genomes with a fitness if not provided
+    :return: the generation, the neat configuration, and the (genome_id, genome) of the best genomes
+    """
+    # Read the checkpoint directly, restoring a full population would reseed the random number generator and speciate
+    if checkpoint_path.endswith(".npz"):
+        generation, config, population, _, _ = load_population(checkpoint_path)
+    else:
+        with gzip.open(checkpoint_path) as file:
+            generation, config, population, _, _ = pickle.load(file)
+
+    genomes = [(genome_id, genome) for genome_id, genome in population.items() if genome.fitness is not None]
+    genomes.sort(key=lambda item: item[1].fitness, reverse=True)
+
+    if not genomes:
+        genomes = list(population.items())
+
+    return generation, config, genomes[:num_best]
+
+
+def _get_track_names(track_filepaths: list[str]) -> list[str]:
+    """
+    Convenience function to name every track by its path relative to the deepest directory holding all of them
+
+    Tracks in the same directory are named by their file name alone, without the extension
+
+    :param track_filepaths: the paths to the track xml files
+    :return: the name of every track
+    """
+    filepaths = [os.path.abspath(track_filepath) for track_filepath in track_filepaths]
+    root = os.path.commonpath([os.path.dirname(filepath) for filepath in filepaths])
+    track_names = [os.path.splitext(os.path.relpath(filepath, root))[0] for filepath in filepaths]
+
+    if len(set(track_names)) != len(track_names):
+        raise ValueError("[ERROR]: Every track must be listed once, and not differ from another by its extension alone")
+
+    return track_names
+
+
+def _initialize_worker() -> None:
+    """
+    Convenience function to silence raylib in the worker processes
+    """
+    set_trace_log_level(TraceLogLevel.LOG_ERROR)
+
+
+def _evaluate_task(
+    track_filepath: str,
+    genomes: list[tuple[int, neat.DefaultGenome]],
+    config: neat.Config,
+    images_dir: str,
+    cache_dir: str,
+    tick_time: float,
+    episode_time: float
+) -> list[float]:
+    """
+    Convenience function to evaluate genomes on a track (run in a worker process)
+
+    :param track_filepath: the path to the track xml file
+    :param genomes: the (genome_id, genome) to evaluate
+    :param config: the neat configuration of the genomes
+    :param images_dir: the directory holding the track images
+    :param cache_dir: the directory holding the compiled tracks
+    :param tick_time: the time between updates in seconds
+    :param episode_time: the simulated duration of the episode in seconds
+    :return: the fitness of each genome
+    """
+    simulation = _simulations.get(track_filepath)
+
+    if simulation is None:
+        simulation = Simulation()
+        simulation.load_compiled(track_filepath, images_dir, cache_dir)
+        _simulations[track_filepath] = simulation
+
+    run_episode(simulation, genomes, config, tick_time, episode_time)
+    simulation.purge_drivers()
+
+    return [genome.fitness for _, genome in genomes]
+
+
+def evaluate_checkpoints(
+    checkpoint_dir: str,
+    track_filepaths: list[str],
+    output_filepath: str,
+    num_best: int = 3,
+    num_processes: int | None = None,
+    tick_time: float = 1 / 20,
+    episode_time: float = EPISODE_TIME,
+    images_dir: str = "assets/images/",
+    cache_dir: str = "assets/cache/"
+) -> list[dict]:
+    """
+    Evaluate the best genomes of every checkpoint in a directory on a set of tracks and write a ranked leaderboard
+
+    Every (checkpoint, track) pair is evaluated headless in its own task, spread across worker processes. Genomes are
+    ranked by their mean fitness over all tracks. The column of every track is named by its path relative to the
+    deepest directory holding all of the tracks (its file name if they are all in the same directory).
+
+    :param checkpoint_dir: the directory holding `neat-checkpoint-*` files
+    :param track_filepaths: the paths to the track xml files to evaluate on
+    :param output_filepath: the path of the csv leaderboard to write
+    :param num_best: the number of genomes to evaluate per checkpoint
+    :param num_processes: the number of worker processes, the number of cpus if not provided
+    :param tick_time: the time between updates in seconds
+    :param episode_time: the simulated duration of each episode in seconds
+    :param images_dir: the directory holding the track images
+    :param cache_dir: the directory to store compiled tracks in
+    :return: the rows of the leaderboard, best first
+    """
+    checkpoints = find_checkpoints(checkpoint_dir)
+
+    if not checkpoints:
+        raise FileNotFoundError(f"[ERROR]: No checkpoints found in '{checkpoint_dir}'")
+
+    # Tracks sharing a file name in different directories get a column each
+    track_names = _get_track_names(track_filepaths)
+
+    # Compile every track once up front, so the workers only load the bundles
+    for track_filepath in track_filepaths:
+        CompiledTrack.compile(track_filepath, images_dir, cache_dir)
+
+    rows = []
+    futures = []
+
+    with ProcessPoolExecutor(num_processes, initializer=_initialize_worker) as executor:
+        for checkpoint_path in checkpoints:
+            generation, config, genomes = load_best_genomes(checkpoint_path, num_best)
+            checkpoint_rows = [
+                {"checkpoint": os.path.basename(checkpoint_path), "generation": generation, "genome_id": genome_id}
+                for genome_id, _ in genomes
+            ]
+            rows.extend(checkpoint_rows)
+
+            for track_name, track_filepath in zip(track_names, track_filepaths):
+                future = executor.submit(
+                    _evaluate_task, track_filepath, genomes, config, images_dir, cache_dir, tick_time, episode_time
+                )
+                futures.append((checkpoint_rows, track_name, future))
+
+        # Fill in the fitness of every genome on every track as the tasks finish
+        for checkpoint_rows, track_name, future in futures:
+            for row, fitness in zip(checkpoint_rows, future.result()):
+                row[track_name] = fitness
+
+    for row in rows:
+        row["mean_fitness"] = sum(row[track_name] for track_name in track_names) / len(track_names)
+
+    rows.sort(key=lambda row: row["mean_fitness"], reverse=True)
+
+    for rank, row in enumerate(rows, 1):
+        row["rank"] = rank
+
+    # Write the leaderboard
+    os.makedirs(os.path.dirname(output_filepath) or ".", exist_ok=True)
+    fieldnames = ["rank", "checkpoint", "generation", "genome_id", "mean_fitness"] + track_names
+
+    with open(output_filepath, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    return rows
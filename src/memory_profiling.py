@@ -0,0 +1,264 @@
+from .simulation import Simulation
+from .species_set import FastSpeciesSet
+from .evaluation import EPISODE_TIME, run_episode
+from collections import deque
+import neat
+import json
+import os
+import random
+import sys
+import tracemalloc
+
+# The allocations made by the profiling machinery itself are left out of the snapshots
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>")
+)
+
+
+def get_rss() -> int:
+    """
+    Get the resident set size of the current process
+
+    Read from `/proc/self/statm` where available, otherwise the peak resident set size is returned (0 on platforms
+    without either, such as Windows)
+
+    :return: the resident set size in bytes
+    """
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+
+    # The resource module only exists on POSIX platforms
+    try:
+        import resource
+    except ImportError:
+        return 0
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class AllocationReporter(neat.reporting.BaseReporter):
+    """
+    An opt-in reporter sampling the memory of the process every generation
+
+    At the end of every generation, the resident set size and the memory traced by `tracemalloc` are sampled, and a
+    snapshot of the traced allocations is compared to the one of the previous generation. The allocation sites that
+    changed the most are reported, so memory retained from one generation to the next (a leak) shows up within a few
+    generations. The peak traced memory during the generation shows the cost of the allocation hot spots.
+
+    Tracing slows down allocations, so this reporter is meant for diagnosis rather than every training run.
+    """
+    def __init__(
+        self,
+        num_top: int = 10,
+        num_frames: int = 1,
+        filepath: str | None = None,
+        window: int = 100,
+        verbose: bool = True
+    ) -> None:
+        """
+        Constructor
+
+        Starts tracing allocations if they are not traced yet
+
+        :param num_top: the number of allocation sites reported per generation
+        :param num_frames: the number of stack frames identifying an allocation site
+        :param filepath: the path of a file to append the samples of every generation to as json lines, if provided
+        :param window: the number of most recent generations to keep the samples of in memory
+        :param verbose: whether to print a summary of every generation
+        """
+        self._num_top = num_top
+        self._num_frames = num_frames
+        self._filepath = filepath
+        self._verbose = verbose
+        self._samples = deque(maxlen=window)
+        self._generation = None
+        self._snapshot = None
+
+        # Only stop tracing on close if this reporter started it
+        self._started_tracing = not tracemalloc.is_tracing()
+
+        if self._started_tracing:
+            tracemalloc.start(num_frames)
+
+        if filepath is not None:
+            os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+
+    def get_samples(self) -> list[dict]:
+        """
+        Get the samples of the most recent generations
+
+        :return: for every generation, the generation, resident set size, current and peak traced memory (all in bytes),
+            and the allocation sites that changed the most (each a dict of the site, size, size_diff, count and
+            count_diff)
+        """
+        return list(self._samples)
+
+    def get_rss_growth(self, skip: int = 1) -> float:
+        """
+        Estimate how fast the resident set size grows, with a least squares fit over the kept samples
+
+        :param skip: the number of first samples to leave out, as the first generations warm up caches
+        :return: the growth in bytes per generation, 0 if there are not enough samples
+        """
+        samples = list(self._samples)[skip:]
+
+        if len(samples) < 2:
+            return 0.0
+
+        xs = [sample["generation"] for sample in samples]
+        ys = [sample["rss"] for sample in samples]
+        mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+        variance = sum((x - mean_x) ** 2 for x in xs)
+
+        if variance == 0:
+            return 0.0
+
+        return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / variance
+
+    def _take_snapshot(self) -> tracemalloc.Snapshot:
+        """
+        Convenience function to snapshot the traced allocations, leaving out the profiling machinery
+
+        :return: the snapshot
+        """
+        return tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+
+    def start_generation(self, generation: int) -> None:
+        """
+        Called by neat at the start of every generation
+
+        :param generation: the current generation
+        """
+        self._generation = generation
+        tracemalloc.reset_peak()
+
+        if self._snapshot is None:
+            self._snapshot = self._take_snapshot()
+
+    def end_generation(self, config: neat.Config, population: dict, species_set: neat.DefaultSpeciesSet) -> None:
+        """
+        Called by neat at the end of every generation, samples the memory of the process
+
+        :param config: the neat configuration
+        :param population: the genomes of the next generation
+        :param species_set: the species of the next generation
+        """
+        snapshot = self._take_snapshot()
+        key_type = "lineno" if self._num_frames == 1 else "traceback"
+        differences = snapshot.compare_to(self._snapshot, key_type)
+        self._snapshot = snapshot
+
+        current, peak = tracemalloc.get_traced_memory()
+        sample = {
+            "generation": self._generation,
+            "rss": get_rss(),
+            "traced": current,
+            "traced_peak": peak,
+            "top": [
+                {
+                    "site": " <- ".join(f"{frame.filename}:{frame.lineno}" for frame in difference.traceback),
+                    "size": difference.size,
+                    "size_diff": difference.size_diff,
+                    "count": difference.count,
+                    "count_diff": difference.count_diff
+                }
+                for difference in differences[:self._num_top]
+            ]
+        }
+        self._samples.append(sample)
+
+        if self._filepath is not None:
+            with open(self._filepath, "a") as file:
+                file.write(json.dumps(sample) + "\n")
+
+        if self._verbose:
+            print(
+                f"Memory: rss {sample['rss'] / 2 ** 20:.1f} MiB, traced {current / 2 ** 20:.1f} MiB "
+                f"(peak {peak / 2 ** 20:.1f} MiB)"
+            )
+
+            for site in sample["top"][:3]:
+                print(f"    {site['size_diff'] / 1024:+.1f} KiB ({site['count_diff']:+d} blocks) {site['site']}")
+
+    def close(self) -> None:
+        """
+        Stop tracing allocations if this reporter started it
+        """
+        self._snapshot = None
+
+        if self._started_tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def run_soak(
+    config_filepath: str,
+    track_filepath: str,
+    num_generations: int,
+    num_top: int = 10,
+    num_frames: int = 1,
+    output_filepath: str | None = None,
+    seed: int | None = None,
+    tick_time: float = 1 / 20,
+    episode_time: float = EPISODE_TIME,
+    images_dir: str = "assets/images/",
+    cache_dir: str = "assets/cache/",
+    verbose: bool = True
+) -> AllocationReporter:
+    """
+    Train a population headless for many generations while sampling the memory of the process every generation
+
+    Every generation creates and discards a driver and a network per genome, the same way training does, so memory
+    that creeps up over the run points at objects kept alive from one generation to the next.
+
+    :param config_filepath: the path to the neat configuration file
+    :param track_filepath: the path to the track xml file
+    :param num_generations: the number of generations to run
+    :param num_top: the number of allocation sites reported per generation
+    :param num_frames: the number of stack frames identifying an allocation site
+    :param output_filepath: the path of a file to append the samples to as json lines, if provided
+    :param seed: the seed of the random number generator, random if not provided
+    :param tick_time: the time between updates in seconds
+    :param episode_time: the simulated duration of each episode in seconds
+    :param images_dir: the directory holding the track images
+    :param cache_dir: the directory to store compiled tracks in
+    :param verbose: whether to print a summary of every generation
+    :return: the reporter holding the samples
+    """
+    random.seed(seed)
+    neat_types = (neat.DefaultGenome, neat.DefaultReproduction, FastSpeciesSet, neat.DefaultStagnation)
+    config = neat.Config(*neat_types, config_filepath)
+    population = neat.Population(config)
+
+    simulation = Simulation()
+    simulation.load_compiled(track_filepath, images_dir, cache_dir)
+
+    def evaluate_genomes(genomes: list[tuple[int, neat.DefaultGenome]], config: neat.Config) -> None:
+        """
+        Inner function to evaluate a generation headless
+
+        :param genomes: the (genome_id, genome) for each individual of the population
+        :param config: the current neat configuration
+        """
+        run_episode(simulation, genomes, config, tick_time, episode_time)
+        simulation.purge_drivers()
+
+    # Only start tracing once the track is loaded, so the samples start from a warm process
+    reporter = AllocationReporter(num_top, num_frames, output_filepath, max(num_generations, 1), verbose)
+    population.add_reporter(reporter)
+
+    if verbose:
+        population.add_reporter(neat.StdOutReporter(False))
+
+    try:
+        population.run(evaluate_genomes, num_generations)
+    finally:
+        reporter.close()
+
+    return reporter
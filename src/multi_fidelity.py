@@ -0,0 +1,153 @@
+from .simulation import Simulation
+from .track import Track
+from .sensors import RaySensor, SparseRaySensor
+from .evaluation import EPISODE_TIME, run_episode
+import neat
+import math
+import numpy as np
+
+
+def downsample_mask(track: Track, factor: int) -> np.ndarray:
+    """
+    Build a coarser occupancy mask of a track, keeping the pixel at the center of every block of pixels
+
+    The coarse mask covers the same world area, so the track maps positions onto it the same way
+
+    :param track: the track holding the full-resolution mask (an array or a tiled mask)
+    :param factor: the width and height of the blocks of pixels merged into one coarse pixel
+    :return: the coarse mask indexed as [y, x]
+    """
+    mask = track.get_mask()
+    height, width = mask.shape
+    ys = np.minimum(np.arange(0, height, factor) + factor // 2, height - 1)
+    xs = np.minimum(np.arange(0, width, factor) + factor // 2, width - 1)
+
+    return np.asarray(mask[ys[:, None], xs[None, :]], dtype=bool)
+
+
+class MultiFidelityEvaluator:
+    """
+    Evaluates genomes in two stages: a cheap screening of the whole population, then full-fidelity scoring of the best
+
+    Every genome is first screened on a copy of the track with a downsampled mask, a coarser tick, fewer cast rays, and
+    a shorter episode. The top fraction by screening score is then scored exactly like `run_episode` scores genomes at
+    full fidelity.
+
+    The final fitness of a promoted genome is its full-fidelity score. The final fitness of a genome that was screened
+    out is its screening score rescaled onto the full-fidelity scale: the lowest full-fidelity score of the promoted
+    genomes times its screening score over the lowest screening score of the promoted genomes. Screened-out genomes
+    therefore keep their screening order and never rank above a promoted genome.
+    """
+    def __init__(
+        self,
+        track_filepath: str,
+        promote_fraction: float = 0.25,
+        min_promoted: int = 1,
+        tick_time: float = 1 / 20,
+        episode_time: float = EPISODE_TIME,
+        screen_tick_time: float = 1 / 10,
+        screen_episode_time: float = 15,
+        screen_ray_stride: int = 3,
+        screen_downsample: int = 2,
+        images_dir: str = "assets/images/",
+        cache_dir: str = "assets/cache/"
+    ) -> None:
+        """
+        Constructor
+
+        :param track_filepath: the path to the track xml file
+        :param promote_fraction: the fraction of each generation scored at full fidelity
+        :param min_promoted: the minimum number of genomes scored at full fidelity
+        :param tick_time: the time between updates at full fidelity in seconds
+        :param episode_time: the simulated duration of a full-fidelity episode in seconds
+        :param screen_tick_time: the time between updates while screening in seconds
+        :param screen_episode_time: the simulated duration of a screening episode in seconds
+        :param screen_ray_stride: cast one ray out of this many while screening (see `SparseRaySensor`)
+        :param screen_downsample: the factor the track mask is downsampled by while screening
+        :param images_dir: the directory holding the track images
+        :param cache_dir: the directory to store compiled tracks in
+        """
+        if not 0 < promote_fraction <= 1:
+            raise ValueError("[ERROR]: The promoted fraction must be in (0, 1]")
+
+        self._promote_fraction = promote_fraction
+        self._min_promoted = min_promoted
+        self._tick_time = tick_time
+        self._episode_time = episode_time
+        self._screen_tick_time = screen_tick_time
+        self._screen_episode_time = screen_episode_time
+
+        self._simulation = Simulation()
+        self._simulation.load_compiled(track_filepath, images_dir, cache_dir)
+        self._sensor = RaySensor()
+
+        self._screen_simulation = Simulation()
+        self._screen_simulation.load_compiled(track_filepath, images_dir, cache_dir)
+        screen_track = self._screen_simulation.get_track()
+        screen_track.set_mask(downsample_mask(screen_track, screen_downsample))
+        self._screen_sensor = SparseRaySensor(self._sensor.get_num_casts(), self._sensor.get_fov(), screen_ray_stride)
+
+        self._screening_fitness = {}
+        self._promoted = []
+
+    def get_num_promoted(self, num_genomes: int) -> int:
+        """
+        Get the number of genomes of a generation scored at full fidelity
+
+        :param num_genomes: the number of genomes in the generation
+        :return: the number of promoted genomes
+        """
+        return min(num_genomes, max(self._min_promoted, math.ceil(self._promote_fraction * num_genomes)))
+
+    def get_screening_fitness(self) -> dict[int, float]:
+        """
+        Get the screening scores of the last evaluated generation
+
+        :return: the screening score of every genome, keyed by genome id
+        """
+        return self._screening_fitness
+
+    def get_promoted(self) -> list[int]:
+        """
+        Get the genomes of the last evaluated generation that were scored at full fidelity
+
+        :return: the ids of the promoted genomes, best screening score first
+        """
+        return self._promoted
+
+    def evaluate(self, genomes: list[tuple[int, neat.DefaultGenome]], config: neat.Config) -> None:
+        """
+        Evaluate a generation, a fitness function for `neat.Population.run`
+
+        :param genomes: the (genome_id, genome) for each individual of the population
+        :param config: the current neat configuration
+        """
+        if not genomes:
+            return
+
+        # Screen the whole generation
+        run_episode(
+            self._screen_simulation, genomes, config, self._screen_tick_time, self._screen_episode_time,
+            self._screen_sensor
+        )
+        self._screen_simulation.purge_drivers()
+        self._screening_fitness = {genome_id: genome.fitness for genome_id, genome in genomes}
+
+        # Score the best of the screening at full fidelity
+        ranked = sorted(genomes, key=lambda item: item[1].fitness, reverse=True)
+        num_promoted = self.get_num_promoted(len(genomes))
+        promoted, screened_out = ranked[:num_promoted], ranked[num_promoted:]
+        self._promoted = [genome_id for genome_id, _ in promoted]
+
+        run_episode(self._simulation, promoted, config, self._tick_time, self._episode_time, self._sensor)
+        self._simulation.purge_drivers()
+
+        # Rescale the screening scores of the others below the promoted genomes
+        screen_threshold = min(self._screening_fitness[genome_id] for genome_id in self._promoted)
+        full_floor = min(genome.fitness for _, genome in promoted)
+
+        for genome_id, genome in screened_out:
+            if screen_threshold > 0:
+                genome.fitness = full_floor * self._screening_fitness[genome_id] / screen_threshold
+            else:
+                genome.fitness = min(full_floor, 0.0)
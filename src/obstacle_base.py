@@ -1,11 +1,17 @@
 from pyray import *
 from .sim_object import SimObject
 from .texture_pack import TexturePack
+from math import cos, sin
+import numpy as np
 
 
 class ObstacleBase(SimObject):
     """
     The base class for all obstacles
+
+    The alpha channel of the obstacle's image is kept as a boolean mask, and the world-space bounding box and rotation
+    terms of the obstacle are cached until its position, angle, or size changes. Obstacles without a loaded image are
+    solid rectangles.
     """
     def __init__(self, size: Vector2, texture_filename: str) -> None:
         """
@@ -13,6 +19,67 @@ class ObstacleBase(SimObject):
         """
         super().__init__(size, texture_filename)
         self._image = TexturePack.get_image(texture_filename)
+        self._alpha_mask = self._load_alpha_mask(self._image)
+        self._pose = None
+
+    @staticmethod
+    def _load_alpha_mask(image: Image) -> np.ndarray:
+        """
+        Convenience function to extract which pixels of an image are opaque
+
+        :param image: the image to extract the mask from (None if not loaded)
+        :return: an array indexed as [y, x] that is `True` wherever the image is not transparent
+        """
+        if image is None:
+            return np.ones((1, 1), dtype=bool)
+
+        colors = load_image_colors(image)
+        pixels = np.frombuffer(ffi.buffer(colors, image.width * image.height * 4), dtype=np.uint8)
+        alpha_mask = pixels.reshape(image.height, image.width, 4)[:, :, 3] != 0
+        unload_image_colors(colors)
+
+        return alpha_mask
+
+    def get_alpha_mask(self) -> np.ndarray:
+        """
+        Get the mask of the opaque pixels of this obstacle's image
+
+        :return: an array indexed as [y, x] that is `True` wherever the image is not transparent
+        """
+        return self._alpha_mask
+
+    def get_bounding_box(self) -> Rectangle:
+        """
+        Get the world-space bounding box of this obstacle
+
+        :return: a rectangle holding every point that may hit this obstacle
+        """
+        self._update_pose()
+        return Rectangle(self._min_x, self._min_y, self._max_x - self._min_x, self._max_y - self._min_y)
+
+    def _update_pose(self) -> None:
+        """
+        Convenience function to recompute the bounding box and rotation terms if this obstacle moved or changed size
+        """
+        pos, size = self.get_position(), self.get_size()
+        pose = (pos.x, pos.y, self.get_angle(), size.x, size.y)
+
+        if pose == self._pose:
+            return
+
+        self._pose = pose
+        self._cos = cos(self.get_angle())
+        self._sin = sin(self.get_angle())
+
+        # Pixel coordinates are truncated towards zero, so points up to one pixel before the image still hit its first
+        # row/column; the box is padded by a pixel to keep them
+        height, width = self._alpha_mask.shape
+        half_width = size.x / 2 + size.x / width
+        half_height = size.y / 2 + size.y / height
+        extent_x = abs(self._cos) * half_width + abs(self._sin) * half_height
+        extent_y = abs(self._sin) * half_width + abs(self._cos) * half_height
+        self._min_x, self._max_x = pos.x - extent_x, pos.x + extent_x
+        self._min_y, self._max_y = pos.y - extent_y, pos.y + extent_y
 
     def hit_test(self, point: Vector2) -> bool:
         """
@@ -21,17 +88,53 @@ class ObstacleBase(SimObject):
         :param point: the point to check
         :return: `True` if the point is contained in this obstacle, `False` otherwise
         """
+        self._update_pose()
+
+        # Points outside the bounding box can't hit this obstacle
+        if not (self._min_x <= point.x <= self._max_x and self._min_y <= point.y <= self._max_y):
+            return False
+
         # Calculate the offset from this obstacle's center, aligned with this obstacle's orientation
-        offset = vector2_rotate(vector2_subtract(point, self.get_position()), -self.get_angle())
+        dx, dy = point.x - self._pose[0], point.y - self._pose[1]
+        offset_x = dx * self._cos + dy * self._sin
+        offset_y = dy * self._cos - dx * self._sin
 
         # Calculate the coordinates of the corresponding pixel within the image
-        size = self.get_size()
-        pixel_x = int(self._image.width * (0.5 + offset.x / size.x))
-        pixel_y = int(self._image.height * (0.5 + offset.y / size.y))
+        height, width = self._alpha_mask.shape
+        pixel_x = int(width * (0.5 + offset_x / self._pose[3]))
+        pixel_y = int(height * (0.5 + offset_y / self._pose[4]))
 
         # If the pixel is not a valid location, it's not a hit
-        if pixel_x < 0 or pixel_x >= self._image.width or pixel_y < 0 or pixel_y >= self._image.height:
+        if pixel_x < 0 or pixel_x >= width or pixel_y < 0 or pixel_y >= height:
             return False
 
         # Otherwise, check that the pixel is not transparent
-        return get_image_color(self._image, pixel_x, pixel_y).a != 0
+        return bool(self._alpha_mask[pixel_y, pixel_x])
+
+    def hit_test_batch(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """
+        Check which of many points are contained in this object
+
+        :param xs: the x positions of the points in world space
+        :param ys: the y positions of the points in world space
+        :return: `True` for each point contained in this obstacle, `False` otherwise
+        """
+        self._update_pose()
+        xs, ys = np.broadcast_arrays(np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64))
+        hits = np.zeros(xs.shape, dtype=bool)
+
+        # Only the points inside the bounding box need to be looked up
+        candidates = np.nonzero(
+            (xs >= self._min_x) & (xs <= self._max_x) & (ys >= self._min_y) & (ys <= self._max_y)
+        )
+        dx, dy = xs[candidates] - self._pose[0], ys[candidates] - self._pose[1]
+        offset_x = dx * self._cos + dy * self._sin
+        offset_y = dy * self._cos - dx * self._sin
+
+        height, width = self._alpha_mask.shape
+        pixel_x = np.trunc(width * (0.5 + offset_x / self._pose[3])).astype(np.int64)
+        pixel_y = np.trunc(height * (0.5 + offset_y / self._pose[4])).astype(np.int64)
+        inside = (pixel_x >= 0) & (pixel_x < width) & (pixel_y >= 0) & (pixel_y < height)
+
+        hits[tuple(axis[inside] for axis in candidates)] = self._alpha_mask[pixel_y[inside], pixel_x[inside]]
+        return hits
@@ -0,0 +1,494 @@
+from .simulation import Simulation
+from .evaluation import EPISODE_TIME, run_episode
+from .fitness_journal import FitnessJournal
+from collections import deque
+import neat
+import hashlib
+import hmac
+import os
+import pickle
+import secrets
+import selectors
+import socket
+import struct
+import threading
+import time
+import traceback
+
+# Every message is a pickled tuple prefixed by its length. Unpickling runs arbitrary code, so no message is unpickled
+# before both ends proved they hold the shared key (see `_authenticate`)
+MESSAGE_HEADER = struct.Struct("!Q")
+
+# The environment variable the shared key is read from when none is given
+AUTHKEY_ENV = "NEAT_DRIVER_AUTHKEY"
+CHALLENGE_SIZE = 32
+HANDSHAKE_TIMEOUT = 10
+
+
+def send_message(sock: socket.socket, message: tuple) -> None:
+    """
+    Send a message over a socket
+
+    :param sock: the socket to send over
+    :param message: the message to send
+    """
+    data = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    sock.sendall(MESSAGE_HEADER.pack(len(data)) + data)
+
+
+def receive_message(sock: socket.socket) -> tuple:
+    """
+    Receive a message from a socket
+
+    :param sock: the socket to receive from
+    :return: the received message
+    """
+    length, = MESSAGE_HEADER.unpack(_receive_exactly(sock, MESSAGE_HEADER.size))
+    return pickle.loads(_receive_exactly(sock, length))
+
+
+def _receive_exactly(sock: socket.socket, size: int) -> bytes:
+    """
+    Convenience function to receive an exact number of bytes from a socket
+
+    :param sock: the socket to receive from
+    :param size: the number of bytes to receive
+    :return: the received bytes
+    """
+    data = bytearray()
+
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+
+        if not chunk:
+            raise ConnectionError("[ERROR]: Connection closed by the peer")
+
+        data += chunk
+
+    return bytes(data)
+
+
+def _authenticate(sock: socket.socket, authkey: bytes, is_coordinator: bool) -> None:
+    """
+    Convenience function to authenticate both ends of a new connection with a shared key
+
+    Each end sends a random challenge and checks that the other answers it with the HMAC of the challenge under the
+    shared key. Only raw bytes are exchanged, nothing is unpickled before both ends are authenticated.
+
+    :param sock: the socket of the new connection
+    :param authkey: the key shared by the coordinator and its workers
+    :param is_coordinator: whether this end is the coordinator (which sends the first challenge)
+    """
+    def answer(role: bytes, challenge: bytes) -> bytes:
+        return hmac.new(authkey, role + challenge, hashlib.sha256).digest()
+
+    own_role, peer_role = (b"coordinator", b"worker") if is_coordinator else (b"worker", b"coordinator")
+    challenge = secrets.token_bytes(CHALLENGE_SIZE)
+
+    if is_coordinator:
+        sock.sendall(challenge)
+        peer_challenge = _receive_exactly(sock, CHALLENGE_SIZE)
+        sock.sendall(answer(own_role, peer_challenge))
+    else:
+        peer_challenge = _receive_exactly(sock, CHALLENGE_SIZE)
+        sock.sendall(challenge)
+        sock.sendall(answer(own_role, peer_challenge))
+
+    if not hmac.compare_digest(_receive_exactly(sock, hashlib.sha256().digest_size), answer(peer_role, challenge)):
+        raise PermissionError("[ERROR]: The peer failed to authenticate")
+
+
+def _resolve_authkey(authkey: bytes | str | None) -> bytes:
+    """
+    Convenience function to get the shared key, from the environment if not provided
+
+    :param authkey: the shared key, if provided
+    :return: the shared key as bytes
+    """
+    if authkey is None:
+        authkey = os.environ.get(AUTHKEY_ENV)
+
+    if not authkey:
+        raise ValueError(f"[ERROR]: A shared key is required, pass one or set the {AUTHKEY_ENV} environment variable")
+
+    return authkey.encode() if isinstance(authkey, str) else authkey
+
+
+class _WorkerConnection:
+    """
+    The coordinator's view of a connected worker
+    """
+    def __init__(self, sock: socket.socket, address: tuple) -> None:
+        """
+        Constructor
+
+        :param sock: the socket connected to the worker
+        :param address: the address of the worker
+        """
+        self.sock = sock
+        self.address = address
+        self.config = None
+
+
+class RemoteEvaluator:
+    """
+    Coordinates the evaluation of genomes across worker processes, possibly on other hosts
+
+    Workers connect to the coordinator (see `run_worker`), authenticate with the shared key, receive the neat
+    configuration and the track to drive on, and then evaluate batches of genomes in headless simulations. A worker
+    that disconnects or misses the deadline of its batch is dropped and its batch is handed to another worker. A batch
+    that failed on too many attempts (e.g. a genome that makes the simulation raise) fails the whole evaluation.
+    """
+    POLL_INTERVAL = 0.1
+
+    def __init__(
+        self,
+        track_filepath: str,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        batch_size: int = 10,
+        timeout: float = 300,
+        tick_time: float = 1 / 20,
+        episode_time: float = EPISODE_TIME,
+        journal: FitnessJournal | None = None,
+        authkey: bytes | str | None = None,
+        max_attempts: int = 3
+    ) -> None:
+        """
+        Constructor
+
+        Starts listening for workers immediately
+
+        :param track_filepath: path to the xml file describing the track to use (as seen by the workers)
+        :param host: the interface to listen on (only this host by default, workers on other hosts need a public
+            interface such as "0.0.0.0")
+        :param port: the port to listen on (0 picks a free port)
+        :param batch_size: the number of genomes sent to a worker at once
+        :param timeout: the number of seconds a worker has to return the results of a batch
+        :param tick_time: the time between updates in seconds
+        :param episode_time: the simulated duration of each episode in seconds
+        :param journal: a journal to record the results of every batch in as soon as it returns, if provided (see
+            `FitnessJournal.wrap` to skip the genomes it already holds)
+        :param authkey: the key shared with the workers, read from the `NEAT_DRIVER_AUTHKEY` environment variable if not
+            provided
+        :param max_attempts: the number of times a batch is attempted before the evaluation fails
+        """
+        self._track_filepath = track_filepath
+        self._authkey = _resolve_authkey(authkey)
+        self._max_attempts = max_attempts
+        self._journal = journal
+        self._batch_size = batch_size
+        self._timeout = timeout
+        self._tick_time = tick_time
+        self._episode_time = episode_time
+
+        self._workers = []
+        self._new_workers = []
+        self._lock = threading.Lock()
+
+        # Counters read by telemetry (see `Telemetry.watch_evaluator`)
+        self._num_ticks = 0
+        self._num_busy_workers = 0
+        self._busy_time = 0.0
+
+        self._server = socket.create_server((host, port))
+        self._accept_thread = threading.Thread(target=self._accept_workers, daemon=True)
+        self._accept_thread.start()
+
+    def get_address(self) -> tuple[str, int]:
+        """
+        Get the address workers should connect to
+
+        :return: the (host, port) the coordinator is listening on
+        """
+        return self._server.getsockname()[:2]
+
+    def get_num_workers(self) -> int:
+        """
+        Get the number of workers currently connected
+
+        :return: the number of connected workers
+        """
+        with self._lock:
+            return len(self._workers) + len(self._new_workers)
+
+    def get_num_ticks(self) -> int:
+        """
+        Get the number of simulation updates run by all workers so far
+
+        :return: the number of ticks
+        """
+        return self._num_ticks
+
+    def get_num_busy_workers(self) -> int:
+        """
+        Get the number of workers currently evaluating a batch
+
+        :return: the number of busy workers
+        """
+        return self._num_busy_workers
+
+    def get_busy_time(self) -> float:
+        """
+        Get the total time workers have spent evaluating batches so far
+
+        :return: the busy time summed over all workers in seconds
+        """
+        return self._busy_time
+
+    def _accept_workers(self) -> None:
+        """
+        Accept incoming worker connections until the coordinator is closed
+        """
+        while True:
+            try:
+                sock, address = self._server.accept()
+            except OSError:
+                return
+
+            # Drop peers that can't prove they hold the shared key before reading any message from them
+            try:
+                sock.settimeout(HANDSHAKE_TIMEOUT)
+                _authenticate(sock, self._authkey, True)
+            except (OSError, PermissionError):
+                print(f"[WARNING]: Rejected unauthenticated connection from {address}")
+                sock.close()
+                continue
+
+            sock.settimeout(self._timeout)
+
+            with self._lock:
+                self._new_workers.append(_WorkerConnection(sock, address))
+
+    def _drop_worker(self, worker: _WorkerConnection) -> None:
+        """
+        Disconnect from a worker that failed
+
+        :param worker: the worker to drop
+        """
+        print(f"[WARNING]: Lost worker {worker.address}, reassigning its work")
+        worker.sock.close()
+
+    def evaluate(self, genomes: list[tuple[int, neat.DefaultGenome]], config: neat.Config) -> None:
+        """
+        Evaluate the genomes on the connected workers
+
+        This blocks until every genome has been evaluated, waiting for workers to connect if none are available. A batch
+        is reassigned when its worker fails, reports an error, or misses the deadline, up to `max_attempts` attempts.
+
+        :param genomes: the (genome_id, genome) for each individual of the population
+        :param config: the current neat configuration
+        """
+        genomes_by_id = dict(genomes)
+
+        # Every pending batch is held with the number of attempts that failed so far
+        pending = deque((genomes[i:i + self._batch_size], 0) for i in range(0, len(genomes), self._batch_size))
+        remaining = len(pending)
+        in_flight = {}
+        idle = self._workers
+        selector = selectors.DefaultSelector()
+
+        def retry(batch: list[tuple[int, neat.DefaultGenome]], num_failures: int, reason: str) -> None:
+            """
+            Inner function to queue a failed batch again, unless it failed too many times
+
+            :param batch: the batch that failed
+            :param num_failures: the number of failed attempts before this one
+            :param reason: the reason of the failure
+            """
+            if num_failures + 1 >= self._max_attempts:
+                genome_ids = [genome_id for genome_id, _ in batch]
+                raise RuntimeError(
+                    f"[ERROR]: The batch of genomes {genome_ids} failed {num_failures + 1} times, last: {reason}"
+                )
+
+            pending.append((batch, num_failures + 1))
+
+        try:
+            while remaining > 0:
+                with self._lock:
+                    idle.extend(self._new_workers)
+                    self._new_workers.clear()
+
+                # Hand out batches to the idle workers, shipping the configuration first if they haven't seen it yet
+                while pending and idle:
+                    worker = idle.pop()
+                    batch, num_failures = pending.popleft()
+
+                    try:
+                        if worker.config is not config:
+                            send_message(worker.sock, (
+                                "config", config, self._track_filepath, self._tick_time, self._episode_time
+                            ))
+                            worker.config = config
+
+                        send_message(worker.sock, ("evaluate", batch))
+                    except OSError:
+                        self._drop_worker(worker)
+                        pending.appendleft((batch, num_failures))
+                        continue
+
+                    start_time = time.monotonic()
+                    in_flight[worker] = (batch, num_failures, start_time + self._timeout, start_time)
+                    selector.register(worker.sock, selectors.EVENT_READ, worker)
+
+                self._num_busy_workers = len(in_flight)
+
+                # Without any work in flight, wait for a worker to connect
+                if not in_flight:
+                    time.sleep(self.POLL_INTERVAL)
+                    continue
+
+                # Collect the results of the finished batches
+                for key, _ in selector.select(self.POLL_INTERVAL):
+                    worker = key.data
+                    batch, num_failures, _, start_time = in_flight.pop(worker)
+                    selector.unregister(worker.sock)
+
+                    try:
+                        reply = receive_message(worker.sock)
+                    except (OSError, EOFError, pickle.UnpicklingError) as error:
+                        self._drop_worker(worker)
+                        retry(batch, num_failures, f"lost worker {worker.address} ({error!r})")
+                        continue
+                    finally:
+                        self._busy_time += time.monotonic() - start_time
+
+                    # The worker survived an error in the batch, so it can take other work
+                    if reply[0] == "error":
+                        idle.append(worker)
+                        retry(batch, num_failures, f"worker {worker.address} raised:\n{reply[1]}")
+                        continue
+
+                    _, results, num_ticks = reply
+
+                    for genome_id, fitness in results:
+                        genomes_by_id[genome_id].fitness = fitness
+
+                    if self._journal is not None:
+                        self._journal.record(batch)
+
+                    self._num_ticks += num_ticks
+
+                    remaining -= 1
+                    idle.append(worker)
+
+                # Reassign the batches of workers that missed their deadline
+                now = time.monotonic()
+
+                for worker, (batch, num_failures, deadline, start_time) in list(in_flight.items()):
+                    if now > deadline:
+                        del in_flight[worker]
+                        selector.unregister(worker.sock)
+                        self._drop_worker(worker)
+                        self._busy_time += now - start_time
+                        retry(batch, num_failures, f"worker {worker.address} missed the deadline")
+
+                self._num_busy_workers = len(in_flight)
+        finally:
+            # Workers still busy would answer a batch of this evaluation later on, so drop them
+            for worker in in_flight:
+                self._drop_worker(worker)
+
+            self._num_busy_workers = 0
+            selector.close()
+            self._workers = idle
+
+    def close(self) -> None:
+        """
+        Stop listening for workers and ask every connected worker to shut down
+        """
+        self._server.close()
+
+        with self._lock:
+            workers = self._workers + self._new_workers
+            self._workers = []
+            self._new_workers = []
+
+        for worker in workers:
+            try:
+                send_message(worker.sock, ("shutdown",))
+            except OSError:
+                pass
+
+            worker.sock.close()
+
+
+def run_worker(
+    host: str,
+    port: int,
+    images_dir: str = "assets/images/",
+    cache_dir: str = "assets/cache/",
+    connect_timeout: float = 60,
+    authkey: bytes | str | None = None
+) -> None:
+    """
+    Connect to a coordinator and evaluate the batches of genomes it sends until it shuts down
+
+    A batch that raises is reported back to the coordinator as an error, and the worker carries on
+
+    :param host: the host of the coordinator
+    :param port: the port of the coordinator
+    :param images_dir: the directory holding the track images
+    :param cache_dir: the directory to store compiled tracks in
+    :param connect_timeout: the number of seconds to keep retrying the connection to the coordinator
+    :param authkey: the key shared with the coordinator, read from the `NEAT_DRIVER_AUTHKEY` environment variable if
+        not provided
+    """
+    authkey = _resolve_authkey(authkey)
+
+    # The coordinator may not be up yet, so keep retrying for a while
+    give_up_time = time.monotonic() + connect_timeout
+
+    while True:
+        try:
+            sock = socket.create_connection((host, port))
+            break
+        except OSError:
+            if time.monotonic() > give_up_time:
+                raise
+
+            time.sleep(1)
+
+    simulation = None
+    loaded_track_filepath = None
+
+    with sock:
+        # Prove we hold the shared key, and check that the coordinator does, before reading any message
+        sock.settimeout(HANDSHAKE_TIMEOUT)
+        _authenticate(sock, authkey, False)
+        sock.settimeout(None)
+
+        while True:
+            try:
+                message = receive_message(sock)
+            except (OSError, EOFError):
+                return
+
+            if message[0] == "config":
+                _, config, track_filepath, tick_time, episode_time = message
+
+                if track_filepath != loaded_track_filepath:
+                    simulation = Simulation()
+                    simulation.load_compiled(track_filepath, images_dir, cache_dir)
+                    loaded_track_filepath = track_filepath
+
+            elif message[0] == "evaluate":
+                _, batch = message
+
+                # Report a batch that raises instead of dying, the coordinator decides whether to retry it
+                try:
+                    num_ticks = simulation.get_num_ticks()
+                    run_episode(simulation, batch, config, tick_time, episode_time)
+                    results = [(genome_id, genome.fitness) for genome_id, genome in batch]
+                except Exception:
+                    if simulation is not None:
+                        simulation.purge_drivers()
+
+                    send_message(sock, ("error", traceback.format_exc()))
+                    continue
+
+                send_message(sock, ("result", results, simulation.get_num_ticks() - num_ticks))
+
+            elif message[0] == "shutdown":
+                return
@@ -0,0 +1,272 @@
+from neat.config import DefaultClassConfig
+from concurrent.futures import ProcessPoolExecutor
+from itertools import count, repeat
+import neat
+import copy
+import os
+import random
+
+
+class _DeferredGenome:
+    """
+    Stands in for a child genome while `DefaultReproduction.reproduce` picks its parents, recording them instead of
+    running crossover and mutation
+    """
+    def __init__(self, key: int) -> None:
+        """
+        Constructor
+
+        :param key: the genome id of the child
+        """
+        self.key = key
+        self.parents = None
+        self.fitness = None
+
+    def configure_crossover(
+        self,
+        genome1: neat.DefaultGenome,
+        genome2: neat.DefaultGenome,
+        config: neat.genome.DefaultGenomeConfig
+    ) -> None:
+        """
+        Record the parents of the child
+
+        :param genome1: the first parent
+        :param genome2: the second parent
+        :param config: the genome configuration
+        """
+        self.parents = (genome1, genome2)
+
+    def mutate(self, config: neat.genome.DefaultGenomeConfig) -> None:
+        """
+        Mutation happens when the child is created, in `_create_offspring`
+
+        :param config: the genome configuration
+        """
+        pass
+
+
+def _create_offspring(
+    genome_type: type,
+    genome_config: neat.genome.DefaultGenomeConfig,
+    tasks: list[tuple[int, neat.DefaultGenome, neat.DefaultGenome, int, int]]
+) -> list[neat.DefaultGenome]:
+    """
+    Convenience function to create a batch of children by crossover and mutation (run in a worker process)
+
+    :param genome_type: the genome class
+    :param genome_config: the genome configuration
+    :param tasks: the (genome id, first parent, second parent, seed, reserved node key) of every child
+    :return: the children
+    """
+    children = []
+
+    for key, parent1, parent2, seed, node_key in tasks:
+        # Every child has its own random sequence and node key, independent of the other children of the batch
+        random.seed(seed)
+        genome_config.node_indexer = iter((node_key,))
+
+        child = genome_type(key)
+        child.configure_crossover(parent1, parent2, genome_config)
+
+        try:
+            child.mutate(genome_config)
+        except StopIteration:
+            raise RuntimeError("[ERROR]: A single mutation added more than one node") from None
+
+        children.append(child)
+
+    return children
+
+
+class ParallelReproduction(neat.DefaultReproduction):
+    """
+    A drop-in replacement for `neat.DefaultReproduction` creating the offspring in parallel worker processes
+
+    Parents are still chosen by `DefaultReproduction.reproduce` in the main process, then the children are created by
+    crossover and mutation in batches spread across worker processes. Every child is seeded with its own seed drawn in
+    the main process and reserves a single node key for the node a mutation may add. Reserved keys that end up used are
+    renumbered in offspring order afterwards. The offspring therefore only depend on the main random state, whatever the
+    number of workers (one worker creates them in the main process).
+
+    It shares the [DefaultReproduction] section of the neat configuration file with `neat.DefaultReproduction`, so
+    switching between the two schemes never leaves a stale copy of the parameters behind. The number of workers (0 for
+    one per cpu) and the number of children per task are set through the constructor or the setters.
+    """
+    @classmethod
+    def parse_config(cls, param_dict: dict) -> DefaultClassConfig:
+        """
+        Parse the [DefaultReproduction] section of a neat configuration file
+
+        :param param_dict: the values of the section, keyed by parameter name
+        :return: the reproduction configuration
+        """
+        return neat.DefaultReproduction.parse_config(param_dict)
+
+    def __init__(
+        self,
+        config: DefaultClassConfig,
+        reporters: neat.reporting.ReporterSet,
+        stagnation: neat.DefaultStagnation,
+        num_workers: int = 0,
+        batch_size: int = 64
+    ) -> None:
+        """
+        Constructor
+
+        :param config: the reproduction configuration
+        :param reporters: the reporters of the population
+        :param stagnation: the stagnation scheme of the population
+        :param num_workers: the number of worker processes creating the offspring, 0 for one per cpu
+        :param batch_size: the number of children created per task
+        """
+        super().__init__(config, reporters, stagnation)
+        self._num_workers = num_workers
+        self._batch_size = batch_size
+        self._executor = None
+
+    def __getstate__(self) -> dict:
+        """
+        Drop the worker processes when pickled, they are started again as needed
+
+        :return: the state to pickle
+        """
+        state = self.__dict__.copy()
+        state["_executor"] = None
+        return state
+
+    def get_num_workers(self) -> int:
+        """
+        Get the number of worker processes creating the offspring
+
+        :return: the number of workers
+        """
+        return self._num_workers or os.cpu_count() or 1
+
+    def set_num_workers(self, num_workers: int) -> None:
+        """
+        Set the number of worker processes creating the offspring, restarting the workers as needed
+
+        :param num_workers: the number of workers, 0 for one per cpu
+        """
+        self.close()
+        self._num_workers = num_workers
+
+    def get_batch_size(self) -> int:
+        """
+        Get the number of children created per task
+
+        :return: the batch size
+        """
+        return self._batch_size
+
+    def set_batch_size(self, batch_size: int) -> None:
+        """
+        Set the number of children created per task
+
+        :param batch_size: the batch size
+        """
+        self._batch_size = batch_size
+
+    def reproduce(
+        self,
+        config: neat.Config,
+        species: neat.DefaultSpeciesSet,
+        pop_size: int,
+        generation: int
+    ) -> dict[int, neat.DefaultGenome]:
+        """
+        Create the next generation from the current species
+
+        :param config: the neat configuration
+        :param species: the species of the current generation
+        :param pop_size: the requested population size
+        :param generation: the current generation
+        :return: the genomes of the next generation, keyed by genome id
+        """
+        # Let neat choose the elites and the parents of every child, deferring the children themselves
+        deferred_config = copy.copy(config)
+        deferred_config.genome_type = _DeferredGenome
+        new_population = super().reproduce(deferred_config, species, pop_size, generation)
+        deferred = [genome for genome in new_population.values() if isinstance(genome, _DeferredGenome)]
+
+        if not deferred:
+            return new_population
+
+        # Seed every child and reserve a node key for it past every node key in use
+        genome_config = config.genome_config
+
+        if genome_config.node_indexer is None:
+            parents = [genome for child in deferred for genome in child.parents]
+            genome_config.node_indexer = count(max(key for genome in parents for key in genome.nodes) + 1)
+
+        first_node_key = next(genome_config.node_indexer)
+        tasks = [
+            (child.key, *child.parents, random.getrandbits(64), first_node_key + i) for i, child in enumerate(deferred)
+        ]
+
+        # Create the children, in batches spread across the workers
+        batch_size = max(1, self._batch_size)
+        batches = [tasks[i:i + batch_size] for i in range(0, len(tasks), batch_size)]
+
+        if self.get_num_workers() == 1:
+            # Seeding the children in this process must not disturb the random state of the population
+            random_state = random.getstate()
+
+            try:
+                results = [_create_offspring(config.genome_type, genome_config, batch) for batch in batches]
+            finally:
+                random.setstate(random_state)
+        else:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(self.get_num_workers())
+
+            results = self._executor.map(_create_offspring, repeat(config.genome_type), repeat(genome_config), batches)
+
+        # Renumber the reserved node keys that were used, in offspring order
+        next_node_key = first_node_key
+
+        for (_, _, _, _, node_key), child in zip(tasks, (child for batch in results for child in batch)):
+            if node_key in child.nodes:
+                self._renumber_node(child, node_key, next_node_key)
+                next_node_key += 1
+
+            new_population[child.key] = child
+
+        genome_config.node_indexer = count(next_node_key)
+
+        return new_population
+
+    @staticmethod
+    def _renumber_node(genome: neat.DefaultGenome, old_key: int, new_key: int) -> None:
+        """
+        Convenience function to change the key of a node of a genome, along with the connections to and from it
+
+        :param genome: the genome holding the node
+        :param old_key: the current key of the node
+        :param new_key: the new key of the node
+        """
+        if old_key == new_key:
+            return
+
+        node = genome.nodes.pop(old_key)
+        node.key = new_key
+        genome.nodes[new_key] = node
+
+        for key in [key for key in genome.connections if old_key in key]:
+            connection = genome.connections.pop(key)
+            connection.key = tuple(new_key if node_key == old_key else node_key for node_key in key)
+            genome.connections[connection.key] = connection
+
+    def close(self) -> None:
+        """
+        Stop the worker processes
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+# neat reads the configuration of a reproduction scheme from the section named after its type, point it at the
+# [DefaultReproduction] section (pickling goes by the qualified name, which is unchanged)
+ParallelReproduction.__name__ = neat.DefaultReproduction.__name__
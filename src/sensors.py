@@ -0,0 +1,380 @@
+from pyray import *
+from .track import Track
+from .tiled_mask import TiledMask
+import numpy as np
+import hashlib
+import math
+import os
+
+
+class RaySensor:
+    """
+    Senses the track by casting a fan of rays from the driver, centered on its heading
+    """
+    NUM_CASTS = 12
+    FOV = math.pi
+
+    def __init__(self, num_casts: int = NUM_CASTS, fov: float = FOV) -> None:
+        """
+        Constructor
+
+        :param num_casts: the number of rays to cast
+        :param fov: the angle covered by the fan of rays in radians
+        """
+        self._num_casts = num_casts
+        self._fov = fov
+
+    def get_num_casts(self) -> int:
+        """
+        Get the number of rays cast by this sensor
+
+        :return: the number of rays
+        """
+        return self._num_casts
+
+    def get_fov(self) -> float:
+        """
+        Get the angle covered by the fan of rays
+
+        :return: the field of view in radians
+        """
+        return self._fov
+
+    def get_ray_angles(self, angle: float) -> list[float]:
+        """
+        Get the angle of every ray for a driver with the given heading
+
+        :param angle: the heading of the driver in radians
+        :return: the angle of each ray in radians
+        """
+        angle_delta = self._fov / self._num_casts
+        return [angle - self._fov / 2 + i * angle_delta for i in range(self._num_casts)]
+
+    def sense(self, track: Track, pos: Vector2, angle: float) -> list[float]:
+        """
+        Measure the distance to the edge of the track (or an obstacle) along each ray
+
+        :param track: the track to sense
+        :param pos: the position of the driver in world space
+        :param angle: the heading of the driver in radians
+        :return: the distance along each ray in meters
+        """
+        distances = []
+
+        for ray_angle in self.get_ray_angles(angle):
+            ray_end = track.ray_collision(pos, ray_angle)
+            distances.append(vector2_length(vector2_subtract(ray_end, pos)))
+
+        return distances
+
+
+class SparseRaySensor(RaySensor):
+    """
+    A cheaper ray sensor casting only some rays of the fan and interpolating the distances of the others
+
+    It senses as many values as a `RaySensor` with the same fan, so it can stand in for one with the same networks
+    """
+    def __init__(self, num_casts: int = RaySensor.NUM_CASTS, fov: float = RaySensor.FOV, stride: int = 2) -> None:
+        """
+        Constructor
+
+        :param num_casts: the number of rays of the fan
+        :param fov: the angle covered by the fan of rays in radians
+        :param stride: cast one ray out of `stride`, along with the last ray of the fan
+        """
+        if stride < 1:
+            raise ValueError("[ERROR]: The stride must be at least one ray")
+
+        super().__init__(num_casts, fov)
+        self._stride = stride
+        self._cast_indices = sorted(set(range(0, num_casts, stride)) | {num_casts - 1})
+
+    def get_num_cast_rays(self) -> int:
+        """
+        Get the number of rays actually cast on every reading
+
+        :return: the number of cast rays
+        """
+        return len(self._cast_indices)
+
+    def sense(self, track: Track, pos: Vector2, angle: float) -> list[float]:
+        """
+        Measure the distance to the edge of the track (or an obstacle) along the cast rays and interpolate the others
+
+        :param track: the track to sense
+        :param pos: the position of the driver in world space
+        :param angle: the heading of the driver in radians
+        :return: the distance along each ray of the fan in meters
+        """
+        ray_angles = self.get_ray_angles(angle)
+        distances = []
+
+        for i in self._cast_indices:
+            ray_end = track.ray_collision(pos, ray_angles[i])
+            distances.append(vector2_length(vector2_subtract(ray_end, pos)))
+
+        return np.interp(np.arange(self._num_casts), self._cast_indices, distances).tolist()
+
+
+class SensorTable(RaySensor):
+    """
+    A ray sensor backed by a precomputed lookup table of ray distances
+
+    The table samples the ray distance on a quantized (x, y, angle) grid covering the whole map and interpolates
+    between samples, turning sensing into a table lookup. Tables are stored as memory-mapped files keyed by a hash of
+    the map and the sensor configuration, so they are built once per track and every process using the same table
+    shares the same mapped pages.
+    """
+    FORMAT_VERSION = 1
+    CHUNK_SIZE = 1 << 18
+
+    def __init__(
+        self,
+        track: Track,
+        num_casts: int = RaySensor.NUM_CASTS,
+        fov: float = RaySensor.FOV,
+        stride: int = 1,
+        angle_bins: int = 72,
+        cache_dir: str = "assets/cache/"
+    ) -> None:
+        """
+        Constructor
+
+        Loads the table for the track from the cache directory, building it first if it does not exist yet
+
+        :param track: the track to build the table for
+        :param num_casts: the number of rays to cast
+        :param fov: the angle covered by the fan of rays in radians
+        :param stride: the spacing between samples in map pixels
+        :param angle_bins: the number of sampled headings covering a full turn
+        :param cache_dir: the directory to store tables in
+        """
+        super().__init__(num_casts, fov)
+        self._track = track
+        self._stride = stride
+        self._angle_bins = angle_bins
+
+        map_height, map_width = track.get_mask().shape
+        self._map_scale = Vector2(map_width / track.get_width(), map_height / track.get_height())
+        self._filepath = os.path.join(cache_dir, f"sensor-{self._compute_key()}.npy")
+
+        if not os.path.exists(self._filepath):
+            self._build()
+
+        self._table = np.load(self._filepath, mmap_mode="r")
+
+    def get_filepath(self) -> str:
+        """
+        Get the path of the memory-mapped table file
+
+        :return: the path to the table file
+        """
+        return self._filepath
+
+    def _compute_key(self) -> str:
+        """
+        Convenience function to hash the map and the sensor configuration into the key of the table
+
+        :return: the hex digest identifying the table
+        """
+        mask = self._track.get_mask()
+        digest = hashlib.sha256()
+        digest.update(repr((self.FORMAT_VERSION, mask.shape, self._stride, self._angle_bins)).encode())
+        digest.update(repr((self._track.get_width(), self._track.get_height())).encode())
+
+        # Tiled masks can be far too large to hash, so they are identified by their file, size and modification time
+        if isinstance(mask, TiledMask):
+            stat = os.stat(mask.get_filepath())
+            digest.update(repr((os.path.abspath(mask.get_filepath()), stat.st_size, stat.st_mtime_ns)).encode())
+        else:
+            digest.update(np.packbits(mask).tobytes())
+
+        for obstacle in self._track.get_obstacles():
+            digest.update(repr((obstacle.get_x(), obstacle.get_y(), obstacle.get_angle())).encode())
+            digest.update(repr((obstacle.get_width(), obstacle.get_height())).encode())
+
+        return digest.hexdigest()[:32]
+
+    def _sample_positions(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Convenience function to calculate the world-space coordinates of the sampled grid
+
+        :return: the (x, y) world coordinates of the sample columns and rows
+        """
+        map_height, map_width = self._track.get_mask().shape
+        sample_xs = (np.arange(0, map_width, self._stride) + 0.5) / self._map_scale.x
+        sample_ys = (np.arange(0, map_height, self._stride) + 0.5) / self._map_scale.y
+        return sample_xs, sample_ys
+
+    def _build(self) -> None:
+        """
+        Cast every sampled ray and write the resulting table to the cache directory
+        """
+        sample_xs, sample_ys = self._sample_positions()
+        angles = np.arange(self._angle_bins) * (2 * math.pi / self._angle_bins)
+
+        # Write to a temporary file first so other processes never map a partially built table
+        os.makedirs(os.path.dirname(self._filepath) or ".", exist_ok=True)
+        temp_filepath = f"{self._filepath}.{os.getpid()}.tmp"
+        shape = (len(sample_ys), len(sample_xs), self._angle_bins)
+        table = np.lib.format.open_memmap(temp_filepath, mode="w+", dtype=np.float32, shape=shape)
+
+        # Cast the rays a chunk of rows at a time to bound the memory used by the vectorized caster
+        rows_per_chunk = max(1, self.CHUNK_SIZE // (len(sample_xs) * self._angle_bins))
+
+        for row in range(0, len(sample_ys), rows_per_chunk):
+            rows = sample_ys[row:row + rows_per_chunk]
+            ys, xs, ray_angles = np.meshgrid(rows, sample_xs, angles, indexing="ij")
+            table[row:row + len(rows)] = self._track.cast_rays(xs, ys, ray_angles).reshape(xs.shape)
+
+        table.flush()
+        del table
+        os.replace(temp_filepath, self._filepath)
+
+    def lookup(self, xs: np.ndarray, ys: np.ndarray, angles: np.ndarray) -> np.ndarray:
+        """
+        Look up the ray distance for many positions and ray angles at once
+
+        Distances are interpolated bilinearly between the sampled positions and linearly between the sampled angles
+
+        :param xs: the x positions of the rays in world space
+        :param ys: the y positions of the rays in world space
+        :param angles: the angles of the rays in radians
+        :return: the interpolated distance along each ray in meters
+        """
+        xs, ys, angles = np.broadcast_arrays(xs, ys, angles)
+        rows, cols, bins = self._table.shape
+
+        # Find the fractional grid coordinates of each query (samples sit at the center of their pixel)
+        grid_x = np.clip((np.asarray(xs) * self._map_scale.x - 0.5) / self._stride, 0, cols - 1)
+        grid_y = np.clip((np.asarray(ys) * self._map_scale.y - 0.5) / self._stride, 0, rows - 1)
+        grid_a = np.mod(np.asarray(angles) / (2 * math.pi) * bins, bins)
+
+        x0 = np.minimum(grid_x.astype(np.int64), cols - 1)
+        y0 = np.minimum(grid_y.astype(np.int64), rows - 1)
+        a0 = np.minimum(grid_a.astype(np.int64), bins - 1)
+        x1 = np.minimum(x0 + 1, cols - 1)
+        y1 = np.minimum(y0 + 1, rows - 1)
+        a1 = (a0 + 1) % bins
+        fx, fy, fa = grid_x - x0, grid_y - y0, grid_a - a0
+
+        # Interpolate between the eight surrounding samples
+        result = np.zeros(grid_x.shape)
+
+        for y, wy in ((y0, 1 - fy), (y1, fy)):
+            for x, wx in ((x0, 1 - fx), (x1, fx)):
+                for a, wa in ((a0, 1 - fa), (a1, fa)):
+                    result += wy * wx * wa * self._table[y, x, a]
+
+        return result
+
+    def sense(self, track: Track, pos: Vector2, angle: float) -> list[float]:
+        """
+        Look up the distance to the edge of the track (or an obstacle) along each ray
+
+        :param track: the track to sense (must be the track the table was built for)
+        :param pos: the position of the driver in world space
+        :param angle: the heading of the driver in radians
+        :return: the distance along each ray in meters
+        """
+        return self.lookup(pos.x, pos.y, np.array(self.get_ray_angles(angle))).tolist()
+
+
+class PatchSensor:
+    """
+    Senses the track by sampling a low-resolution occupancy patch around the driver, aligned to its heading
+
+    The patch is a grid of cells covering a rectangle that extends ahead of the driver. Every cell holds the fraction
+    of its (supersampled) points that are on the track, so the cost per driver is fixed by the size of the grid rather
+    than the shape of the track. Patches for many drivers are sampled at once by `sense_batch`, which the simulation
+    uses to sense every driver due for a control step in a single batched resample of the track mask.
+    """
+    ROWS = 4
+    COLS = 3
+
+    def __init__(
+        self,
+        rows: int = ROWS,
+        cols: int = COLS,
+        length: float = 24,
+        width: float = 18,
+        offset: float = 4,
+        supersample: int = 2
+    ) -> None:
+        """
+        Constructor
+
+        :param rows: the number of cells along the heading of the driver
+        :param cols: the number of cells across the heading of the driver
+        :param length: the extent of the patch along the heading in meters
+        :param width: the extent of the patch across the heading in meters
+        :param offset: the distance the patch extends behind the driver in meters
+        :param supersample: the number of samples per cell along each axis
+        """
+        if rows < 1 or cols < 1 or supersample < 1:
+            raise ValueError("[ERROR]: A patch needs at least one cell and one sample per cell")
+
+        self._rows = rows
+        self._cols = cols
+        self._length = length
+        self._width = width
+        self._offset = offset
+        self._supersample = supersample
+
+        # The (forward, lateral) offsets of every sample relative to the driver, grouped by cell
+        forward = (np.arange(rows * supersample) + 0.5) * (length / (rows * supersample)) - offset
+        lateral = (np.arange(cols * supersample) + 0.5) * (width / (cols * supersample)) - width / 2
+        forward = forward.reshape(rows, 1, supersample, 1)
+        lateral = lateral.reshape(1, cols, 1, supersample)
+        self._forward = np.broadcast_to(forward, (rows, cols, supersample, supersample)).ravel()
+        self._lateral = np.broadcast_to(lateral, (rows, cols, supersample, supersample)).ravel()
+
+    def get_num_inputs(self) -> int:
+        """
+        Get the number of values sensed by this sensor
+
+        :return: the number of cells of the patch
+        """
+        return self._rows * self._cols
+
+    def get_shape(self) -> tuple[int, int]:
+        """
+        Get the shape of the patch
+
+        :return: the (rows, cols) of the patch
+        """
+        return self._rows, self._cols
+
+    def sense_batch(self, track: Track, xs: np.ndarray, ys: np.ndarray, angles: np.ndarray) -> np.ndarray:
+        """
+        Sample the patches of many drivers at once
+
+        :param track: the track to sense
+        :param xs: the x position of every driver in world space
+        :param ys: the y position of every driver in world space
+        :param angles: the heading of every driver in radians
+        :return: an (N, rows * cols) array of the fraction of every cell that is on the track, rows ordered from
+            behind to ahead of the driver
+        """
+        xs = np.asarray(xs, dtype=np.float64).reshape(-1, 1)
+        ys = np.asarray(ys, dtype=np.float64).reshape(-1, 1)
+        angles = np.asarray(angles, dtype=np.float64).reshape(-1, 1)
+        cos, sin = np.cos(angles), np.sin(angles)
+
+        # Rotate and translate the sample offsets of the patch into world space for every driver
+        sample_xs = xs + cos * self._forward - sin * self._lateral
+        sample_ys = ys + sin * self._forward + cos * self._lateral
+        on_track = ~track.is_off_track_batch(sample_xs, sample_ys)
+
+        return on_track.reshape(len(xs), self.get_num_inputs(), self._supersample ** 2).mean(axis=2)
+
+    def sense(self, track: Track, pos: Vector2, angle: float) -> list[float]:
+        """
+        Sample the patch of a single driver
+
+        :param track: the track to sense
+        :param pos: the position of the driver in world space
+        :param angle: the heading of the driver in radians
+        :return: the fraction of every cell that is on the track
+        """
+        return self.sense_batch(track, [pos.x], [pos.y], [angle])[0].tolist()
@@ -19,7 +19,11 @@ class SimObject:
         self._pos = Vector2(0, 0)
         self._angle = 0
         self._size = Vector2(0, 0) if size is None else size
-        self._texture = None if texture_filename is None else TexturePack.get_texture(texture_filename)
+        self._texture = None
+        self._source_rect = None
+
+        if texture_filename is not None and (sprite := TexturePack.get_sprite(texture_filename)) is not None:
+            self._texture, self._source_rect = sprite
 
     def get_size(self) -> Vector2:
         """
@@ -159,10 +163,10 @@ class SimObject:
 
         # Load the texture attribute (if an invalid filename, don't overwrite the current texture
         if (texture_filename := node.get("texture")) is not None:
-            texture = TexturePack.get_texture(texture_filename)
+            sprite = TexturePack.get_sprite(texture_filename)
 
-            if texture is not None:
-                self._texture = texture
+            if sprite is not None:
+                self._texture, self._source_rect = sprite
 
     def update(self, delta_time: float) -> None:
         """
@@ -187,10 +191,9 @@ class SimObject:
         rl_translatef(self._pos.x, self._pos.y, 0)
         rl_rotatef(degrees(self._angle), 0, 0, 1)
 
-        # Draw the texture to the screen
-        source_rect = Rectangle(0, 0, self._texture.width, self._texture.height)
+        # Draw our area of the texture to the screen (sprites share the atlas texture, so their draws get batched)
         dest_rect = Rectangle(-self._size.x / 2, -self._size.y / 2, self._size.x, self._size.y)
-        draw_texture_pro(self._texture, source_rect, dest_rect, Vector2(0, 0), 0, WHITE)
+        draw_texture_pro(self._texture, self._source_rect, dest_rect, Vector2(0, 0), 0, WHITE)
 
         # Restore the view matrix
         rl_pop_matrix()
@@ -1,6 +1,9 @@
 from pyray import *
 from .track import Track
 from .driver_base import DriverBase
+from .ai_driver import AiDriver
+from .sensors import PatchSensor
+from .compiled_track import CompiledTrack
 from xml.etree import ElementTree
 
 
@@ -15,6 +18,7 @@ class Simulation:
         self._track = Track()
         self._drivers = []
         self._is_first_draw = True
+        self._num_ticks = 0
 
     def get_track(self) -> Track:
         """
@@ -34,12 +38,52 @@ class Simulation:
         driver.set_angle(self._track.get_driver_start_angle())
         self._drivers.append(driver)
 
+    def get_drivers(self) -> list[DriverBase]:
+        """
+        Get the drivers currently in the simulation
+
+        :return: the list of drivers
+        """
+        return self._drivers
+
+    def get_num_ticks(self) -> int:
+        """
+        Get the number of updates run by this simulation so far
+
+        :return: the number of ticks
+        """
+        return self._num_ticks
+
     def purge_drivers(self) -> None:
         """
         Clear all drivers currently on the track
         """
         self._drivers.clear()
 
+    def snapshot(self) -> list[tuple]:
+        """
+        Take a snapshot of the state of this simulation
+
+        The track is static, so the snapshot only holds the state of each driver (the tick counter keeps counting)
+
+        :return: the state of every driver
+        """
+        return [driver.get_state() for driver in self._drivers]
+
+    def restore(self, snapshot: list[tuple]) -> None:
+        """
+        Restore a snapshot of the state of this simulation
+
+        The drivers must be the same (or equivalent) drivers the snapshot was taken with
+
+        :param snapshot: a snapshot returned by `snapshot`
+        """
+        if len(snapshot) != len(self._drivers):
+            raise ValueError(f"[ERROR]: The snapshot holds {len(snapshot)} drivers, not {len(self._drivers)}")
+
+        for driver, state in zip(self._drivers, snapshot):
+            driver.set_state(state)
+
     def all_drivers_off_track(self) -> bool:
         """
         Check if all drivers are currently off the track
@@ -65,20 +109,58 @@ class Simulation:
         # Load the track from the xml file
         self._track.xml_load(root)
 
+    def load_compiled(self, filepath: str, images_dir: str = "assets/images/", cache_dir: str = "assets/cache/") -> None:
+        """
+        Load this track from the compiled bundle of a xml file, compiling it first if it is missing or out of date
+
+        :param filepath: the path to the xml file to load
+        :param images_dir: the directory holding the images referenced by the xml file
+        :param cache_dir: the directory to store compiled bundles in
+        """
+        CompiledTrack.compile(filepath, images_dir, cache_dir).load_into(self._track)
+
     def update(self, delta_time: float) -> None:
         """
         Update this simulation
 
         :param delta_time: elapsed time since the last update in seconds
         """
+        self._num_ticks += 1
+
+        # Drivers sensing with a patch sensor are updated in two halves, so the track is sensed for all of them at once
+        batched_drivers = []
+        sensing = {}
+
         for driver in self._drivers:
             initial_position = driver.get_position()
-            driver.update(delta_time)
+
+            if isinstance(driver, AiDriver) and isinstance(driver.get_sensor(), PatchSensor):
+                batched_drivers.append(driver)
+
+                if driver.begin_update(delta_time):
+                    sensing.setdefault(driver.get_sensor(), []).append(driver)
+            else:
+                driver.update(delta_time)
+
             new_position = driver.get_position()
 
             if self._track.checkpoint_check(initial_position, new_position):
                 print('checkpoint passed')
 
+        # Sense the track for every driver on a control step, one batch per sensor
+        readings = {}
+
+        for sensor, drivers in sensing.items():
+            xs = [driver.get_x() for driver in drivers]
+            ys = [driver.get_y() for driver in drivers]
+            angles = [driver.get_angle() for driver in drivers]
+
+            for driver, patch in zip(drivers, sensor.sense_batch(self._track, xs, ys, angles).tolist()):
+                readings[driver] = patch
+
+        for driver in batched_drivers:
+            driver.end_update(delta_time, readings.get(driver))
+
     def _update_scene_fitment(self) -> None:
         """
         Convenience function to update the fitment of the virtual scene
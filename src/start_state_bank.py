@@ -0,0 +1,144 @@
+from .simulation import Simulation
+from .ai_driver import AiDriver
+import numpy as np
+
+
+class StartStateBank:
+    """
+    A collection of mid-track driver states to start short evaluation rollouts from
+
+    States are recorded from the strongest drivers of an episode and binned by their position on a grid of square
+    cells, each cell keeping a bounded number of states. Sampling picks cells uniformly, so the sampled states are
+    spread around the whole track rather than concentrated where drivers spend the most time (e.g. the start).
+
+    A state is the physical (x, y, angle, speed, steering angle) of a car, see `DriverBase.get_state`.
+    """
+    STATE_SIZE = 5
+
+    def __init__(self, cell_size: float = 10, states_per_cell: int = 8, seed: int | None = None) -> None:
+        """
+        Constructor
+
+        :param cell_size: the width and height of a cell in meters
+        :param states_per_cell: the maximum number of states kept in each cell
+        :param seed: the seed of the random number generator used for recording and sampling
+        """
+        self._cell_size = cell_size
+        self._states_per_cell = states_per_cell
+        self._cells = {}
+        self._num_seen = {}
+        self._rng = np.random.default_rng(seed)
+
+    def __len__(self) -> int:
+        """
+        Get the number of states in the bank
+
+        :return: the number of states
+        """
+        return sum(len(states) for states in self._cells.values())
+
+    def get_num_cells(self) -> int:
+        """
+        Get the number of cells holding at least one state
+
+        :return: the number of cells
+        """
+        return len(self._cells)
+
+    def add_state(self, state: tuple) -> None:
+        """
+        Add a state to the bank
+
+        Once a cell is full, every state recorded in it so far has the same chance of being kept (reservoir sampling)
+
+        :param state: a driver state (only its first five values are kept)
+        """
+        state = tuple(float(value) for value in state[:self.STATE_SIZE])
+        cell = (int(state[0] // self._cell_size), int(state[1] // self._cell_size))
+        states = self._cells.setdefault(cell, [])
+        num_seen = self._num_seen.get(cell, 0) + 1
+        self._num_seen[cell] = num_seen
+
+        if len(states) < self._states_per_cell:
+            states.append(state)
+        elif (index := self._rng.integers(num_seen)) < self._states_per_cell:
+            states[index] = state
+
+    def record(self, simulation: Simulation, top_fraction: float = 0.2) -> None:
+        """
+        Add the states of the strongest drivers currently on the track
+
+        Only drivers that are moving, on the track (drivers that just left it are only flagged on their next update),
+        and whose fitness is among the top fraction of the drivers still on the track are recorded
+
+        :param simulation: the simulation to record from
+        :param top_fraction: the fraction of the drivers still on the track to record
+        """
+        track = simulation.get_track()
+        drivers = [
+            driver for driver in simulation.get_drivers()
+            if isinstance(driver, AiDriver) and not driver.is_off_track() and driver.get_speed() > 0
+            and not track.is_off_track(driver.get_position())
+        ]
+
+        if not drivers:
+            return
+
+        drivers.sort(key=lambda driver: driver.get_genome().fitness, reverse=True)
+
+        for driver in drivers[:max(1, int(len(drivers) * top_fraction))]:
+            self.add_state(driver.get_state())
+
+    def sample(self, n: int) -> list[tuple]:
+        """
+        Sample states spread around the track
+
+        :param n: the number of states to sample
+        :return: the sampled states
+        """
+        if not self._cells:
+            raise ValueError("[ERROR]: Cannot sample from an empty start state bank")
+
+        cells = list(self._cells.values())
+        samples = []
+
+        for cell_index in self._rng.integers(len(cells), size=n):
+            states = cells[cell_index]
+            samples.append(states[self._rng.integers(len(states))])
+
+        return samples
+
+    def save(self, filepath: str) -> None:
+        """
+        Save the bank to a file
+
+        :param filepath: the path of the .npz file to write
+        """
+        states = [state for states in self._cells.values() for state in states]
+        num_seen = [(cell[0], cell[1], count) for cell, count in self._num_seen.items()]
+        np.savez(
+            filepath,
+            states=np.array(states, dtype=np.float64).reshape(-1, self.STATE_SIZE),
+            num_seen=np.array(num_seen, dtype=np.int64).reshape(-1, 3),
+            settings=np.array([self._cell_size, self._states_per_cell], dtype=np.float64)
+        )
+
+    @classmethod
+    def load(cls, filepath: str, seed: int | None = None) -> "StartStateBank":
+        """
+        Load a bank from a file
+
+        :param filepath: the path of the .npz file to read
+        :param seed: the seed of the random number generator used for recording and sampling
+        :return: the loaded bank
+        """
+        with np.load(filepath) as data:
+            cell_size, states_per_cell = data["settings"]
+            bank = cls(float(cell_size), int(states_per_cell), seed)
+
+            for state in data["states"]:
+                bank.add_state(tuple(state))
+
+            bank._num_seen = {(int(cx), int(cy)): int(count) for cx, cy, count in data["num_seen"]}
+
+        return bank
@@ -0,0 +1,368 @@
+from neat.math_util import mean, median2, stdev
+from collections import deque
+import neat
+import heapq
+import json
+import os
+import pickle
+
+
+class StreamingStatisticsReporter(neat.reporting.BaseReporter):
+    """
+    A memory-bounded replacement for `neat.StatisticsReporter`
+
+    Every generation, a line of statistics is appended to `statistics.jsonl` and the best genome of the generation (the
+    champion) is appended to `champions.pickle`, both in the given directory. Only a few aggregates over the whole run,
+    the statistics of the most recent generations, and the best few genomes ever seen are kept in memory.
+
+    A new run starts the files over. A run resumed from a checkpoint continues the existing files: the generations
+    from the restored one on are dropped (they are about to run again), and the aggregates are rebuilt by streaming
+    through the generations that are kept.
+    """
+    STATISTICS_FILENAME = "statistics.jsonl"
+    CHAMPIONS_FILENAME = "champions.pickle"
+
+    def __init__(
+        self,
+        directory: str,
+        window: int = 100,
+        num_best: int = 10,
+        resume_generation: int | None = None
+    ) -> None:
+        """
+        Constructor
+
+        :param directory: the directory to write the statistics and champions to
+        :param window: the number of most recent generations to keep the statistics of in memory
+        :param num_best: the number of best genomes (over the whole run) to keep in memory
+        :param resume_generation: the generation a population restored from a checkpoint resumes at, to keep the
+            statistics of the generations before it, any statistics in the directory are discarded if not provided
+        """
+        self._directory = directory
+        self._num_best = num_best
+        self._generation = None
+
+        self._recent = deque(maxlen=window)
+        self._best = []
+        self._num_generations = 0
+        self._num_evaluations = 0
+        self._fitness_mean = 0.0
+        self._fitness_m2 = 0.0
+
+        os.makedirs(directory, exist_ok=True)
+
+        if resume_generation is None:
+            self._clear()
+        else:
+            self._resume(resume_generation)
+
+    def get_statistics_filepath(self) -> str:
+        """
+        Get the path of the statistics file
+
+        :return: the path to the file holding one json object per generation
+        """
+        return os.path.join(self._directory, self.STATISTICS_FILENAME)
+
+    def get_champions_filepath(self) -> str:
+        """
+        Get the path of the champions file
+
+        :return: the path to the file holding the pickled champion of every generation
+        """
+        return os.path.join(self._directory, self.CHAMPIONS_FILENAME)
+
+    def _clear(self) -> None:
+        """
+        Convenience function to start the statistics and champions files over for a new run
+        """
+        for filepath in (self.get_statistics_filepath(), self.get_champions_filepath()):
+            open(filepath, "wb").close()
+
+    def _resume(self, generation: int) -> None:
+        """
+        Convenience function to drop the statistics from a generation on and rebuild the aggregates from the rest
+
+        :param generation: the first generation to drop
+        """
+        self._truncate_incomplete_line()
+
+        # Keep the latest entry of every generation before the resumed one (files written before generations were
+        # dropped on resume may hold a generation more than once)
+        latest = {}
+
+        for index, entry in enumerate(self.iter_generations()):
+            latest[entry["generation"]] = index
+
+        kept = {index for entry_generation, index in latest.items() if entry_generation < generation}
+        best_offsets = []
+        end_of_kept = 0
+        start_of_dropped = None
+
+        # Rewrite the kept entries to a temporary file first, so an interruption never loses the statistics
+        temp_filepath = f"{self.get_statistics_filepath()}.{os.getpid()}.tmp"
+
+        with open(temp_filepath, "w") as file:
+            for index, entry in enumerate(self.iter_generations()):
+                offset = entry["champion_offset"]
+
+                if index not in kept:
+                    start_of_dropped = offset if start_of_dropped is None else min(start_of_dropped, offset)
+                    continue
+
+                file.write(json.dumps(entry) + "\n")
+                end_of_kept = max(end_of_kept, offset + 1)
+                self._add_to_aggregates(entry)
+                heapq.heappush(best_offsets, (entry["best_fitness"], offset))
+
+                if len(best_offsets) > self._num_best:
+                    heapq.heappop(best_offsets)
+
+        os.replace(temp_filepath, self.get_statistics_filepath())
+
+        # Cut the champions of the dropped generations off the end of the champions file, unless a kept one follows
+        if start_of_dropped is not None and start_of_dropped >= end_of_kept:
+            with open(self.get_champions_filepath(), "rb+") as file:
+                file.truncate(start_of_dropped)
+
+        # Only the best champions are read back from disk
+        for fitness, offset in best_offsets:
+            heapq.heappush(self._best, (fitness, offset, self._load_champion_at(offset)))
+
+    def _truncate_incomplete_line(self) -> None:
+        """
+        Convenience function to drop a statistics line left incomplete by an interrupted run, so new lines are appended
+        after the last complete one
+        """
+        if not os.path.exists(self.get_statistics_filepath()):
+            return
+
+        with open(self.get_statistics_filepath(), "rb+") as file:
+            end = file.seek(0, os.SEEK_END)
+            position = end
+
+            # Search backwards for the end of the last complete line
+            while position > 0:
+                start = max(position - 4096, 0)
+                file.seek(start)
+                newline = file.read(position - start).rfind(b"\n")
+
+                if newline >= 0:
+                    position = start + newline + 1
+                    break
+
+                position = start
+
+            if position != end:
+                file.truncate(position)
+
+    def _add_to_aggregates(self, entry: dict) -> None:
+        """
+        Convenience function to fold the statistics of one generation into the in-memory aggregates
+
+        :param entry: the statistics of the generation
+        """
+        self._recent.append(entry)
+        self._num_generations += 1
+
+        # Merge the mean and variance of the generation into those of the whole run (Chan et al.)
+        count = entry["num_genomes"]
+
+        if count > 0:
+            total = self._num_evaluations + count
+            delta = entry["fitness_mean"] - self._fitness_mean
+            self._fitness_mean += delta * count / total
+            self._fitness_m2 += entry["fitness_stdev"] ** 2 * count + delta ** 2 * self._num_evaluations * count / total
+            self._num_evaluations = total
+
+    def start_generation(self, generation: int) -> None:
+        """
+        Remember the generation about to be evaluated
+
+        :param generation: the generation number
+        """
+        self._generation = generation
+
+    def post_evaluate(
+        self,
+        config: neat.Config,
+        population: dict,
+        species: neat.DefaultSpeciesSet,
+        best_genome: neat.DefaultGenome
+    ) -> None:
+        """
+        Record the statistics and the champion of the generation that was just evaluated
+
+        :param config: the current neat configuration
+        :param population: the genomes of the population, keyed by genome id
+        :param species: the species set of the population
+        :param best_genome: the best genome of the generation
+        """
+        fitnesses = [genome.fitness for genome in population.values()]
+
+        # Append the champion first, so every statistics line refers to a complete champion
+        with open(self.get_champions_filepath(), "ab") as file:
+            champion_offset = file.tell()
+            pickle.dump(best_genome, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+        entry = {
+            "generation": self._generation,
+            "num_genomes": len(fitnesses),
+            "best_fitness": best_genome.fitness,
+            "fitness_mean": mean(fitnesses),
+            "fitness_stdev": stdev(fitnesses),
+            "fitness_median": median2(fitnesses),
+            "species": {
+                str(sid): {
+                    "size": len(s.members),
+                    "fitness": mean([m.fitness for m in s.members.values() if m.fitness is not None] or [0.0]),
+                }
+                for sid, s in species.species.items()
+            },
+            "champion_key": best_genome.key,
+            "champion_offset": champion_offset,
+        }
+
+        with open(self.get_statistics_filepath(), "a") as file:
+            file.write(json.dumps(entry) + "\n")
+
+        self._add_to_aggregates(entry)
+
+        # Keep the best genomes ever seen in a bounded min-heap (ties are broken by the unique champion offsets)
+        heapq.heappush(self._best, (best_genome.fitness, champion_offset, best_genome))
+
+        if len(self._best) > self._num_best:
+            heapq.heappop(self._best)
+
+    def iter_generations(self):
+        """
+        Stream the statistics of every recorded generation from disk
+
+        :return: an iterator over the statistics of each generation, oldest first
+        """
+        if not os.path.exists(self.get_statistics_filepath()):
+            return
+
+        with open(self.get_statistics_filepath()) as file:
+            for line in file:
+                # Skip a line still being written
+                if line.endswith("\n"):
+                    yield json.loads(line)
+
+    def _load_champion_at(self, offset: int) -> neat.DefaultGenome:
+        """
+        Convenience function to read a champion from the champions file
+
+        :param offset: the position of the champion in the file
+        :return: the champion genome
+        """
+        with open(self.get_champions_filepath(), "rb") as file:
+            file.seek(offset)
+            return pickle.load(file)
+
+    def load_champion(self, generation: int) -> neat.DefaultGenome:
+        """
+        Read the champion of a generation from disk
+
+        :param generation: the generation number
+        :return: the best genome of the generation (its latest record if the generation was run more than once)
+        """
+        offset = None
+
+        for entry in self.iter_generations():
+            if entry["generation"] == generation:
+                offset = entry["champion_offset"]
+
+        if offset is None:
+            raise KeyError(f"[ERROR]: No champion recorded for generation {generation}")
+
+        return self._load_champion_at(offset)
+
+    def get_num_generations(self) -> int:
+        """
+        Get the number of generations recorded over the whole run
+
+        :return: the number of generations
+        """
+        return self._num_generations
+
+    def best_genome(self) -> neat.DefaultGenome:
+        """
+        Get the best genome ever seen
+
+        :return: the genome with the highest fitness
+        """
+        return self.best_genomes(1)[0]
+
+    def best_genomes(self, n: int) -> list[neat.DefaultGenome]:
+        """
+        Get the best genomes ever seen
+
+        :param n: the number of genomes to get (at most the number of best genomes kept in memory)
+        :return: the genomes with the highest fitness, best first
+        """
+        return [genome for _, _, genome in heapq.nlargest(n, self._best, key=lambda item: item[:2])]
+
+    def get_fitness_mean(self) -> list[float]:
+        """
+        Get the mean fitness of the recent generations
+
+        :return: the mean fitness of each generation in the window, oldest first
+        """
+        return [entry["fitness_mean"] for entry in self._recent]
+
+    def get_fitness_stdev(self) -> list[float]:
+        """
+        Get the standard deviation of the fitness of the recent generations
+
+        :return: the standard deviation of each generation in the window, oldest first
+        """
+        return [entry["fitness_stdev"] for entry in self._recent]
+
+    def get_fitness_median(self) -> list[float]:
+        """
+        Get the median fitness of the recent generations
+
+        :return: the median fitness of each generation in the window, oldest first
+        """
+        return [entry["fitness_median"] for entry in self._recent]
+
+    def get_best_fitness(self) -> list[float]:
+        """
+        Get the fitness of the champions of the recent generations
+
+        :return: the best fitness of each generation in the window, oldest first
+        """
+        return [entry["best_fitness"] for entry in self._recent]
+
+    def get_species_sizes(self) -> list[dict[int, int]]:
+        """
+        Get the size of each species in the recent generations
+
+        :return: the species ids mapped to their sizes for each generation in the window, oldest first
+        """
+        return [{int(sid): s["size"] for sid, s in entry["species"].items()} for entry in self._recent]
+
+    def get_species_fitness(self) -> list[dict[int, float]]:
+        """
+        Get the mean fitness of each species in the recent generations
+
+        :return: the species ids mapped to their mean fitness for each generation in the window, oldest first
+        """
+        return [{int(sid): s["fitness"] for sid, s in entry["species"].items()} for entry in self._recent]
+
+    def get_overall_fitness_mean(self) -> float:
+        """
+        Get the mean fitness of every genome evaluated over the whole run
+
+        :return: the mean fitness
+        """
+        return self._fitness_mean
+
+    def get_overall_fitness_stdev(self) -> float:
+        """
+        Get the (population) standard deviation of the fitness of every genome evaluated over the whole run
+
+        :return: the standard deviation of the fitness
+        """
+        return (self._fitness_m2 / self._num_evaluations) ** 0.5 if self._num_evaluations > 0 else 0.0
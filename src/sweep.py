@@ -0,0 +1,383 @@
+from pyray import *
+from .compiled_track import CompiledTrack
+from .species_set import FastSpeciesSet
+from .evaluation import EPISODE_TIME
+from .leaderboard import _evaluate_task, _initialize_worker
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from configparser import ConfigParser
+from statistics import median
+import multiprocessing
+import neat
+import csv
+import itertools
+import os
+import random
+import time
+
+
+class _EarlyStop(Exception):
+    """
+    Raised by `_SweepReporter` to stop a run that fell behind
+    """
+    pass
+
+
+def grid_search(space: dict[str, list]) -> list[dict]:
+    """
+    Enumerate every combination of the values of a search space
+
+    :param space: the values to try for every parameter, keyed by parameter (a neat config key such as
+        "conn_add_prob" or "DefaultGenome.conn_add_prob", or "track" for the track filepath)
+    :return: the parameters of every run
+    """
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def random_search(space: dict[str, list | dict], num_samples: int, seed: int | None = None) -> list[dict]:
+    """
+    Sample random points of a search space
+
+    :param space: for every parameter (see `grid_search`), either a list of values to choose from or a
+        {"low": ..., "high": ...} range to sample uniformly from (integers if both bounds are integers)
+    :param num_samples: the number of runs to sample
+    :param seed: the seed of the random number generator, random if not provided
+    :return: the parameters of every run
+    """
+    rng = random.Random(seed)
+    runs = []
+
+    for _ in range(num_samples):
+        params = {}
+
+        for name, values in space.items():
+            if isinstance(values, dict):
+                low, high = values["low"], values["high"]
+                is_integer = isinstance(low, int) and isinstance(high, int)
+                params[name] = rng.randint(low, high) if is_integer else rng.uniform(low, high)
+            else:
+                params[name] = rng.choice(values)
+
+        runs.append(params)
+
+    return runs
+
+
+def write_config(base_config_filepath: str, params: dict, output_filepath: str) -> None:
+    """
+    Write a neat configuration file with some values of a base configuration replaced
+
+    :param base_config_filepath: the path to the base neat configuration file
+    :param params: the values to replace, keyed by neat config key (parameters that aren't config keys are ignored)
+    :param output_filepath: the path of the configuration file to write
+    """
+    parser = ConfigParser()
+    parser.read(base_config_filepath)
+
+    for name, value in params.items():
+        if name == "track":
+            continue
+
+        if "." in name:
+            section, key = name.split(".", 1)
+        else:
+            sections = [section for section in parser.sections() if parser.has_option(section, name)]
+
+            if len(sections) != 1:
+                raise ValueError(f"[ERROR]: '{name}' must be in exactly one config section, found {len(sections)}")
+
+            section, key = sections[0], name
+
+        if not parser.has_option(section, key):
+            raise ValueError(f"[ERROR]: The config has no key '{key}' in section '{section}'")
+
+        parser.set(section, key, str(value))
+
+    with open(output_filepath, "w") as file:
+        parser.write(file)
+
+
+class _SweepReporter(neat.reporting.BaseReporter):
+    """
+    A reporter sharing the progress of a run with the other runs of a sweep, and stopping the run once it falls behind
+
+    A run falls behind when, after a grace period, its best fitness so far is below the median best fitness of the other
+    runs at the same generation (the median stopping rule)
+    """
+    def __init__(self, progress: dict, run_id: int, grace_generations: int, min_peers: int) -> None:
+        """
+        Constructor
+
+        :param progress: the best fitness so far of every run at every generation, shared by all runs
+        :param run_id: the id of this run
+        :param grace_generations: the number of generations a run is never stopped during
+        :param min_peers: the minimum number of other runs that reached a generation before comparing against them
+        """
+        self._progress = progress
+        self._run_id = run_id
+        self._grace_generations = grace_generations
+        self._min_peers = min_peers
+        self._generation = None
+        self._best_fitness = None
+        self._history = []
+
+    def get_best_fitness(self) -> float | None:
+        """
+        Get the best fitness of this run so far
+
+        :return: the best fitness, None before the first generation is evaluated
+        """
+        return self._best_fitness
+
+    def get_num_generations(self) -> int:
+        """
+        Get the number of generations evaluated so far
+
+        :return: the number of generations
+        """
+        return len(self._history)
+
+    def start_generation(self, generation: int) -> None:
+        """
+        Called by neat at the start of every generation
+
+        :param generation: the current generation
+        """
+        self._generation = generation
+
+    def post_evaluate(
+        self,
+        config: neat.Config,
+        population: dict[int, neat.DefaultGenome],
+        species: neat.DefaultSpeciesSet,
+        best_genome: neat.DefaultGenome
+    ) -> None:
+        """
+        Called by neat once the generation is evaluated, shares the progress and applies the stopping rule
+
+        :param config: the neat configuration
+        :param population: the evaluated genomes
+        :param species: the species of the population
+        :param best_genome: the best genome of the generation
+        """
+        if self._best_fitness is None or best_genome.fitness > self._best_fitness:
+            self._best_fitness = best_genome.fitness
+
+        self._history.append(self._best_fitness)
+        self._progress[self._run_id] = list(self._history)
+
+        if len(self._history) <= self._grace_generations:
+            return
+
+        index = len(self._history) - 1
+        peers = [
+            history[index] for run_id, history in self._progress.items()
+            if run_id != self._run_id and len(history) > index
+        ]
+
+        if len(peers) >= self._min_peers and self._best_fitness < median(peers):
+            raise _EarlyStop()
+
+
+def _run_trial(
+    run_id: int,
+    config_filepath: str,
+    track_filepath: str,
+    cores: list[int],
+    progress: dict,
+    num_generations: int,
+    grace_generations: int,
+    min_peers: int,
+    seed: int | None,
+    tick_time: float,
+    episode_time: float,
+    images_dir: str,
+    cache_dir: str
+) -> dict:
+    """
+    Convenience function to train a population for one run of a sweep (run in a worker process)
+
+    See `run_sweep` for the parameters
+
+    :return: the status, number of generations, and best fitness of the run
+    """
+    _initialize_worker()
+
+    # Keep the run (and the evaluation processes it starts) on its own cores
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+
+    random.seed(None if seed is None else seed + run_id)
+    neat_types = (neat.DefaultGenome, neat.DefaultReproduction, FastSpeciesSet, neat.DefaultStagnation)
+    config = neat.Config(*neat_types, config_filepath)
+    population = neat.Population(config)
+    reporter = _SweepReporter(progress, run_id, grace_generations, min_peers)
+    population.add_reporter(reporter)
+
+    # With more than one core, the population is split across as many evaluation processes
+    pool = None
+
+    if len(cores) > 1:
+        pool = multiprocessing.get_context().Pool(len(cores), initializer=_initialize_worker)
+
+    def evaluate_genomes(genomes: list[tuple[int, neat.DefaultGenome]], config: neat.Config) -> None:
+        """
+        Inner function to evaluate a generation of the run headless
+
+        :param genomes: the (genome_id, genome) for each individual of the population
+        :param config: the current neat configuration
+        """
+        if pool is None:
+            _evaluate_task(track_filepath, genomes, config, images_dir, cache_dir, tick_time, episode_time)
+            return
+
+        chunk_size = -(-len(genomes) // len(cores))
+        chunks = [genomes[i:i + chunk_size] for i in range(0, len(genomes), chunk_size)]
+        results = pool.starmap(_evaluate_task, [
+            (track_filepath, chunk, config, images_dir, cache_dir, tick_time, episode_time) for chunk in chunks
+        ])
+
+        for chunk, fitnesses in zip(chunks, results):
+            for (_, genome), fitness in zip(chunk, fitnesses):
+                genome.fitness = fitness
+
+    status = "completed"
+
+    try:
+        population.run(evaluate_genomes, num_generations)
+    except _EarlyStop:
+        status = "stopped"
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    return {
+        "status": status,
+        "generations": reporter.get_num_generations(),
+        "best_fitness": reporter.get_best_fitness()
+    }
+
+
+def run_sweep(
+    base_config_filepath: str,
+    runs: list[dict],
+    output_dir: str,
+    num_generations: int,
+    track_filepath: str = "assets/tracks/oval.xml",
+    cores_per_run: int = 1,
+    max_concurrent_runs: int | None = None,
+    grace_generations: int = 5,
+    min_peers: int = 3,
+    seed: int | None = None,
+    tick_time: float = 1 / 20,
+    episode_time: float = EPISODE_TIME,
+    images_dir: str = "assets/images/",
+    cache_dir: str = "assets/cache/"
+) -> list[dict]:
+    """
+    Train a population for every set of parameters of a sweep, running several runs at once, and summarize the results
+
+    The available cores are divided into slots of `cores_per_run` cores, and every run is pinned to a free slot. A run
+    whose best fitness falls below the median of the other runs at the same generation (after `grace_generations`) is
+    stopped early. The summary table (`summary.csv` in the output directory) is rewritten every time a run finishes.
+
+    :param base_config_filepath: the path to the neat configuration file the parameters are applied to
+    :param runs: the parameters of every run (see `grid_search` and `random_search`)
+    :param output_dir: the directory to write the configuration of every run and the summary table to
+    :param num_generations: the maximum number of generations of every run
+    :param track_filepath: the path to the track xml file, for runs without a "track" parameter
+    :param cores_per_run: the number of cores allotted to every run
+    :param max_concurrent_runs: the maximum number of runs at once, as many as there are core slots if not provided
+    :param grace_generations: the number of generations a run is never stopped during
+    :param min_peers: the minimum number of other runs that reached a generation before stopping runs behind them
+    :param seed: the base seed of the runs (run i uses seed + i), random if not provided
+    :param tick_time: the time between updates in seconds
+    :param episode_time: the simulated duration of each episode in seconds
+    :param images_dir: the directory holding the track images
+    :param cache_dir: the directory to store compiled tracks in
+    :return: the rows of the summary table, best first
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Write the configuration of every run and compile every track once up front
+    config_filepaths = []
+
+    for run_id, params in enumerate(runs):
+        config_filepath = os.path.join(output_dir, f"config-{run_id}.txt")
+        write_config(base_config_filepath, params, config_filepath)
+        config_filepaths.append(config_filepath)
+
+    track_filepaths = [params.get("track", track_filepath) for params in runs]
+
+    for filepath in set(track_filepaths):
+        CompiledTrack.compile(filepath, images_dir, cache_dir)
+
+    # Divide the cores into slots
+    cores = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count()))
+    slots = [cores[i:i + cores_per_run] for i in range(0, len(cores) - cores_per_run + 1, cores_per_run)] or [cores]
+
+    if max_concurrent_runs is not None:
+        slots = slots[:max_concurrent_runs]
+
+    rows = []
+    pending = list(enumerate(runs))
+    running = {}
+
+    with multiprocessing.Manager() as manager, ProcessPoolExecutor(len(slots)) as executor:
+        progress = manager.dict()
+        free_slots = list(reversed(slots))
+
+        while pending or running:
+            # Start runs on the free slots
+            while pending and free_slots:
+                run_id, params = pending.pop(0)
+                slot = free_slots.pop()
+                future = executor.submit(
+                    _run_trial, run_id, config_filepaths[run_id], track_filepaths[run_id], slot, progress,
+                    num_generations, grace_generations, min_peers, seed, tick_time, episode_time, images_dir, cache_dir
+                )
+                running[future] = (run_id, params, slot, time.monotonic())
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                run_id, params, slot, start_time = running.pop(future)
+                free_slots.append(slot)
+
+                try:
+                    result = future.result()
+                except Exception as error:
+                    print(f"[WARNING]: Run {run_id} failed: {error!r}")
+                    result = {"status": "failed", "generations": 0, "best_fitness": None}
+
+                rows.append({
+                    "run_id": run_id,
+                    **{name: value for name, value in params.items() if name != "track"},
+                    "track": os.path.basename(track_filepaths[run_id]),
+                    **result,
+                    "seconds": round(time.monotonic() - start_time, 3),
+                    "config": config_filepaths[run_id]
+                })
+                _write_summary(os.path.join(output_dir, "summary.csv"), rows)
+
+    return _write_summary(os.path.join(output_dir, "summary.csv"), rows)
+
+
+def _write_summary(filepath: str, rows: list[dict]) -> list[dict]:
+    """
+    Convenience function to write the summary table of a sweep, best run first
+
+    :param filepath: the path of the csv file to write
+    :param rows: the rows of the runs finished so far
+    :return: the rows, sorted best first
+    """
+    rows.sort(key=lambda row: (row["best_fitness"] is None, -(row["best_fitness"] or 0)))
+    fieldnames = list(dict.fromkeys(name for row in rows for name in row))
+
+    with open(filepath, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    return rows
@@ -0,0 +1,326 @@
+from .simulation import Simulation
+from .remote_evaluation import RemoteEvaluator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from neat.math_util import mean
+import neat
+import json
+import os
+import socketserver
+import threading
+import time
+
+
+class Telemetry(neat.reporting.BaseReporter):
+    """
+    Exposes live training metrics over a local HTTP endpoint
+
+    Add it to a population as a reporter to track the generation, the phase timings, and the fitness, then watch the
+    simulation and/or the remote evaluator the population is trained with. Nothing is collected on the hot path: the
+    simulation and the evaluator only bump plain counters, which are read (and turned into rates) when the endpoint is
+    scraped from the background server thread.
+
+    The endpoint serves `/metrics` as Prometheus text and `/metrics.json` (or `/`) as json, over TCP or a Unix socket.
+    """
+    PREFIX = "neat_driver"
+
+    def __init__(self) -> None:
+        """
+        Constructor
+        """
+        self._simulation = None
+        self._evaluator = None
+        self._server = None
+        self._server_thread = None
+        self._lock = threading.Lock()
+
+        self._generation = None
+        self._best_fitness = None
+        self._mean_fitness = None
+        self._phase_start_time = None
+        self._phase_timings = {}
+
+        # The previous sample of the counters, used to turn them into rates
+        self._sample_time = time.monotonic()
+        self._sample_ticks = 0
+        self._sample_busy_time = 0.0
+        self._ticks_per_second = 0.0
+        self._worker_utilization = None
+
+    def watch_simulation(self, simulation: Simulation) -> None:
+        """
+        Report the ticks and live drivers of a (local) simulation
+
+        :param simulation: the simulation to watch
+        """
+        with self._lock:
+            self._simulation = simulation
+            self._sample_ticks = self._count_ticks()
+
+    def watch_evaluator(self, evaluator: RemoteEvaluator) -> None:
+        """
+        Report the ticks and the utilization of the workers of a remote evaluator
+
+        :param evaluator: the evaluator to watch
+        """
+        with self._lock:
+            self._evaluator = evaluator
+            self._sample_ticks = self._count_ticks()
+            self._sample_busy_time = evaluator.get_busy_time()
+
+    def start_generation(self, generation: int) -> None:
+        """
+        Mark the start of the evaluation phase of a generation
+
+        :param generation: the generation number
+        """
+        with self._lock:
+            self._generation = generation
+            self._phase_start_time = time.perf_counter()
+
+    def post_evaluate(
+        self,
+        config: neat.Config,
+        population: dict,
+        species: neat.DefaultSpeciesSet,
+        best_genome: neat.DefaultGenome
+    ) -> None:
+        """
+        Record the fitness of the generation and mark the end of its evaluation phase
+
+        :param config: the current neat configuration
+        :param population: the genomes of the population, keyed by genome id
+        :param species: the species set of the population
+        :param best_genome: the best genome of the generation
+        """
+        mean_fitness = mean([genome.fitness for genome in population.values()])
+
+        with self._lock:
+            self._best_fitness = best_genome.fitness
+            self._mean_fitness = mean_fitness
+            self._end_phase("evaluation")
+
+    def end_generation(self, config: neat.Config, population: dict, species_set: neat.DefaultSpeciesSet) -> None:
+        """
+        Mark the end of the reproduction (and speciation) phase of a generation
+
+        :param config: the current neat configuration
+        :param population: the genomes of the new population, keyed by genome id
+        :param species_set: the species set of the new population
+        """
+        with self._lock:
+            self._end_phase("reproduction")
+
+    def _end_phase(self, name: str) -> None:
+        """
+        Convenience function to record the duration of the phase that just ended and start timing the next one
+
+        :param name: the name of the phase that ended
+        """
+        now = time.perf_counter()
+
+        if self._phase_start_time is not None:
+            self._phase_timings[name] = now - self._phase_start_time
+
+        self._phase_start_time = now
+
+    def get_metrics(self) -> dict:
+        """
+        Sample the current metrics
+
+        :return: the metrics, keyed by name (values that are unknown so far are `None`)
+        """
+        with self._lock:
+            self._sample()
+
+            metrics = {
+                "generation": self._generation,
+                "ticks_total": self._count_ticks(),
+                "ticks_per_second": self._ticks_per_second,
+                "live_drivers": None,
+                "phase_seconds": dict(self._phase_timings),
+                "best_fitness": self._best_fitness,
+                "mean_fitness": self._mean_fitness,
+                "workers": None,
+                "busy_workers": None,
+                "worker_utilization": self._worker_utilization,
+            }
+
+        # Copy the driver list first, the simulation keeps running in the main thread
+        if self._simulation is not None:
+            drivers = list(self._simulation.get_drivers())
+            metrics["live_drivers"] = sum(not driver.is_off_track() for driver in drivers)
+
+        if self._evaluator is not None:
+            metrics["workers"] = self._evaluator.get_num_workers()
+            metrics["busy_workers"] = self._evaluator.get_num_busy_workers()
+
+        return metrics
+
+    def _count_ticks(self) -> int:
+        """
+        Convenience function to count the ticks run so far, locally and by the workers
+
+        :return: the number of ticks
+        """
+        num_ticks = 0
+
+        if self._simulation is not None:
+            num_ticks += self._simulation.get_num_ticks()
+
+        if self._evaluator is not None:
+            num_ticks += self._evaluator.get_num_ticks()
+
+        return num_ticks
+
+    def _sample(self, min_interval: float = 1) -> None:
+        """
+        Convenience function to update the rates from the counters, at most once per interval so frequent scrapes don't
+        produce noisy rates
+
+        :param min_interval: the minimum time between samples in seconds
+        """
+        now = time.monotonic()
+        elapsed = now - self._sample_time
+
+        if elapsed < min_interval:
+            return
+
+        num_ticks = self._count_ticks()
+        self._ticks_per_second = (num_ticks - self._sample_ticks) / elapsed
+        self._sample_ticks = num_ticks
+
+        # The utilization is the share of the connected workers' time spent evaluating batches
+        if self._evaluator is not None:
+            busy_time = self._evaluator.get_busy_time()
+            num_workers = self._evaluator.get_num_workers()
+            self._worker_utilization = (
+                min((busy_time - self._sample_busy_time) / (elapsed * num_workers), 1.0) if num_workers > 0 else 0.0
+            )
+            self._sample_busy_time = busy_time
+
+        self._sample_time = now
+
+    def to_prometheus(self) -> str:
+        """
+        Format the current metrics in the Prometheus text exposition format
+
+        :return: the formatted metrics
+        """
+        metrics = self.get_metrics()
+        lines = []
+
+        def add(name: str, kind: str, value: float | None, labels: str = "") -> None:
+            if value is not None:
+                if not labels:
+                    lines.append(f"# TYPE {self.PREFIX}_{name} {kind}")
+
+                lines.append(f"{self.PREFIX}_{name}{labels} {value}")
+
+        add("generation", "gauge", metrics["generation"])
+        add("ticks_total", "counter", metrics["ticks_total"])
+        add("ticks_per_second", "gauge", metrics["ticks_per_second"])
+        add("live_drivers", "gauge", metrics["live_drivers"])
+        add("best_fitness", "gauge", metrics["best_fitness"])
+        add("mean_fitness", "gauge", metrics["mean_fitness"])
+        add("workers", "gauge", metrics["workers"])
+        add("busy_workers", "gauge", metrics["busy_workers"])
+        add("worker_utilization", "gauge", metrics["worker_utilization"])
+
+        if metrics["phase_seconds"]:
+            lines.append(f"# TYPE {self.PREFIX}_phase_seconds gauge")
+
+            for phase, seconds in metrics["phase_seconds"].items():
+                add("phase_seconds", "gauge", seconds, f'{{phase="{phase}"}}')
+
+        return "\n".join(lines) + "\n"
+
+    def serve(self, address: tuple[str, int] | str) -> tuple[str, int] | str:
+        """
+        Start serving the metrics from a background thread
+
+        :param address: a (host, port) to listen on over TCP (port 0 picks a free port), or the path of a Unix socket
+        :return: the address the endpoint is listening on
+        """
+        handler = type("Handler", (_TelemetryHandler,), {"telemetry": self})
+
+        if isinstance(address, str):
+            if os.path.exists(address):
+                os.remove(address)
+
+            self._server = _UnixHTTPServer(address, handler)
+        else:
+            self._server = ThreadingHTTPServer(address, handler)
+
+        self._server_thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._server_thread.start()
+
+        return self.get_address()
+
+    def get_address(self) -> tuple[str, int] | str | None:
+        """
+        Get the address the endpoint is listening on
+
+        :return: the (host, port) or the Unix socket path, `None` if not serving
+        """
+        if self._server is None:
+            return None
+
+        address = self._server.server_address
+        return address if isinstance(address, str) else tuple(address[:2])
+
+    def close(self) -> None:
+        """
+        Stop serving the metrics
+        """
+        if self._server is None:
+            return
+
+        self._server.shutdown()
+        self._server.server_close()
+        self._server_thread.join()
+
+        if isinstance(self._server.server_address, str) and os.path.exists(self._server.server_address):
+            os.remove(self._server.server_address)
+
+        self._server = None
+        self._server_thread = None
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    A threading HTTP server listening on a Unix socket
+    """
+    daemon_threads = True
+
+
+class _TelemetryHandler(BaseHTTPRequestHandler):
+    """
+    Serves the metrics of a `Telemetry` instance (set as the `telemetry` class attribute)
+    """
+    telemetry = None
+
+    def do_GET(self) -> None:
+        """
+        Respond with the metrics in the format matching the requested path
+        """
+        if self.path == "/metrics":
+            body = self.telemetry.to_prometheus().encode()
+            content_type = "text/plain; version=0.0.4"
+        elif self.path in ("/", "/metrics.json"):
+            body = json.dumps(self.telemetry.get_metrics()).encode()
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        """
+        Keep scrapes out of the training output
+        """
+        pass
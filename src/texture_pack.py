@@ -1,34 +1,146 @@
 from pyray import *
+from typing import Iterable
 import os
 
 
 class TexturePack:
     """
     A singleton for managing raylib textures
+
+    Small images (sprites) are packed into a single atlas texture, so that every object drawn from a sprite binds the
+    same texture and raylib can batch their draws. Other images (e.g. track backgrounds) get a texture of their own.
     """
+    # The maximum width/height of a sprite in the atlas, larger sprites are scaled down to fit
+    SPRITE_MAX_SIZE = 512
+
+    # The maximum width/height of the atlas and the transparent gap left around each sprite (to avoid bleeding)
+    ATLAS_MAX_SIZE = 4096
+    ATLAS_PADDING = 2
+
     _textures: dict[str, Texture] = {}
     _images: dict[str, Image] = {}
+    _atlas: Texture = None
+    _sprite_rects: dict[str, Rectangle] = {}
 
     @classmethod
-    def load_all(cls, images_dir: str) -> None:
+    def load_all(cls, images_dir: str, sprite_filenames: Iterable[str] | None = None) -> None:
         """
         Load all textures from a directory
 
         This function assumes that all loaded textures have a different filename
 
         :param images_dir: the path to the images directory
+        :param sprite_filenames: the filenames of the images to pack into the atlas, if not provided every image no
+            larger than `SPRITE_MAX_SIZE` in both dimensions is packed
         """
+        sprites = {}
+
         for filename in os.listdir(images_dir):
             absolute_path = os.path.abspath(os.path.join(images_dir, filename))
-            texture = load_texture(absolute_path)
             image = load_image(absolute_path)
 
+            if not is_image_ready(image):
+                continue
+
+            cls._images[filename] = image
+
+            if sprite_filenames is None:
+                is_sprite = max(image.width, image.height) <= cls.SPRITE_MAX_SIZE
+            else:
+                is_sprite = filename in sprite_filenames
+
+            if is_sprite:
+                sprites[filename] = image
+                continue
+
+            texture = load_texture_from_image(image)
+
             if is_texture_ready(texture):
                 set_texture_filter(texture, TextureFilter.TEXTURE_FILTER_BILINEAR)
                 cls._textures[filename] = texture
 
-            if is_image_ready(image):
-                cls._images[filename] = image
+        if not sprites:
+            return
+
+        # Upload all the sprites as a single texture
+        atlas_image, sprite_rects = cls._build_atlas(sprites)
+        atlas = load_texture_from_image(atlas_image)
+        unload_image(atlas_image)
+
+        if is_texture_ready(atlas):
+            set_texture_filter(atlas, TextureFilter.TEXTURE_FILTER_BILINEAR)
+            cls._atlas = atlas
+            cls._sprite_rects.update(sprite_rects)
+
+    @classmethod
+    def _build_atlas(cls, sprites: dict[str, Image]) -> tuple[Image, dict[str, Rectangle]]:
+        """
+        Convenience function to pack sprites into a single atlas image
+
+        Sprites are placed on shelves from tallest to shortest, and the atlas grows in powers of two until they fit
+
+        :param sprites: the images to pack, keyed by filename
+        :return: the atlas image and the area of each sprite in it, keyed by filename
+        """
+        # Determine the size of every sprite in the atlas, scaling down the oversized ones
+        sizes = {}
+
+        for filename, image in sprites.items():
+            scale = min(1, cls.SPRITE_MAX_SIZE / max(image.width, image.height))
+            sizes[filename] = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+
+        order = sorted(sizes, key=lambda filename: (-sizes[filename][1], filename))
+        padding = cls.ATLAS_PADDING
+        atlas_size = 256
+
+        while atlas_size < max(width for width, _ in sizes.values()) + 2 * padding:
+            atlas_size *= 2
+
+        # Pack into the smallest square atlas that fits everything
+        while True:
+            positions = {}
+            x, y, shelf_height = padding, padding, 0
+
+            for filename in order:
+                width, height = sizes[filename]
+
+                # Start a new shelf once this one is full
+                if x + width + padding > atlas_size:
+                    x, y, shelf_height = padding, y + shelf_height + padding, 0
+
+                positions[filename] = (x, y)
+                x += width + padding
+                shelf_height = max(shelf_height, height)
+
+            if y + shelf_height + padding <= atlas_size:
+                break
+
+            if atlas_size >= cls.ATLAS_MAX_SIZE:
+                raise ValueError(f"[ERROR]: Sprites do not fit in a {cls.ATLAS_MAX_SIZE}px texture atlas")
+
+            atlas_size *= 2
+
+        # Copy every sprite into its area of the atlas
+        atlas = gen_image_color(atlas_size, atlas_size, BLANK)
+        sprite_rects = {}
+
+        for filename in order:
+            image = sprites[filename]
+            width, height = sizes[filename]
+            x, y = positions[filename]
+
+            sprite_rects[filename] = Rectangle(x, y, width, height)
+            source_rect = Rectangle(0, 0, image.width, image.height)
+
+            if (width, height) == (image.width, image.height):
+                image_draw(atlas, image, source_rect, sprite_rects[filename], WHITE)
+            else:
+                scaled = image_copy(image)
+                image_resize(scaled, width, height)
+                image_draw(atlas, scaled, Rectangle(0, 0, width, height), sprite_rects[filename], WHITE)
+                unload_image(scaled)
+
+        return atlas, sprite_rects
 
     @classmethod
     def unload_all(cls) -> None:
@@ -41,19 +153,45 @@ class TexturePack:
         for image in cls._images.values():
             unload_image(image)
 
+        if cls._atlas is not None:
+            unload_texture(cls._atlas)
+
         cls._textures.clear()
         cls._images.clear()
+        cls._sprite_rects.clear()
+        cls._atlas = None
 
     @classmethod
     def get_texture(cls, filename: str) -> Texture:
         """
         Get a loaded texture
 
+        Sprites share the atlas texture, use `get_sprite` to also get their area of it
+
         :param filename: the filename of the texture to get
         :return: the loaded texture if found, None otherwise
         """
+        if filename in cls._sprite_rects:
+            return cls._atlas
+
         return cls._textures.get(filename, None)
 
+    @classmethod
+    def get_sprite(cls, filename: str) -> tuple[Texture, Rectangle]:
+        """
+        Get a loaded texture along with the area of it holding the image
+
+        :param filename: the filename of the texture to get
+        :return: the (texture, source rectangle) if found, None otherwise
+        """
+        if (rect := cls._sprite_rects.get(filename)) is not None:
+            return cls._atlas, rect
+
+        if (texture := cls._textures.get(filename)) is not None:
+            return texture, Rectangle(0, 0, texture.width, texture.height)
+
+        return None
+
     @classmethod
     def get_image(cls, filename: str) -> Image:
         """
@@ -0,0 +1,143 @@
+from pyray import *
+import numpy as np
+import os
+
+
+class TiledMask:
+    """
+    A read-only occupancy mask stored as bit-packed square tiles in a memory-mapped file
+
+    The file is never read as a whole: the operating system pages tiles in as they are touched and shares them between
+    every process mapping the same file, so very large maps cost (almost) nothing per process. The mask is indexed as
+    [y, x] with integers or integer arrays, like the boolean arrays used by `Track`.
+    """
+    MAGIC = b"NDTILES1"
+    HEADER = np.dtype([("magic", "S8"), ("width", "<u8"), ("height", "<u8"), ("tile_size", "<u8")])
+    DATA_OFFSET = 4096
+
+    def __init__(self, filepath: str) -> None:
+        """
+        Constructor
+
+        :param filepath: the path to the tiled mask file
+        """
+        header = np.fromfile(filepath, dtype=self.HEADER, count=1)[0]
+
+        if header["magic"] != self.MAGIC:
+            raise ValueError(f"[ERROR]: '{filepath}' is not a tiled mask")
+
+        self._filepath = filepath
+        self._width = int(header["width"])
+        self._height = int(header["height"])
+        self._tile_size = int(header["tile_size"])
+
+        tiles_x = -(-self._width // self._tile_size)
+        tiles_y = -(-self._height // self._tile_size)
+        shape = (tiles_y, tiles_x, self._tile_size, self._tile_size // 8)
+        self._tiles = np.memmap(filepath, dtype=np.uint8, mode="r", offset=self.DATA_OFFSET, shape=shape)
+
+    @classmethod
+    def create(cls, filepath: str, mask: np.ndarray, tile_size: int = 256) -> "TiledMask":
+        """
+        Write a mask to a tiled mask file
+
+        The mask is processed one row of tiles at a time, so it may itself be memory-mapped
+
+        :param filepath: the path to write the file to
+        :param mask: an array indexed as [y, x] that is truthy wherever the map is a valid (on track) location
+        :param tile_size: the width and height of a tile in pixels (a multiple of 8)
+        :return: the written tiled mask
+        """
+        if tile_size % 8 != 0:
+            raise ValueError("[ERROR]: The tile size must be a multiple of 8")
+
+        height, width = mask.shape
+        tiles_x = -(-width // tile_size)
+        tiles_y = -(-height // tile_size)
+
+        header = np.array([(cls.MAGIC, width, height, tile_size)], dtype=cls.HEADER)
+        temp_filepath = f"{filepath}.{os.getpid()}.tmp"
+
+        with open(temp_filepath, "wb") as file:
+            file.write(header.tobytes())
+            file.seek(cls.DATA_OFFSET)
+
+            for tile_y in range(tiles_y):
+                # Pad the row of tiles with invalid pixels up to a whole number of tiles
+                strip = np.zeros((tile_size, tiles_x * tile_size), dtype=bool)
+                rows = np.asarray(mask[tile_y * tile_size:(tile_y + 1) * tile_size], dtype=bool)
+                strip[:len(rows), :width] = rows
+
+                # Reorder the strip tile by tile and pack 8 pixels per byte
+                tiles = strip.reshape(tile_size, tiles_x, tile_size).transpose(1, 0, 2)
+                file.write(np.packbits(tiles, axis=2).tobytes())
+
+        os.replace(temp_filepath, filepath)
+        return cls(filepath)
+
+    @classmethod
+    def from_image(cls, image_filepath: str, filepath: str, tile_size: int = 256) -> "TiledMask":
+        """
+        Convert a map image into a tiled mask file (any pixel with a non-zero alpha is valid)
+
+        :param image_filepath: the path to the map image
+        :param filepath: the path to write the file to
+        :param tile_size: the width and height of a tile in pixels (a multiple of 8)
+        :return: the written tiled mask
+        """
+        image = load_image(image_filepath)
+        colors = load_image_colors(image)
+        pixels = np.frombuffer(ffi.buffer(colors, image.width * image.height * 4), dtype=np.uint8)
+        mask = pixels.reshape(image.height, image.width, 4)[:, :, 3] != 0
+
+        tiled_mask = cls.create(filepath, mask, tile_size)
+        unload_image_colors(colors)
+        unload_image(image)
+
+        return tiled_mask
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        """
+        Get the shape of the mask
+
+        :return: the (height, width) of the mask in pixels
+        """
+        return self._height, self._width
+
+    def get_filepath(self) -> str:
+        """
+        Get the path of the tiled mask file
+
+        :return: the path to the file
+        """
+        return self._filepath
+
+    def get_tile_size(self) -> int:
+        """
+        Get the width and height of a tile
+
+        :return: the tile size in pixels
+        """
+        return self._tile_size
+
+    def __getitem__(self, index: tuple) -> np.ndarray | bool:
+        """
+        Look up pixels of the mask
+
+        :param index: the (y, x) pixel coordinates, as integers or integer arrays
+        :return: `True` for each valid (on track) pixel, `False` otherwise
+        """
+        y, x = index
+        scalar = np.isscalar(y) and np.isscalar(x)
+        y, x = np.asarray(y, dtype=np.int64), np.asarray(x, dtype=np.int64)
+
+        if ((y < 0) | (y >= self._height) | (x < 0) | (x >= self._width)).any():
+            raise IndexError("[ERROR]: Pixel index out of bounds")
+
+        tile_y, row = np.divmod(y, self._tile_size)
+        tile_x, column = np.divmod(x, self._tile_size)
+        packed = self._tiles[tile_y, tile_x, row, column >> 3]
+        valid = (packed >> (7 - (column & 7)).astype(np.uint8)) & 1 == 1
+
+        return bool(valid) if scalar else valid
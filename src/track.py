@@ -2,8 +2,10 @@ from pyray import *
 from .sim_object import SimObject
 from .obstacle_base import ObstacleBase
 from .texture_pack import TexturePack
+from .tiled_mask import TiledMask
 from xml.etree.ElementTree import Element
-from math import radians, sin, cos, inf
+from math import radians, sin, cos, inf, ceil
+import numpy as np
 
 
 class Track(SimObject):
@@ -16,12 +18,18 @@ class Track(SimObject):
         """
         super().__init__()
         self._map = None
+        self._mask = None
+        self._distance_field = None
+        self._mask_level = None
+        self._pyramid = None
+        self._pyramid_obstacles = None
+        self._skip_empty_space = True
         self._driver_start_pos = Vector2(0, 0)
         self._driver_start_angle = 0
         self._obstacles = []
 
-        # TODO: move the checkpoints to an xml file (these are for the oval track)
-        self._checkpoints = [] #[(Vector2(50, 75), Vector2(150, 75))]
+        # Checkpoints are loaded from <checkpoint x1="" y1="" x2="" y2=""/> children of the track xml node
+        self._checkpoints = []
 
         # TODO: move this obstacle to an xml file (this is for the oval track)
         #obstacle = ObstacleBase(Vector2(7, 7), "box.png")
@@ -92,6 +100,267 @@ class Track(SimObject):
         """
         self._driver_start_angle = angle
 
+    def get_map(self) -> Image:
+        """
+        Get the map image describing the valid play area
+
+        :return: the map image, None if no map is loaded
+        """
+        return self._map
+
+    def set_map(self, map_image: Image) -> None:
+        """
+        Set the map image describing the valid play area
+
+        Any pixel with a non-zero alpha channel is considered a valid (on track) location
+
+        :param map_image: the new map image
+        """
+        self._map = map_image
+        self._mask = None
+        self._distance_field = None
+        self._mask_level = None
+        self._pyramid = None
+
+    def get_mask(self) -> np.ndarray | TiledMask:
+        """
+        Get the occupancy mask of the map
+
+        The mask is built from the map image the first time it is requested and indexed as [y, x]
+
+        :return: a boolean array (or tiled mask) that is `True` wherever the map is a valid (on track) location
+        """
+        if self._mask is None:
+            colors = load_image_colors(self._map)
+            pixels = np.frombuffer(ffi.buffer(colors, self._map.width * self._map.height * 4), dtype=np.uint8)
+            self._mask = pixels.reshape(self._map.height, self._map.width, 4)[:, :, 3] != 0
+            unload_image_colors(colors)
+
+        return self._mask
+
+    def set_mask(self, mask: np.ndarray | TiledMask) -> None:
+        """
+        Set the occupancy mask of the map directly, without a map image
+
+        Very large maps should use a `TiledMask`, which is memory-mapped and shared between processes
+
+        :param mask: an array indexed as [y, x] that is truthy wherever the map is a valid (on track) location
+        """
+        self._mask = mask
+        self._distance_field = None
+        self._mask_level = None
+        self._pyramid = None
+
+    def get_distance_field(self) -> np.ndarray:
+        """
+        Get the distance from every map pixel to the nearest invalid (off track) pixel
+
+        The area outside the map counts as invalid. The field is computed from the mask the first time it is requested
+
+        :return: an array indexed as [y, x] of euclidean distances in map pixels (0 for invalid pixels)
+        """
+        if self._distance_field is None:
+            self._distance_field = self._compute_distance_field(self.get_mask())
+
+        return self._distance_field
+
+    def set_distance_field(self, distance_field: np.ndarray) -> None:
+        """
+        Set a precomputed distance field for the current mask
+
+        :param distance_field: an array indexed as [y, x] of distances to the nearest invalid pixel in map pixels
+        """
+        self._distance_field = distance_field
+
+    @staticmethod
+    def _compute_distance_field(mask: np.ndarray | TiledMask) -> np.ndarray:
+        """
+        Convenience function to compute the exact euclidean distance transform of a mask
+
+        :param mask: the occupancy mask indexed as [y, x] (an array or a tiled mask)
+        :return: the distance from every pixel to the nearest invalid pixel in map pixels
+        """
+        if not isinstance(mask, TiledMask):
+            mask = np.asarray(mask, dtype=bool)
+
+        height, width = mask.shape
+        columns = np.arange(width)
+        strip_height = 256
+
+        def read_strip(y: int) -> np.ndarray:
+            """
+            Inner function to read a strip of rows of the mask, so tiled masks never have to be read as a whole
+
+            :param y: the first row of the strip
+            :return: the rows of the strip indexed as [y, x]
+            """
+            rows = np.arange(y, min(y + strip_height, height))
+            return np.asarray(mask[rows[:, None], columns[None, :]], dtype=bool)
+
+        # Vertical pass: distance to the nearest invalid pixel in the same column, scanning down and then up
+        column_dist = np.empty((height, width))
+        run = np.zeros(width)
+
+        for y in range(0, height, strip_height):
+            for row_index, row in enumerate(read_strip(y)):
+                run = np.where(row, run + 1, 0)
+                column_dist[y + row_index] = run
+
+        run = np.zeros(width)
+
+        for y in reversed(range(0, height, strip_height)):
+            strip = read_strip(y)
+
+            for row_index in reversed(range(len(strip))):
+                run = np.where(strip[row_index], run + 1, 0)
+                column_dist[y + row_index] = np.minimum(column_dist[y + row_index], run)
+
+        # Horizontal pass: combine the column distances of neighboring columns until no closer pixel can exist
+        column_sq = column_dist ** 2
+        x = np.arange(width)
+        dist_sq = np.minimum(column_sq, np.minimum((x + 1) ** 2, (width - x) ** 2))
+        dx = 1
+
+        while dx < width and dx * dx < dist_sq.max():
+            np.minimum(dist_sq[:, dx:], column_sq[:, :-dx] + dx * dx, out=dist_sq[:, dx:])
+            np.minimum(dist_sq[:, :-dx], column_sq[:, dx:] + dx * dx, out=dist_sq[:, :-dx])
+            dx += 1
+
+        return np.sqrt(dist_sq).astype(np.float32)
+
+    def get_pyramid(self) -> list[np.ndarray]:
+        """
+        Get the occupancy pyramid used to skip empty space when casting rays
+
+        Level k of the pyramid (stored at index k - 1) is `True` for every block of 2^k by 2^k map pixels that only
+        holds valid (on track) pixels and no obstacle. The finest level of the mask alone is built the first time the
+        pyramid is requested, and the pyramid is rebuilt from it whenever an obstacle was added, removed, moved,
+        rotated, or resized since the last request
+
+        :return: the levels of the pyramid, from the finest (2x2 blocks) to a single block covering the map
+        """
+        obstacles = self._get_obstacle_poses()
+
+        if self._pyramid is None or obstacles != self._pyramid_obstacles:
+            self._pyramid = self._build_pyramid()
+            self._pyramid_obstacles = obstacles
+
+        return self._pyramid
+
+    def _get_obstacle_poses(self) -> tuple:
+        """
+        Convenience function to capture the obstacles and their poses, to tell when the pyramid is out of date
+
+        :return: the size of the track followed by every obstacle with its position, angle, and size
+        """
+        return (self._size.x, self._size.y) + tuple(
+            (obstacle, obstacle.get_x(), obstacle.get_y(), obstacle.get_angle(), obstacle.get_width(),
+             obstacle.get_height())
+            for obstacle in self._obstacles
+        )
+
+    def set_skip_empty_space(self, skip_empty_space: bool) -> None:
+        """
+        Set whether rays skip whole blocks of valid pixels using the occupancy pyramid
+
+        Both modes produce the same collisions, stepping pixel by pixel is only useful as a reference
+
+        :param skip_empty_space: `True` to skip empty space, `False` to step one map pixel at a time
+        """
+        self._skip_empty_space = skip_empty_space
+
+    def _build_mask_level(self) -> np.ndarray:
+        """
+        Convenience function to build the finest level of the occupancy pyramid from the mask alone
+
+        :return: an array that is `True` for every block of 2x2 map pixels that only holds valid (on track) pixels
+        """
+        mask = self.get_mask()
+        map_height, map_width = mask.shape
+        columns = np.arange(map_width)
+
+        # Build the level a strip of rows at a time, so tiled masks never have to be read as a whole
+        strip_height = 256
+        level = np.zeros((ceil(map_height / 2), ceil(map_width / 2)), dtype=bool)
+
+        for y in range(0, map_height, strip_height):
+            rows = np.arange(y, min(y + strip_height, map_height))
+            strip = np.asarray(mask[rows[:, None], columns[None, :]], dtype=bool)
+            level[y // 2:(y + len(rows) + 1) // 2] = self._reduce_blocks(strip)
+
+        return level
+
+    def _build_pyramid(self) -> list[np.ndarray]:
+        """
+        Convenience function to build the occupancy pyramid of the mask and the current obstacles
+
+        :return: the levels of the pyramid, from the finest (2x2 blocks) to a single block covering the map
+        """
+        if self._mask_level is None:
+            self._mask_level = self._build_mask_level()
+
+        level = self._mask_level.copy()
+        map_height, map_width = self.get_mask().shape
+
+        # Blocks overlapping the bounding box of an obstacle can't be skipped
+        scale_x = map_width / self._size.x
+        scale_y = map_height / self._size.y
+
+        for obstacle in self._obstacles:
+            box = obstacle.get_bounding_box()
+            min_x = max(0, int(box.x * scale_x) - 1) // 2
+            max_x = int((box.x + box.width) * scale_x + 1) // 2
+            min_y = max(0, int(box.y * scale_y) - 1) // 2
+            max_y = int((box.y + box.height) * scale_y + 1) // 2
+            level[min_y:max_y + 1, min_x:max_x + 1] = False
+
+        # Coarser levels are fully valid only if all four of their children are
+        pyramid = [level]
+
+        while level.shape[0] > 1 or level.shape[1] > 1:
+            level = self._reduce_blocks(level)
+            pyramid.append(level)
+
+        return pyramid
+
+    @staticmethod
+    def _reduce_blocks(level: np.ndarray) -> np.ndarray:
+        """
+        Convenience function to combine every 2x2 block of a level (blocks hanging off the map are not valid)
+
+        :param level: the level to reduce
+        :return: the next coarser level
+        """
+        height, width = level.shape
+        padded = np.zeros((height + height % 2, width + width % 2), dtype=bool)
+        padded[:height, :width] = level
+
+        return padded.reshape(padded.shape[0] // 2, 2, padded.shape[1] // 2, 2).all(axis=(1, 3))
+
+    def get_checkpoints(self) -> list[tuple[Vector2, Vector2]]:
+        """
+        Get the checkpoints of this track
+
+        :return: the (start, end) of each checkpoint line in world space
+        """
+        return self._checkpoints
+
+    def set_checkpoints(self, checkpoints: list[tuple[Vector2, Vector2]]) -> None:
+        """
+        Set the checkpoints of this track
+
+        :param checkpoints: the (start, end) of each checkpoint line in world space
+        """
+        self._checkpoints = checkpoints
+
+    def get_obstacles(self) -> list[ObstacleBase]:
+        """
+        Get the obstacles placed on this track
+
+        :return: the list of obstacles
+        """
+        return self._obstacles
+
     def xml_load(self, node: Element) -> None:
         """
         Load attributes about this track from a xml node
@@ -115,7 +384,22 @@ class Track(SimObject):
             map_image = TexturePack.get_image(map_filename)
 
             if map_image is not None:
-                self._map = map_image
+                self.set_map(map_image)
+
+        # Load a tiled map (used for valid placement on very large tracks, the path is relative to the working directory)
+        if (tiled_map_filepath := node.get("tiled_map")) is not None:
+            self.set_mask(TiledMask(tiled_map_filepath))
+
+        # Load the checkpoints
+        checkpoints = []
+
+        for child in node.iter("checkpoint"):
+            start = Vector2(float(child.get("x1", 0)), float(child.get("y1", 0)))
+            end = Vector2(float(child.get("x2", 0)), float(child.get("y2", 0)))
+            checkpoints.append((start, end))
+
+        if checkpoints:
+            self._checkpoints = checkpoints
 
     def draw(self) -> None:
         """
@@ -140,7 +424,8 @@ class Track(SimObject):
         :param pos: the world space position
         :return: the map coordinate
         """
-        return Vector2(pos.x / self._size.x * self._map.width, pos.y / self._size.y * self._map.height)
+        map_height, map_width = self.get_mask().shape
+        return Vector2(pos.x / self._size.x * map_width, pos.y / self._size.y * map_height)
 
     def _map_to_world(self, pos: Vector2) -> Vector2:
         """
@@ -149,7 +434,8 @@ class Track(SimObject):
         :param pos: the map-space position
         :return: the world coordinate
         """
-        return Vector2(pos.x / self._map.width * self._size.x, pos.y / self._map.height * self._size.y)
+        map_height, map_width = self.get_mask().shape
+        return Vector2(pos.x / map_width * self._size.x, pos.y / map_height * self._size.y)
 
     def is_off_track(self, pos: Vector2) -> bool:
         """
@@ -158,14 +444,35 @@ class Track(SimObject):
         :param pos: the position to check for in world space
         :return: `True` if the position is off the track, `False` otherwise
         """
+        mask = self.get_mask()
+        map_height, map_width = mask.shape
         map_coord = self._world_to_map(pos)
         pixel_x = int(map_coord.x)
         pixel_y = int(map_coord.y)
 
-        if pixel_x < 0 or pixel_x >= self._map.width or pixel_y < 0 or pixel_y >= self._map.height:
+        if pixel_x < 0 or pixel_x >= map_width or pixel_y < 0 or pixel_y >= map_height:
             return True
 
-        return get_image_color(self._map, pixel_x, pixel_y).a == 0
+        return not mask[pixel_y, pixel_x]
+
+    def is_off_track_batch(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """
+        Check if many positions are off the track at once
+
+        :param xs: the x positions to check in world space
+        :param ys: the y positions to check in world space
+        :return: `True` for each position that is off the track, `False` otherwise
+        """
+        mask = self.get_mask()
+        map_height, map_width = mask.shape
+        pixel_x = np.trunc(np.asarray(xs) / self._size.x * map_width).astype(np.int64)
+        pixel_y = np.trunc(np.asarray(ys) / self._size.y * map_height).astype(np.int64)
+
+        inside = (pixel_x >= 0) & (pixel_x < map_width) & (pixel_y >= 0) & (pixel_y < map_height)
+        off_track = np.ones(pixel_x.shape, dtype=bool)
+        off_track[inside] = ~np.asarray(mask[pixel_y[inside], pixel_x[inside]], dtype=bool)
+
+        return off_track
 
     def ray_collision(self, pos: Vector2, angle: float) -> Vector2:
         """
@@ -183,6 +490,8 @@ class Track(SimObject):
         delta_dist_y = inf if heading.y == 0 else abs(1 / heading.y)
 
         # Calculate where we are within the map space and the corresponding pixel indices
+        mask = self.get_mask()
+        map_height, map_width = mask.shape
         map_pos = self._world_to_map(pos)
         pixel_x = int(map_pos.x)
         pixel_y = int(map_pos.y)
@@ -196,10 +505,30 @@ class Track(SimObject):
         step_y = -1 if heading.y < 0 else 1
 
         # Cast the ray until we reach an obstacle or an edge of the track
+        pyramid = self.get_pyramid() if self._skip_empty_space else []
         found_end = False
         distance = 0
 
         while not found_end:
+            # Skip past the largest block of valid pixels holding the current pixel, stopping right before leaving it
+            level = 0
+
+            if 0 <= pixel_x < map_width and 0 <= pixel_y < map_height:
+                while level < len(pyramid) and pyramid[level][pixel_y >> (level + 1), pixel_x >> (level + 1)]:
+                    level += 1
+
+            if level > 0:
+                taken_x, taken_y = self._steps_within_block(
+                    level, pixel_x, pixel_y, side_dist_x, side_dist_y, delta_dist_x, delta_dist_y, step_x, step_y
+                )
+
+                if taken_x > 0:
+                    side_dist_x += taken_x * delta_dist_x
+                    pixel_x += taken_x * step_x
+                if taken_y > 0:
+                    side_dist_y += taken_y * delta_dist_y
+                    pixel_y += taken_y * step_y
+
             # Move to the next x or y boundary, whichever is closer
             if side_dist_x < side_dist_y:
                 distance = side_dist_x
@@ -211,11 +540,11 @@ class Track(SimObject):
                 pixel_y += step_y
 
             # If we are outside the map, we can terminate the cast
-            if pixel_x < 0 or pixel_x >= self._map.width or pixel_y < 0 or pixel_y >= self._map.height:
+            if pixel_x < 0 or pixel_x >= map_width or pixel_y < 0 or pixel_y >= map_height:
                 break
 
             # Otherwise, we can terminate the cast if we hit an invalid (transparent) location
-            if get_image_color(self._map, pixel_x, pixel_y).a == 0:
+            if not mask[pixel_y, pixel_x]:
                 found_end = True
                 break
 
@@ -228,7 +557,196 @@ class Track(SimObject):
                     break
 
         return pos if not found_end else self._map_to_world(vector2_add(map_pos, vector2_scale(heading, distance)))
-    
+
+    @staticmethod
+    def _steps_within_block(
+        level: int,
+        pixel_x: int,
+        pixel_y: int,
+        side_dist_x: float,
+        side_dist_y: float,
+        delta_dist_x: float,
+        delta_dist_y: float,
+        step_x: int,
+        step_y: int
+    ) -> tuple[int, int]:
+        """
+        Convenience function to count the DDA steps a ray takes before it leaves the block holding its current pixel
+
+        :param level: the pyramid level of the block
+        :param pixel_x: the current x pixel of the ray
+        :param pixel_y: the current y pixel of the ray
+        :param side_dist_x: the distance to the next x side
+        :param side_dist_y: the distance to the next y side
+        :param delta_dist_x: the distance between x sides
+        :param delta_dist_y: the distance between y sides
+        :param step_x: the x step between pixels
+        :param step_y: the y step between pixels
+        :return: the number of (x, y) steps taken while the ray stays within the block
+        """
+        # Count the steps along each axis needed to leave the block, and the distance at which that happens
+        block_size = 1 << level
+        block_x = pixel_x >> level << level
+        block_y = pixel_y >> level << level
+        exit_steps_x = block_x + block_size - pixel_x if step_x > 0 else pixel_x - block_x + 1
+        exit_steps_y = block_y + block_size - pixel_y if step_y > 0 else pixel_y - block_y + 1
+        exit_dist_x = inf if delta_dist_x == inf else side_dist_x + (exit_steps_x - 1) * delta_dist_x
+        exit_dist_y = inf if delta_dist_y == inf else side_dist_y + (exit_steps_y - 1) * delta_dist_y
+
+        # The DDA favors y sides on ties, so every y side up to (and including) an x exit is crossed first, while
+        # only the x sides strictly before a y exit are
+        if exit_dist_x < exit_dist_y:
+            taken_y = 0 if exit_dist_x < side_dist_y else int((exit_dist_x - side_dist_y) / delta_dist_y) + 1
+            return exit_steps_x - 1, min(taken_y, exit_steps_y - 1)
+
+        taken_x = 0 if exit_dist_y <= side_dist_x else ceil((exit_dist_y - side_dist_x) / delta_dist_x)
+        return min(taken_x, exit_steps_x - 1), exit_steps_y - 1
+
+    def cast_rays(self, xs: np.ndarray, ys: np.ndarray, angles: np.ndarray) -> np.ndarray:
+        """
+        Cast many rays at once and determine the distance to the edge of the track or an obstacle for each
+
+        This is a vectorized version of `ray_collision` that walks every ray through the same DDA traversal. Map
+        coordinates are rounded to 32-bit floats to mirror the raylib vectors used by `ray_collision`, so each ray
+        visits the same pixels as its scalar counterpart.
+
+        :param xs: the x positions to start the rays from in world space
+        :param ys: the y positions to start the rays from in world space
+        :param angles: the angles/headings of the rays
+        :return: the world-space distance until a collision for each ray (0 if the ray leaves the map)
+        """
+        mask = self.get_mask()
+        map_height, map_width = mask.shape
+        xs, ys, angles = np.broadcast_arrays(np.asarray(xs, np.float64), np.asarray(ys, np.float64), angles)
+        xs, ys, angles = xs.ravel(), ys.ravel(), np.asarray(angles, np.float64).ravel()
+
+        # Based on the headings, calculate the distance to travel between x and y pixel sides in map space
+        heading_x = np.cos(angles).astype(np.float32).astype(np.float64)
+        heading_y = np.sin(angles).astype(np.float32).astype(np.float64)
+
+        with np.errstate(divide="ignore"):
+            delta_dist_x = np.where(heading_x == 0, inf, np.abs(1 / heading_x))
+            delta_dist_y = np.where(heading_y == 0, inf, np.abs(1 / heading_y))
+
+        # Calculate where each ray starts within the map space and the corresponding pixel indices
+        scale_x = map_width / self._size.x
+        scale_y = map_height / self._size.y
+        map_x = (xs / self._size.x * map_width).astype(np.float32).astype(np.float64)
+        map_y = (ys / self._size.y * map_height).astype(np.float32).astype(np.float64)
+        pixel_x = np.trunc(map_x).astype(np.int64)
+        pixel_y = np.trunc(map_y).astype(np.int64)
+
+        # Calculate the initial step to the next x or y side and the step between pixels based on the headings
+        with np.errstate(invalid="ignore"):
+            side_dist_x = np.where(heading_x < 0, map_x - pixel_x, pixel_x + 1 - map_x) * delta_dist_x
+            side_dist_y = np.where(heading_y < 0, map_y - pixel_y, pixel_y + 1 - map_y) * delta_dist_y
+
+        step_x = np.where(heading_x < 0, -1, 1)
+        step_y = np.where(heading_y < 0, -1, 1)
+
+        # Step every ray that is still travelling, dropping rays from the working set as they terminate
+        pyramid = self.get_pyramid() if self._skip_empty_space else []
+        distances = np.zeros(len(xs))
+        active = np.arange(len(xs))
+
+        while len(active) > 0:
+            # Skip past the largest block of valid pixels holding the current pixel, stopping right before leaving it
+            level = np.zeros(len(active), dtype=np.int64)
+            inside = (pixel_x >= 0) & (pixel_x < map_width) & (pixel_y >= 0) & (pixel_y < map_height)
+            candidates = np.nonzero(inside)[0]
+
+            for k, blocks in enumerate(pyramid):
+                candidates = candidates[blocks[pixel_y[candidates] >> (k + 1), pixel_x[candidates] >> (k + 1)]]
+                level[candidates] = k + 1
+
+                if len(candidates) == 0:
+                    break
+
+            if level.any():
+                taken_x, taken_y = self._steps_within_blocks(
+                    level, pixel_x, pixel_y, side_dist_x, side_dist_y, delta_dist_x, delta_dist_y, step_x, step_y
+                )
+
+                with np.errstate(invalid="ignore"):
+                    side_dist_x = np.where(taken_x > 0, side_dist_x + taken_x * delta_dist_x, side_dist_x)
+                    side_dist_y = np.where(taken_y > 0, side_dist_y + taken_y * delta_dist_y, side_dist_y)
+
+                pixel_x = pixel_x + taken_x * step_x
+                pixel_y = pixel_y + taken_y * step_y
+
+            # Move to the next x or y boundary, whichever is closer
+            x_side = side_dist_x < side_dist_y
+            distance = np.where(x_side, side_dist_x, side_dist_y)
+            side_dist_x = np.where(x_side, side_dist_x + delta_dist_x, side_dist_x)
+            side_dist_y = np.where(x_side, side_dist_y, side_dist_y + delta_dist_y)
+            pixel_x = np.where(x_side, pixel_x + step_x, pixel_x)
+            pixel_y = np.where(x_side, pixel_y, pixel_y + step_y)
+
+            # Rays outside the map terminate without a collision, the rest collide with invalid locations
+            outside = (pixel_x < 0) | (pixel_x >= map_width) | (pixel_y < 0) | (pixel_y >= map_height)
+            hit = np.zeros(len(active), dtype=bool)
+            hit[~outside] = ~mask[pixel_y[~outside], pixel_x[~outside]]
+
+            # Rays still in a valid track location may collide with an obstacle instead
+            end_x = (map_x + heading_x * distance) / scale_x
+            end_y = (map_y + heading_y * distance) / scale_y
+
+            if self._obstacles:
+                candidates = np.nonzero(~outside & ~hit)[0]
+
+                for obstacle in self._obstacles:
+                    hit[candidates] |= obstacle.hit_test_batch(end_x[candidates], end_y[candidates])
+
+            distances[active[hit]] = np.hypot(end_x[hit] - xs[hit], end_y[hit] - ys[hit])
+
+            # Only keep the rays that are still travelling
+            keep = ~(outside | hit)
+            active = active[keep]
+            xs, ys, map_x, map_y = xs[keep], ys[keep], map_x[keep], map_y[keep]
+            heading_x, heading_y = heading_x[keep], heading_y[keep]
+            delta_dist_x, delta_dist_y = delta_dist_x[keep], delta_dist_y[keep]
+            side_dist_x, side_dist_y = side_dist_x[keep], side_dist_y[keep]
+            step_x, step_y = step_x[keep], step_y[keep]
+            pixel_x, pixel_y = pixel_x[keep], pixel_y[keep]
+
+        return distances
+
+    @staticmethod
+    def _steps_within_blocks(
+        level: np.ndarray,
+        pixel_x: np.ndarray,
+        pixel_y: np.ndarray,
+        side_dist_x: np.ndarray,
+        side_dist_y: np.ndarray,
+        delta_dist_x: np.ndarray,
+        delta_dist_y: np.ndarray,
+        step_x: np.ndarray,
+        step_y: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Vectorized version of `_steps_within_block` (rays at level 0 take no steps)
+
+        :return: the number of (x, y) steps taken by each ray while it stays within its block
+        """
+        block_size = 1 << level
+        block_x = pixel_x >> level << level
+        block_y = pixel_y >> level << level
+        exit_steps_x = np.where(step_x > 0, block_x + block_size - pixel_x, pixel_x - block_x + 1)
+        exit_steps_y = np.where(step_y > 0, block_y + block_size - pixel_y, pixel_y - block_y + 1)
+
+        with np.errstate(invalid="ignore"):
+            exit_dist_x = np.where(delta_dist_x == inf, inf, side_dist_x + (exit_steps_x - 1) * delta_dist_x)
+            exit_dist_y = np.where(delta_dist_y == inf, inf, side_dist_y + (exit_steps_y - 1) * delta_dist_y)
+            taken_y = np.where(exit_dist_x < side_dist_y, 0, np.floor((exit_dist_x - side_dist_y) / delta_dist_y) + 1)
+            taken_x = np.where(exit_dist_y <= side_dist_x, 0, np.ceil((exit_dist_y - side_dist_x) / delta_dist_x))
+
+        exit_through_x = exit_dist_x < exit_dist_y
+        taken_x = np.where(exit_through_x, exit_steps_x - 1, np.minimum(np.nan_to_num(taken_x), exit_steps_x - 1))
+        taken_y = np.where(exit_through_x, np.minimum(np.nan_to_num(taken_y), exit_steps_y - 1), exit_steps_y - 1)
+
+        # Rays outside of any block stay where they are
+        return np.where(level > 0, taken_x, 0).astype(np.int64), np.where(level > 0, taken_y, 0).astype(np.int64)
+
     def checkpoint_check(self, car_pos: Vector2, new_pos: Vector2) -> bool:
         """
         Check if car passed checkpoint
@@ -0,0 +1,225 @@
+from .track import Track
+from .driver_base import DriverBase
+from .sensors import RaySensor, SensorTable
+from .evaluation import EPISODE_TIME
+import numpy as np
+
+
+class VectorEnv:
+    """
+    A vectorized, gym-style environment running many independent cars on the same track
+
+    Every car follows the same rules as an `AiDriver`: the physics of `DriverBase`, the observations built by
+    `AiDriver.update` (speed, steering angle, and the ray distances), and the same conditions for leaving the race
+    (driving off the track or being stagnant for too long). All cars are stepped together with array operations.
+    Positions are kept in 64-bit floats, so trajectories only match `DriverBase` up to the rounding of its 32-bit
+    raylib vectors.
+
+    Cars that are done stay frozen (with zero observations and rewards) until they are reset with `reset`.
+    """
+    STAGNANT_TIME = 2
+
+    def __init__(
+        self,
+        track: Track,
+        num_envs: int,
+        tick_time: float = 1 / 20,
+        episode_time: float = EPISODE_TIME,
+        sensor: RaySensor | None = None
+    ) -> None:
+        """
+        Constructor
+
+        :param track: the track to drive on
+        :param num_envs: the number of cars to simulate
+        :param tick_time: the time between updates in seconds
+        :param episode_time: the simulated duration of an episode in seconds
+        :param sensor: the sensor describing the rays (a `SensorTable` is used for table lookups)
+        """
+        self._track = track
+        self._num_envs = num_envs
+        self._tick_time = tick_time
+        self._episode_time = episode_time
+        self._sensor = RaySensor() if sensor is None else sensor
+
+        self._x = np.zeros(num_envs)
+        self._y = np.zeros(num_envs)
+        self._angle = np.zeros(num_envs)
+        self._speed = np.zeros(num_envs)
+        self._steering = np.zeros(num_envs)
+        self._time_stagnant = np.zeros(num_envs)
+        self._elapsed = np.zeros(num_envs)
+        self._done = np.ones(num_envs, dtype=bool)
+
+    def get_num_envs(self) -> int:
+        """
+        Get the number of cars simulated by this environment
+
+        :return: the number of cars
+        """
+        return self._num_envs
+
+    def get_observation_size(self) -> int:
+        """
+        Get the number of values in the observation of one car
+
+        :return: the observation size
+        """
+        return 2 + self._sensor.get_num_casts()
+
+    def get_positions(self) -> np.ndarray:
+        """
+        Get the position of every car
+
+        :return: an (N, 2) array of world-space positions in meters
+        """
+        return np.stack([self._x, self._y], axis=1)
+
+    def get_angles(self) -> np.ndarray:
+        """
+        Get the heading of every car
+
+        :return: the heading of each car in radians
+        """
+        return self._angle.copy()
+
+    def reset(self, indices: np.ndarray | None = None) -> np.ndarray:
+        """
+        Place cars back at the start of the track
+
+        :param indices: the indices (or a boolean mask) of the cars to reset, all cars if not provided
+        :return: an (N, observation size) array with the observation of every car
+        """
+        if indices is None:
+            indices = slice(None)
+
+        start_pos = self._track.get_driver_start_pos()
+        self._x[indices] = start_pos.x
+        self._y[indices] = start_pos.y
+        self._angle[indices] = self._track.get_driver_start_angle()
+        self._speed[indices] = 0
+        self._steering[indices] = 0
+        self._time_stagnant[indices] = 0
+        self._elapsed[indices] = 0
+        self._done[indices] = False
+
+        return self._observe()
+
+    def step(self, actions: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Apply one set of actions and advance every live car by one tick
+
+        Each row of actions holds the four network outputs used by `AiDriver`; an output above 0.5 presses the
+        corresponding control (gas, gas, left, right, matching `AiDriver.update`)
+
+        :param actions: an (N, 4) array of actions
+        :return: the (observations, rewards, dones) arrays, where the reward is the distance traveled in meters
+        """
+        actions = np.asarray(actions)
+        live = ~self._done
+        dt = self._tick_time
+
+        # Take the actions chosen from the previous observation
+        gas = live & (actions[:, 0] > 0.5)
+        gas2 = live & (actions[:, 1] > 0.5)
+        self._speed += DriverBase.HORSEPOWER * dt * (gas.astype(float) + gas2.astype(float))
+        self._turn(live & (actions[:, 2] > 0.5), -DriverBase.STEERING_RATE * dt)
+        self._turn(live & (actions[:, 3] > 0.5), DriverBase.STEERING_RATE * dt)
+
+        # Keep track of the amount of time spent stagnant and remove cars that are off track or stagnant for too long
+        self._time_stagnant = np.where(self._speed == 0, self._time_stagnant + dt, 0)
+        off_track = self._track.is_off_track_batch(self._x, self._y)
+        self._done |= live & (off_track | (self._time_stagnant >= self.STAGNANT_TIME))
+        live = ~self._done
+
+        # Update the physics of the remaining cars and reward them for the distance traveled
+        prev_x, prev_y = self._x.copy(), self._y.copy()
+        self._apply_friction(live)
+        self._apply_steering(live)
+        rewards = np.hypot(self._x - prev_x, self._y - prev_y)
+
+        # End the episode of the cars that ran out of time
+        self._elapsed[live] += dt
+        self._done |= self._elapsed >= self._episode_time
+
+        return self._observe(), rewards, self._done.copy()
+
+    def _turn(self, cars: np.ndarray, amount: float) -> None:
+        """
+        Convenience function to turn the steering wheel of some cars, bounded by the maximum steering angle
+
+        :param cars: a boolean mask of the cars to turn
+        :param amount: the change of the steering angle in radians
+        """
+        limit = DriverBase.MAX_STEERING_ANGLE
+        self._steering[cars] = np.clip(self._steering[cars] + amount, -limit, limit)
+
+    def _apply_friction(self, cars: np.ndarray) -> None:
+        """
+        Apply friction forces to some cars (see `DriverBase._apply_friction`)
+
+        :param cars: a boolean mask of the cars to update
+        """
+        speed = self._speed[cars]
+        slowed = speed - (DriverBase.FRICTION * speed + DriverBase.DRAG * speed ** 2) * self._tick_time
+        self._speed[cars] = np.where(speed <= 0.1, 0, slowed)
+
+    def _apply_steering(self, cars: np.ndarray) -> None:
+        """
+        Apply the steering forces to some cars (see `DriverBase._apply_steering`)
+
+        :param cars: a boolean mask of the cars to update
+        """
+        x, y, angle = self._x[cars], self._y[cars], self._angle[cars]
+        speed, steering = self._speed[cars], self._steering[cars]
+        travel = speed * self._tick_time
+
+        # Calculate the current location of the front and back wheels
+        heading_x, heading_y = np.cos(angle), np.sin(angle)
+        half_width = DriverBase.WIDTH / 2
+        front_x, front_y = x + heading_x * half_width, y + heading_y * half_width
+        rear_x, rear_y = x - heading_x * half_width, y - heading_y * half_width
+
+        # Move the two wheels forward based on their respective headings
+        steering_cos, steering_sin = np.cos(steering), np.sin(steering)
+        front_x += (heading_x * steering_cos - heading_y * steering_sin) * travel
+        front_y += (heading_x * steering_sin + heading_y * steering_cos) * travel
+        rear_x += heading_x * travel
+        rear_y += heading_y * travel
+
+        # Adjust the steering angle based on the change of the car's heading and update the position and angle
+        new_angle = np.arctan2(front_y - rear_y, front_x - rear_x)
+        limit = DriverBase.MAX_STEERING_ANGLE
+        self._steering[cars] = np.clip(steering - (new_angle - angle), -limit, limit)
+        self._x[cars] = (front_x + rear_x) / 2
+        self._y[cars] = (front_y + rear_y) / 2
+        self._angle[cars] = new_angle
+
+    def _observe(self) -> np.ndarray:
+        """
+        Convenience function to build the observation of every car
+
+        :return: an (N, observation size) array of observations, zero for cars that are done
+        """
+        observations = np.zeros((self._num_envs, self.get_observation_size()))
+        live = np.nonzero(~self._done)[0]
+
+        if len(live) == 0:
+            return observations
+
+        # Sense every ray of every live car at once
+        offsets = np.array(self._sensor.get_ray_angles(0))
+        xs = np.repeat(self._x[live], len(offsets))
+        ys = np.repeat(self._y[live], len(offsets))
+        angles = (self._angle[live][:, None] + offsets[None, :]).ravel()
+
+        if isinstance(self._sensor, SensorTable):
+            distances = self._sensor.lookup(xs, ys, angles)
+        else:
+            distances = self._track.cast_rays(xs, ys, angles)
+
+        observations[live, 0] = self._speed[live]
+        observations[live, 1] = self._steering[live]
+        observations[live, 2:] = distances.reshape(len(live), len(offsets))
+
+        return observations
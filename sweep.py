@@ -0,0 +1,57 @@
+from src.sweep import grid_search, random_search, run_sweep
+from src.evaluation import EPISODE_TIME
+import argparse
+import json
+
+
+def main() -> None:
+    """
+    Entry point into sweeping neat configuration values and tracks
+    """
+    parser = argparse.ArgumentParser(description="Train NEAT Driver populations over a search space in parallel")
+    parser.add_argument("space", help="json file mapping config keys (or \"track\") to values or {low, high} ranges")
+    parser.add_argument("--samples", type=int, default=None, help="number of random runs, the full grid if not set")
+    parser.add_argument("--config", default="assets/configs/config-feedforward.txt", help="base neat configuration")
+    parser.add_argument("--track", default="assets/tracks/oval.xml", help="track xml file for runs without one")
+    parser.add_argument("--output-dir", default="sweep/", help="directory to write the run configs and summary to")
+    parser.add_argument("--generations", type=int, default=50, help="maximum number of generations per run")
+    parser.add_argument("--cores-per-run", type=int, default=1, help="number of cores allotted to every run")
+    parser.add_argument("--max-runs", type=int, default=None, help="maximum number of concurrent runs")
+    parser.add_argument("--grace", type=int, default=5, help="number of generations before stopping runs early")
+    parser.add_argument("--min-peers", type=int, default=3, help="number of runs to compare against to stop a run")
+    parser.add_argument("--seed", type=int, default=None, help="seed of the random search and the runs")
+    parser.add_argument("--tick-time", type=float, default=1 / 20, help="time between updates in seconds")
+    parser.add_argument("--episode-time", type=float, default=EPISODE_TIME, help="duration of an episode in seconds")
+    parser.add_argument("--images-dir", default="assets/images/", help="directory holding the track images")
+    parser.add_argument("--cache-dir", default="assets/cache/", help="directory to store compiled tracks in")
+    args = parser.parse_args()
+
+    with open(args.space) as file:
+        space = json.load(file)
+
+    runs = grid_search(space) if args.samples is None else random_search(space, args.samples, args.seed)
+    rows = run_sweep(
+        args.config,
+        runs,
+        args.output_dir,
+        args.generations,
+        args.track,
+        args.cores_per_run,
+        args.max_runs,
+        args.grace,
+        args.min_peers,
+        args.seed,
+        args.tick_time,
+        args.episode_time,
+        args.images_dir,
+        args.cache_dir
+    )
+
+    for row in rows[:10]:
+        print(f"Run {row['run_id']} ({row['status']}, {row['generations']} generations): {row['best_fitness']}")
+
+    print(f"Wrote {len(rows)} runs to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+from src.ai_driver import AiDriver
+from src.sensors import PatchSensor, RaySensor
+from src.simulation import Simulation
+from pyray import *
+import neat
+import os
+import pytest
+import random
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), "..")
+TRACK_FILEPATH = os.path.join(ROOT_DIR, "assets/tracks/oval.xml")
+IMAGES_DIR = os.path.join(ROOT_DIR, "assets/images/")
+CONFIG_FILEPATH = os.path.join(ROOT_DIR, "assets/configs/config-feedforward.txt")
+
+
+class CountingPatchSensor(PatchSensor):
+    def __init__(self) -> None:
+        super().__init__()
+        self.num_batches = 0
+
+    def sense_batch(self, track, xs, ys, angles):
+        self.num_batches += 1
+        return super().sense_batch(track, xs, ys, angles)
+
+
+class CountingSensor(RaySensor):
+    def __init__(self) -> None:
+        super().__init__()
+        self.num_senses = 0
+
+    def sense(self, track, pos: Vector2, angle: float) -> list[float]:
+        self.num_senses += 1
+        return super().sense(track, pos, angle)
+
+
+def create_drivers(
+    cache_dir: str,
+    sensor: RaySensor | PatchSensor | None = None,
+    **kwargs
+) -> tuple[Simulation, RaySensor | PatchSensor]:
+    neat_types = (neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet, neat.DefaultStagnation)
+    config = neat.Config(*neat_types, CONFIG_FILEPATH)
+    random.seed(0)
+    population = neat.Population(config)
+
+    simulation = Simulation()
+    simulation.load_compiled(TRACK_FILEPATH, IMAGES_DIR, cache_dir)
+    sensor = CountingSensor() if sensor is None else sensor
+
+    for _, genome in population.population.items():
+        simulation.add_driver(AiDriver(simulation.get_track(), genome, config, sensor, **kwargs))
+
+    return simulation, sensor
+
+
+def test_control_interval(tmp_path) -> None:
+    simulation, sensor = create_drivers(str(tmp_path), control_interval=4)
+    drivers = simulation.get_drivers()
+
+    # Every driver senses on its first update and every fourth update after that
+    positions = []
+
+    for tick in range(9):
+        simulation.update(1 / 20)
+        positions.append([(driver.get_x(), driver.get_y()) for driver in drivers])
+
+        if tick == 4:
+            moving = [i for i, driver in enumerate(drivers) if driver.get_speed() > 0]
+
+    assert 0 < sensor.num_senses <= 3 * len(drivers)
+
+    # The cars still move on every update in between
+    moving = [i for i in moving if not drivers[i].is_off_track()]
+    assert moving
+    assert all(len({tick[i] for tick in positions[-4:]}) == 4 for i in moving)
+
+
+def test_control_frequency_matches_interval(tmp_path) -> None:
+    trajectories = []
+
+    for kwargs in [{"control_interval": 5}, {"control_frequency": 4}]:
+        simulation, _ = create_drivers(str(tmp_path), **kwargs)
+
+        for _ in range(60):
+            simulation.update(1 / 20)
+
+        trajectories.append(simulation.snapshot())
+
+    assert trajectories[0] == trajectories[1]
+
+
+def test_restore_between_control_steps(tmp_path) -> None:
+    simulation, _ = create_drivers(str(tmp_path), control_interval=3)
+
+    for _ in range(10):
+        simulation.update(1 / 20)
+
+    # Restoring a snapshot taken between control steps keeps the held controls and the progress to the next step
+    snapshot = simulation.snapshot()
+
+    for _ in range(20):
+        simulation.update(1 / 20)
+
+    expected = simulation.snapshot()
+    simulation.restore(snapshot)
+
+    for _ in range(20):
+        simulation.update(1 / 20)
+
+    assert simulation.snapshot() == expected
+
+
+def test_invalid_control_rate(tmp_path) -> None:
+    with pytest.raises(ValueError):
+        create_drivers(str(tmp_path), control_interval=0)
+
+
+def test_patch_sensor_is_batched(tmp_path) -> None:
+    sensor = CountingPatchSensor()
+    simulation, _ = create_drivers(str(tmp_path), sensor)
+    expected, _ = create_drivers(str(tmp_path), sensor)
+
+    # The simulation senses all drivers in one batch per update, matching drivers updated (and sensing) one at a time
+    for _ in range(40):
+        num_batches = sensor.num_batches
+        simulation.update(1 / 20)
+        assert sensor.num_batches - num_batches <= 1
+
+        for driver in expected.get_drivers():
+            driver.update(1 / 20)
+
+    assert [driver.get_state() for driver in simulation.get_drivers()] == expected.snapshot()
+    assert any(driver.get_speed() > 0 for driver in simulation.get_drivers())
@@ -0,0 +1,103 @@
+from src.compiled_track import CompiledTrack
+from src.simulation import Simulation
+from pyray import *
+import numpy as np
+import os
+
+
+def write_track(directory, checkpoint_x: float, name: str = "track") -> str:
+    image = gen_image_color(40, 20, BLANK)
+    image_draw_rectangle(image, 5, 5, 30, 10, WHITE)
+    export_image(image, str(directory / "map.png"))
+    unload_image(image)
+
+    xml_filepath = directory / f"{name}.xml"
+    xml_filepath.write_text(
+        '<track width="80" height="40" map="map.png" start_x="20" start_y="20" start_angle="90">'
+        f'<checkpoint x1="{checkpoint_x}" y1="10" x2="{checkpoint_x}" y2="30"/>'
+        '</track>'
+    )
+
+    return str(xml_filepath)
+
+
+def test_compile_and_load(tmp_path) -> None:
+    xml_filepath = write_track(tmp_path, 40)
+    compiled = CompiledTrack.compile(xml_filepath, str(tmp_path), str(tmp_path / "cache"))
+
+    # The compiled arrays should match the ones derived from the xml file directly
+    reference = Simulation()
+    reference.get_track().set_map(load_image(str(tmp_path / "map.png")))
+    reference.xml_load(xml_filepath)
+
+    simulation = Simulation()
+    simulation.load_compiled(xml_filepath, str(tmp_path), str(tmp_path / "cache"))
+    track = simulation.get_track()
+
+    assert np.array_equal(compiled.get_array("mask"), reference.get_track().get_mask())
+    assert np.array_equal(track.get_distance_field(), reference.get_track().get_distance_field())
+    assert track.get_width() == 80
+    assert track.get_driver_start_x() == 20
+    assert len(track.get_checkpoints()) == 1
+    assert not track.is_off_track(Vector2(40, 20))
+    assert track.is_off_track(Vector2(2, 2))
+
+
+def test_distance_field() -> None:
+    simulation = Simulation()
+    mask = np.zeros((7, 9), dtype=bool)
+    mask[1:6, 1:8] = True
+    simulation.get_track().set_mask(mask)
+    distance_field = simulation.get_track().get_distance_field()
+
+    assert distance_field[0, 0] == 0
+    assert distance_field[1, 1] == 1
+    assert distance_field[3, 4] == 3
+
+
+def test_rebuilt_when_source_changes(tmp_path) -> None:
+    cache_dir = tmp_path / "cache"
+    xml_filepath = write_track(tmp_path, 40)
+    first = CompiledTrack.compile(xml_filepath, str(tmp_path), str(cache_dir)).get_filepath()
+
+    assert CompiledTrack.compile(xml_filepath, str(tmp_path), str(cache_dir)).get_filepath() == first
+
+    # Changing the xml file produces a new bundle that replaces the stale one
+    write_track(tmp_path, 50)
+    second = CompiledTrack.compile(xml_filepath, str(tmp_path), str(cache_dir))
+
+    assert second.get_filepath() != first
+    assert [str(path) for path in cache_dir.iterdir()] == [second.get_filepath()]
+    assert second.get_array("checkpoints")[0, 0] == 50
+
+
+def test_keeps_bundles_of_other_tracks(tmp_path) -> None:
+    cache_dir = tmp_path / "cache"
+    wide = CompiledTrack.compile(write_track(tmp_path, 40, "track-wide"), str(tmp_path), str(cache_dir))
+
+    # Compiling a track whose name prefixes another one leaves the bundle of the other track alone
+    xml_filepath = write_track(tmp_path, 40)
+    first = CompiledTrack.compile(xml_filepath, str(tmp_path), str(cache_dir))
+    write_track(tmp_path, 50)
+    second = CompiledTrack.compile(xml_filepath, str(tmp_path), str(cache_dir))
+
+    assert sorted(str(path) for path in cache_dir.iterdir()) == sorted([wide.get_filepath(), second.get_filepath()])
+    assert first.get_filepath() != second.get_filepath()
+
+
+def test_keeps_bundles_of_tracks_sharing_a_file_name(tmp_path) -> None:
+    cache_dir = tmp_path / "cache"
+    xml_filepaths = []
+
+    for directory, checkpoint_x in [("a", 40), ("b", 50)]:
+        os.makedirs(tmp_path / directory)
+        xml_filepaths.append(write_track(tmp_path / directory, checkpoint_x))
+
+    # Switching between the tracks reuses their bundles instead of rebuilding them
+    first = [CompiledTrack.compile(xml_filepath, str(tmp_path / "a"), str(cache_dir)) for xml_filepath in xml_filepaths]
+    second = [CompiledTrack.compile(xml_filepath, str(tmp_path / "a"), str(cache_dir)) for xml_filepath in xml_filepaths]
+
+    assert [bundle.get_filepath() for bundle in second] == [bundle.get_filepath() for bundle in first]
+    assert len(set(bundle.get_filepath() for bundle in first)) == 2
+    assert len(list(cache_dir.iterdir())) == 2
+    assert [bundle.get_array("checkpoints")[0, 0] for bundle in second] == [40, 50]
@@ -0,0 +1,114 @@
+from src.fitness_journal import FitnessJournal, genome_fingerprint
+from src.remote_evaluation import RemoteEvaluator, run_worker
+import neat
+import copy
+import os
+import pytest
+import random
+import threading
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), "..")
+TRACK_FILEPATH = os.path.join(ROOT_DIR, "assets/tracks/oval.xml")
+IMAGES_DIR = os.path.join(ROOT_DIR, "assets/images/")
+CONFIG_FILEPATH = os.path.join(ROOT_DIR, "assets/configs/config-feedforward.txt")
+
+
+def create_genomes() -> tuple[list[tuple[int, neat.DefaultGenome]], neat.Config]:
+    neat_types = (neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet, neat.DefaultStagnation)
+    config = neat.Config(*neat_types, CONFIG_FILEPATH)
+    random.seed(0)
+    population = neat.Population(config)
+
+    return list(population.population.items()), config
+
+
+def eval_genomes(genomes: list, config: neat.Config) -> None:
+    for _, genome in genomes:
+        genome.fitness = sum(c.weight for c in genome.connections.values())
+
+
+def test_resume_after_crash(tmp_path) -> None:
+    genomes, config = create_genomes()
+    expected = copy.deepcopy(genomes)
+    eval_genomes(expected, config)
+    filepath = str(tmp_path / "journal.jsonl")
+    evaluated = []
+
+    def evaluate(chunk: list, config: neat.Config) -> None:
+        # The first run crashes while evaluating its third chunk
+        if len(evaluated) == 10 and crash:
+            raise KeyboardInterrupt()
+
+        eval_genomes(chunk, config)
+        evaluated.extend(genome_id for genome_id, _ in chunk)
+
+    crash = True
+    journal = FitnessJournal(filepath)
+
+    with pytest.raises(KeyboardInterrupt):
+        journal.wrap(evaluate, chunk_size=5)(copy.deepcopy(genomes), config)
+
+    journal.close()
+
+    # The crash also left a partially written line behind
+    with open(filepath, "a") as file:
+        file.write('{"round": "')
+
+    # The restarted run only evaluates the genomes that were not recorded
+    crash = False
+    evaluated.clear()
+    journal = FitnessJournal(filepath)
+    assert journal.get_num_results() == 10
+
+    journal.wrap(evaluate, chunk_size=5)(genomes, config)
+    journal.close()
+
+    assert len(evaluated) == len(genomes) - 10
+    assert [genome.fitness for _, genome in genomes] == [genome.fitness for _, genome in expected]
+
+
+def test_only_reuses_matching_genomes(tmp_path) -> None:
+    genomes, config = create_genomes()
+    journal = FitnessJournal(str(tmp_path / "journal.jsonl"))
+    journal.begin_generation(genomes)
+    eval_genomes(genomes, config)
+    journal.record(genomes)
+
+    # A genome that changed since it was recorded is not considered scored
+    genome_id, genome = genomes[0]
+    assert journal.lookup(genome_id, genome) == genome.fitness
+
+    fingerprint = genome_fingerprint(genome)
+    next(iter(genome.connections.values())).weight += 1
+    assert genome_fingerprint(genome) != fingerprint
+    assert journal.lookup(genome_id, genome) is None
+
+    # A new generation discards the results of the previous one
+    journal.begin_generation(genomes[1:])
+    assert journal.get_num_results() == 0
+    assert os.path.getsize(journal.get_filepath()) == 0
+    journal.close()
+
+
+def test_remote_evaluator_records_batches(tmp_path) -> None:
+    genomes, config = create_genomes()
+    journal = FitnessJournal(str(tmp_path / "journal.jsonl"))
+    evaluator = RemoteEvaluator(
+        TRACK_FILEPATH, "127.0.0.1", batch_size=4, episode_time=1, journal=journal, authkey=b"test-key"
+    )
+
+    host, port = evaluator.get_address()
+    args = (host, port, IMAGES_DIR, str(tmp_path), 60, b"test-key")
+    worker = threading.Thread(target=run_worker, args=args, daemon=True)
+    worker.start()
+
+    journal.wrap(evaluator.evaluate)(genomes, config)
+    evaluator.close()
+    worker.join(5)
+
+    # Every batch was recorded once, as it returned
+    with open(journal.get_filepath()) as file:
+        assert len(file.readlines()) == len(genomes)
+
+    assert all(journal.lookup(genome_id, genome) == genome.fitness for genome_id, genome in genomes)
+    journal.close()
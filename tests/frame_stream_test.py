@@ -0,0 +1,102 @@
+from src.frame_stream import FramePublisher, FrameSubscriber
+from src.simulation import Simulation
+from src.ai_driver import AiDriver
+import multiprocessing
+import numpy as np
+import neat
+import os
+import random
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), "..")
+TRACK_FILEPATH = os.path.join(ROOT_DIR, "assets/tracks/oval.xml")
+IMAGES_DIR = os.path.join(ROOT_DIR, "assets/images/")
+CONFIG_FILEPATH = os.path.join(ROOT_DIR, "assets/configs/config-feedforward.txt")
+
+
+def create_simulation(cache_dir: str, num_extra_drivers: int = 0) -> Simulation:
+    neat_types = (neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet, neat.DefaultStagnation)
+    config = neat.Config(*neat_types, CONFIG_FILEPATH)
+    random.seed(0)
+    population = neat.Population(config)
+
+    simulation = Simulation()
+    simulation.load_compiled(TRACK_FILEPATH, IMAGES_DIR, cache_dir)
+
+    # Extra drivers stand in for the genomes neat may breed past the population size
+    genomes = list(population.population.values())
+
+    for genome in genomes + genomes[:num_extra_drivers]:
+        simulation.add_driver(AiDriver(simulation.get_track(), genome, config))
+
+    return simulation
+
+
+def read_in_process(name: str, frames: multiprocessing.Queue) -> None:
+    subscriber = FrameSubscriber(name)
+    frames.put(subscriber.read())
+    subscriber.close()
+
+
+def test_publish_and_read(tmp_path) -> None:
+    simulation = create_simulation(str(tmp_path))
+    publisher = FramePublisher(TRACK_FILEPATH, 32, num_slots=3)
+    subscriber = FrameSubscriber(publisher.get_name())
+
+    try:
+        assert subscriber.read() is None
+        assert subscriber.get_track_filepath() == os.path.abspath(TRACK_FILEPATH)
+        assert subscriber.get_capacity() == 32
+
+        # The latest frame holds the poses of every driver, even after the ring wrapped around
+        for _ in range(7):
+            simulation.update(1 / 20)
+            publisher.publish(simulation)
+
+        drivers = simulation.get_drivers()
+        frame_index, xs, ys, angles, alive = subscriber.read()
+
+        assert frame_index == 6
+        assert np.array_equal(xs, np.array([driver.get_x() for driver in drivers], dtype=np.float32))
+        assert np.array_equal(ys, np.array([driver.get_y() for driver in drivers], dtype=np.float32))
+        assert np.array_equal(angles, np.array([driver.get_angle() for driver in drivers], dtype=np.float32))
+        assert alive.tolist() == [not driver.is_off_track() for driver in drivers]
+
+        # A frame being written is never read
+        latest = int(publisher._views.header[FramePublisher.LATEST_SLOT])
+        publisher._views.slot_headers[latest, FramePublisher.SEQUENCE] += 1
+        assert subscriber.read() is None
+        publisher._views.slot_headers[latest, FramePublisher.SEQUENCE] += 1
+        assert subscriber.read()[0] == 6
+
+        # Other processes read the same frame
+        frames = multiprocessing.Queue()
+        process = multiprocessing.Process(target=read_in_process, args=(publisher.get_name(), frames))
+        process.start()
+        other_frame_index, other_xs, _, _, _ = frames.get(timeout=10)
+        process.join()
+
+        assert other_frame_index == 6
+        assert np.array_equal(other_xs, xs)
+    finally:
+        subscriber.close()
+        publisher.close()
+
+
+def test_publish_population_over_capacity(tmp_path) -> None:
+    simulation = create_simulation(str(tmp_path), num_extra_drivers=3)
+    pop_size = len(simulation.get_drivers()) - 3
+
+    # The drivers past the capacity are left out of the frame instead of raising
+    publisher = FramePublisher(TRACK_FILEPATH, pop_size)
+    subscriber = FrameSubscriber(publisher.get_name())
+
+    try:
+        simulation.update(1 / 20)
+        publisher.publish(simulation)
+        _, xs, _, _, _ = subscriber.read()
+
+        drivers = simulation.get_drivers()
+        assert np.array_equal(xs, np.array([driver.get_x() for driver in drivers[:pop_size]], dtype=np.float32))
+    finally:
+        subscriber.close()
+        publisher.close()
@@ -0,0 +1,89 @@
+from src.genome_codec import ArrayCheckpointer, save_genomes, load_genomes, save_population, load_population
+import neat
+import os
+import random
+
+CONFIG_FILEPATH = os.path.join(os.path.dirname(__file__), "../assets/configs/config-feedforward.txt")
+
+
+def create_config() -> neat.Config:
+    neat_types = (neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet, neat.DefaultStagnation)
+    return neat.Config(*neat_types, CONFIG_FILEPATH)
+
+
+def eval_genomes(genomes: list, config: neat.Config) -> None:
+    for _, genome in genomes:
+        genome.fitness = sum(c.weight for c in genome.connections.values() if c.enabled) - len(genome.nodes)
+
+
+def genome_state(genome: neat.DefaultGenome) -> tuple:
+    nodes = {key: (type(g), g.bias, g.response, g.activation, g.aggregation) for key, g in genome.nodes.items()}
+    connections = {key: (type(g), g.weight, g.enabled) for key, g in genome.connections.items()}
+    return genome.key, genome.fitness, nodes, connections
+
+
+def test_genomes_round_trip(tmp_path) -> None:
+    config = create_config()
+    random.seed(0)
+    population = neat.Population(config)
+    population.run(eval_genomes, 5)
+
+    filepath = str(tmp_path / "genomes.npz")
+    save_genomes(filepath, population.population)
+    loaded = load_genomes(filepath, config)
+
+    assert list(loaded) == list(population.population)
+    assert [genome_state(g) for g in loaded.values()] == [genome_state(g) for g in population.population.values()]
+
+    for genome in loaded.values():
+        assert type(genome.fitness) is type(population.population[genome.key].fitness)
+        assert all(type(gene.enabled) is bool for gene in genome.connections.values())
+
+    # Decoded genomes are fully functional
+    network = neat.nn.FeedForwardNetwork.create(next(iter(loaded.values())), config)
+    assert len(network.activate([0.5] * 14)) == 4
+
+
+def test_population_round_trip(tmp_path) -> None:
+    config = create_config()
+    random.seed(1)
+    population = neat.Population(config)
+    population.run(eval_genomes, 4)
+
+    filepath = str(tmp_path / "population.npz")
+    save_population(filepath, 4, config, population.population, population.species, random.getstate())
+    generation, loaded_config, genomes, species_set, random_state = load_population(filepath)
+
+    assert generation == 4
+    assert random_state == random.getstate()
+    assert loaded_config.pop_size == config.pop_size
+    assert [genome_state(g) for g in genomes.values()] == [genome_state(g) for g in population.population.values()]
+    assert species_set.genome_to_species == population.species.genome_to_species
+    assert next(species_set.indexer) == next(population.species.indexer)
+
+    for key, species in population.species.species.items():
+        loaded = species_set.species[key]
+        assert (loaded.created, loaded.last_improved, loaded.fitness, loaded.adjusted_fitness) == \
+            (species.created, species.last_improved, species.fitness, species.adjusted_fitness)
+        assert loaded.fitness_history == species.fitness_history
+        assert list(loaded.members) == list(species.members)
+        assert all(loaded.members[k] is genomes[k] for k in loaded.members)
+        assert genome_state(loaded.representative) == genome_state(species.representative)
+
+
+def test_restored_run_continues_identically(tmp_path) -> None:
+    config = create_config()
+    random.seed(2)
+    population = neat.Population(config)
+    population.add_reporter(ArrayCheckpointer(1, None, str(tmp_path / "neat-checkpoint-")))
+    population.run(eval_genomes, 3)
+
+    # Continue the original run, then run the same generations again from the last checkpoint
+    population.run(eval_genomes, 3)
+    expected = [genome_state(g) for g in population.population.values()]
+
+    restored = ArrayCheckpointer.restore_checkpoint(str(tmp_path / "neat-checkpoint-2.npz"))
+    assert restored.generation == 2
+    restored.run(eval_genomes, 3)
+
+    assert [genome_state(g) for g in restored.population.values()] == expected
@@ -0,0 +1,69 @@
+from src.islands import MigrationReporter, run_islands
+from main import load_population_from_config_file
+import neat
+import copy
+import os
+import queue
+import random
+import re
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), "..")
+IMAGES_DIR = os.path.join(ROOT_DIR, "assets/images/")
+CONFIG_FILEPATH = os.path.join(ROOT_DIR, "assets/configs/config-feedforward.txt")
+TRACK_FILEPATHS = [os.path.join(ROOT_DIR, "assets/tracks/oval.xml"), os.path.join(ROOT_DIR, "assets/tracks/windy.xml")]
+
+
+def eval_genomes(genomes: list, config: neat.Config) -> None:
+    for _, genome in genomes:
+        genome.fitness = sum(c.weight for c in genome.connections.values())
+
+
+def test_add_migrants() -> None:
+    neat_types = (neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet, neat.DefaultStagnation)
+    random.seed(0)
+    source = neat.Population(neat.Config(*neat_types, CONFIG_FILEPATH))
+    source.run(eval_genomes, 3)
+    migrants = copy.deepcopy(sorted(source.population.values(), key=lambda g: g.fitness or 0, reverse=True)[:2])
+
+    config = neat.Config(*neat_types, CONFIG_FILEPATH)
+    population = neat.Population(config)
+    population.run(eval_genomes, 3)
+
+    keys = set(population.population)
+    elites = {key for key, genome in population.population.items() if genome.fitness is not None}
+    reporter = MigrationReporter(population, queue.Queue(), queue.Queue())
+    reporter.start_generation(population.generation)
+    reporter.add_migrants(config, population.population, population.species, migrants)
+
+    # The migrants replace two of the newest offspring, get new ids, and are speciated
+    assert len(population.population) == config.pop_size
+    assert reporter.get_num_received() == 2
+    assert elites <= set(population.population)
+    assert all(migrant.key > max(keys) and migrant.fitness is None for migrant in migrants)
+    assert all(population.population[migrant.key] is migrant for migrant in migrants)
+    assert set(population.species.genome_to_species) == set(population.population)
+
+
+def test_run_islands(tmp_path) -> None:
+    with open(CONFIG_FILEPATH) as file:
+        config_text = re.sub(r"pop_size\s*=\s*\d+", "pop_size = 10", file.read())
+
+    config_filepath = str(tmp_path / "config.txt")
+
+    with open(config_filepath, "w") as file:
+        file.write(config_text)
+
+    checkpoint_dir = str(tmp_path / "checkpoints")
+    results = run_islands(
+        [(config_filepath, TRACK_FILEPATHS[0]), (config_filepath, TRACK_FILEPATHS[1])], checkpoint_dir,
+        load_population_from_config_file, 4, migration_interval=2, num_migrants=2, seed=0, episode_time=1,
+        images_dir=IMAGES_DIR, cache_dir=str(tmp_path / "cache")
+    )
+
+    # Both islands migrated twice, and each kept its own checkpoints
+    assert len(results) == 2
+
+    for index, (best_genome, num_received) in enumerate(results):
+        assert best_genome.fitness is not None
+        assert num_received == 4
+        assert os.path.exists(os.path.join(checkpoint_dir, f"island-{index}", "neat-checkpoint-3.npz"))
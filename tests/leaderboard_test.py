@@ -0,0 +1,127 @@
+from src.leaderboard import find_checkpoints, load_best_genomes, evaluate_checkpoints
+from src.genome_codec import ArrayCheckpointer
+from src.evaluation import run_episode
+from src.simulation import Simulation
+import neat
+import csv
+import copy
+import os
+import pytest
+import random
+import shutil
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), "..")
+TRACK_FILEPATHS = [os.path.join(ROOT_DIR, "assets/tracks/oval.xml"), os.path.join(ROOT_DIR, "assets/tracks/windy.xml")]
+IMAGES_DIR = os.path.join(ROOT_DIR, "assets/images/")
+CONFIG_FILEPATH = os.path.join(ROOT_DIR, "assets/configs/config-feedforward.txt")
+
+
+def create_checkpoints(checkpoint_dir: str) -> None:
+    neat_types = (neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet, neat.DefaultStagnation)
+    config = neat.Config(*neat_types, CONFIG_FILEPATH)
+    random.seed(0)
+    population = neat.Population(config)
+    population.add_reporter(neat.Checkpointer(1, None, os.path.join(checkpoint_dir, "neat-checkpoint-")))
+
+    def eval_genomes(genomes: list, config: neat.Config) -> None:
+        for _, genome in genomes:
+            genome.fitness = sum(c.weight for c in genome.connections.values())
+
+    population.run(eval_genomes, 3)
+
+
+def test_find_and_load_checkpoints(tmp_path) -> None:
+    create_checkpoints(str(tmp_path))
+    checkpoints = find_checkpoints(str(tmp_path))
+
+    assert [os.path.basename(filepath) for filepath in checkpoints] == [f"neat-checkpoint-{i}" for i in range(3)]
+
+    generation, config, genomes = load_best_genomes(checkpoints[-1], 2)
+    fitnesses = [genome.fitness for _, genome in genomes]
+
+    assert generation == 2
+    assert len(genomes) == 2
+    assert fitnesses == sorted(fitnesses, reverse=True)
+
+
+def test_leaderboard_matches_local_evaluation(tmp_path) -> None:
+    checkpoint_dir = str(tmp_path / "checkpoints")
+    os.makedirs(checkpoint_dir)
+    create_checkpoints(checkpoint_dir)
+
+    output_filepath = str(tmp_path / "leaderboard.csv")
+    rows = evaluate_checkpoints(
+        checkpoint_dir, TRACK_FILEPATHS, output_filepath, num_best=2, num_processes=2, episode_time=1,
+        images_dir=IMAGES_DIR, cache_dir=str(tmp_path / "cache")
+    )
+
+    assert len(rows) == 3 * 2
+    assert [row["rank"] for row in rows] == list(range(1, 7))
+    assert [row["mean_fitness"] for row in rows] == sorted((row["mean_fitness"] for row in rows), reverse=True)
+
+    # The scores match an evaluation in this process
+    _, config, genomes = load_best_genomes(os.path.join(checkpoint_dir, "neat-checkpoint-1"), 2)
+    simulation = Simulation()
+    simulation.load_compiled(TRACK_FILEPATHS[1], IMAGES_DIR, str(tmp_path / "cache"))
+    expected = copy.deepcopy(genomes)
+    run_episode(simulation, expected, config, episode_time=1)
+
+    for genome_id, genome in expected:
+        row = next(r for r in rows if r["checkpoint"] == "neat-checkpoint-1" and r["genome_id"] == genome_id)
+        assert row["windy"] == genome.fitness
+
+    with open(output_filepath) as file:
+        written = list(csv.DictReader(file))
+
+    assert [int(row["rank"]) for row in written] == list(range(1, 7))
+    assert list(written[0]) == ["rank", "checkpoint", "generation", "genome_id", "mean_fitness", "oval", "windy"]
+
+
+def test_tracks_sharing_a_file_name(tmp_path) -> None:
+    checkpoint_dir = str(tmp_path / "checkpoints")
+    os.makedirs(checkpoint_dir)
+    create_checkpoints(checkpoint_dir)
+
+    # The same file name in two directories gives two columns, named after the directories
+    track_filepaths = []
+
+    for directory, source in [("a", TRACK_FILEPATHS[0]), ("b", TRACK_FILEPATHS[1])]:
+        os.makedirs(tmp_path / "tracks" / directory)
+        track_filepaths.append(shutil.copy(source, tmp_path / "tracks" / directory / "track.xml"))
+
+    output_filepath = str(tmp_path / "leaderboard.csv")
+    rows = evaluate_checkpoints(
+        checkpoint_dir, track_filepaths, output_filepath, num_best=1, num_processes=2, episode_time=1,
+        images_dir=IMAGES_DIR, cache_dir=str(tmp_path / "cache")
+    )
+
+    a, b = os.path.join("a", "track"), os.path.join("b", "track")
+    assert all(row["mean_fitness"] == (row[a] + row[b]) / 2 for row in rows)
+
+    # The workers loaded the bundles compiled up front, without replacing each other's
+    assert len(os.listdir(tmp_path / "cache")) == 2
+
+    with pytest.raises(ValueError):
+        evaluate_checkpoints(checkpoint_dir, track_filepaths[:1] * 2, output_filepath, images_dir=IMAGES_DIR)
+
+
+def test_load_array_checkpoints(tmp_path) -> None:
+    neat_types = (neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet, neat.DefaultStagnation)
+    config = neat.Config(*neat_types, CONFIG_FILEPATH)
+    random.seed(0)
+    population = neat.Population(config)
+    population.add_reporter(ArrayCheckpointer(1, None, os.path.join(str(tmp_path), "neat-checkpoint-")))
+
+    def eval_genomes(genomes: list, config: neat.Config) -> None:
+        for genome_id, genome in genomes:
+            genome.fitness = float(genome_id)
+
+    population.run(eval_genomes, 2)
+
+    checkpoints = find_checkpoints(str(tmp_path))
+    filenames = [os.path.basename(filepath) for filepath in checkpoints]
+    assert filenames == ["neat-checkpoint-0.npz", "neat-checkpoint-1.npz"]
+
+    generation, _, genomes = load_best_genomes(checkpoints[-1], 2)
+    assert generation == 1
+    assert [genome.fitness for _, genome in genomes] == sorted((g.fitness for _, g in genomes), reverse=True)
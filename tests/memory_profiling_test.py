@@ -0,0 +1,76 @@
+from src.memory_profiling import AllocationReporter, get_rss, run_soak
+import json
+import os
+import sys
+import tracemalloc
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), "..")
+TRACK_FILEPATH = os.path.join(ROOT_DIR, "assets/tracks/oval.xml")
+IMAGES_DIR = os.path.join(ROOT_DIR, "assets/images/")
+CONFIG_FILEPATH = os.path.join(ROOT_DIR, "assets/configs/config-feedforward.txt")
+
+_leaked = []
+
+
+def leak(num_blocks: int) -> None:
+    _leaked.extend(bytearray(1024) for _ in range(num_blocks))
+
+
+def test_reports_leaking_sites(tmp_path) -> None:
+    filepath = str(tmp_path / "memory.jsonl")
+    reporter = AllocationReporter(num_top=3, filepath=filepath, verbose=False)
+
+    try:
+        for generation in range(3):
+            reporter.start_generation(generation)
+            leak(100)
+            reporter.end_generation(None, {}, None)
+    finally:
+        reporter.close()
+        _leaked.clear()
+
+    assert not tracemalloc.is_tracing()
+
+    # Memory retained every generation is reported at the line allocating it
+    samples = reporter.get_samples()
+    assert [sample["generation"] for sample in samples] == [0, 1, 2]
+
+    for sample in samples:
+        top = sample["top"][0]
+        assert top["site"].startswith(__file__)
+        assert top["count_diff"] >= 100 and top["size_diff"] >= 100 * 1024
+        assert sample["rss"] > 0 and sample["traced_peak"] >= sample["traced"]
+
+    with open(filepath) as file:
+        assert [json.loads(line) for line in file] == samples
+
+
+def test_rss_growth() -> None:
+    reporter = AllocationReporter(verbose=False)
+    reporter.close()
+
+    for generation in range(5):
+        reporter._samples.append({"generation": generation, "rss": 1000 + 300 * generation + (generation == 0) * 5000})
+
+    assert reporter.get_rss_growth() == 300
+    assert reporter.get_rss_growth(skip=4) == 0
+    assert get_rss() > 0
+
+
+def test_rss_fallbacks(monkeypatch) -> None:
+    # Without /proc (or sysconf), the peak resident set size is reported, and 0 without the resource module either
+    monkeypatch.delattr(os, "sysconf")
+    assert get_rss() > 0
+
+    monkeypatch.setitem(sys.modules, "resource", None)
+    assert get_rss() == 0
+
+
+def test_soak(tmp_path) -> None:
+    reporter = run_soak(
+        CONFIG_FILEPATH, TRACK_FILEPATH, 2, seed=0, episode_time=0.5, images_dir=IMAGES_DIR, cache_dir=str(tmp_path),
+        verbose=False
+    )
+
+    assert [sample["generation"] for sample in reporter.get_samples()] == [0, 1]
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,69 @@
+from src.multi_fidelity import MultiFidelityEvaluator, downsample_mask
+from src.simulation import Simulation
+from src.evaluation import run_episode
+import neat
+import copy
+import os
+import random
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), "..")
+TRACK_FILEPATH = os.path.join(ROOT_DIR, "assets/tracks/oval.xml")
+IMAGES_DIR = os.path.join(ROOT_DIR, "assets/images/")
+CONFIG_FILEPATH = os.path.join(ROOT_DIR, "assets/configs/config-feedforward.txt")
+
+
+def create_genomes() -> tuple[list[tuple[int, neat.DefaultGenome]], neat.Config]:
+    neat_types = (neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet, neat.DefaultStagnation)
+    config = neat.Config(*neat_types, CONFIG_FILEPATH)
+    random.seed(0)
+    population = neat.Population(config)
+
+    return list(population.population.items()), config
+
+
+def test_downsample_mask(tmp_path) -> None:
+    simulation = Simulation()
+    simulation.load_compiled(TRACK_FILEPATH, IMAGES_DIR, str(tmp_path))
+    track = simulation.get_track()
+    mask = track.get_mask()
+
+    coarse = downsample_mask(track, 4)
+    assert coarse.shape == ((mask.shape[0] + 3) // 4, (mask.shape[1] + 3) // 4)
+    assert coarse[10, 20] == mask[42, 82]
+    assert 0 < coarse.sum() < coarse.size
+
+
+def test_final_fitness_is_consistent(tmp_path) -> None:
+    genomes, config = create_genomes()
+    expected = copy.deepcopy(genomes)
+    evaluator = MultiFidelityEvaluator(
+        TRACK_FILEPATH, promote_fraction=0.2, episode_time=4, screen_episode_time=2, images_dir=IMAGES_DIR,
+        cache_dir=str(tmp_path)
+    )
+    evaluator.evaluate(genomes, config)
+
+    promoted = evaluator.get_promoted()
+    screening = evaluator.get_screening_fitness()
+    assert len(promoted) == evaluator.get_num_promoted(len(genomes)) == 5
+    assert min(screening[genome_id] for genome_id in promoted) >= max(
+        fitness for genome_id, fitness in screening.items() if genome_id not in promoted
+    )
+
+    # Promoted genomes are scored exactly like a full-fidelity episode
+    simulation = Simulation()
+    simulation.load_compiled(TRACK_FILEPATH, IMAGES_DIR, str(tmp_path))
+    expected = [(genome_id, genome) for genome_id, genome in expected if genome_id in promoted]
+    run_episode(simulation, expected, config, episode_time=4)
+    fitness = dict(genomes)
+
+    for genome_id, genome in expected:
+        assert fitness[genome_id].fitness == genome.fitness
+
+    # The others keep their screening order, below every promoted genome
+    floor = min(genome.fitness for _, genome in expected)
+    screened_out = sorted((genome_id for genome_id in fitness if genome_id not in promoted), key=screening.get)
+
+    for lower, higher in zip(screened_out, screened_out[1:]):
+        assert fitness[lower].fitness <= fitness[higher].fitness
+
+    assert all(fitness[genome_id].fitness <= floor for genome_id in screened_out)
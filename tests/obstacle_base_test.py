@@ -0,0 +1,89 @@
+from src.obstacle_base import ObstacleBase
+from src.texture_pack import TexturePack
+from src.track import Track
+from pyray import *
+import numpy as np
+
+
+def create_obstacle() -> tuple[ObstacleBase, Image]:
+    # An 8x8 pixel image with an opaque square and a single opaque pixel in one corner
+    image = gen_image_color(8, 8, BLANK)
+    image_draw_rectangle(image, 2, 2, 4, 4, WHITE)
+    image_draw_pixel(image, 7, 0, WHITE)
+    TexturePack._images["test_obstacle.png"] = image
+
+    try:
+        obstacle = ObstacleBase(Vector2(4, 2), "test_obstacle.png")
+    finally:
+        del TexturePack._images["test_obstacle.png"]
+
+    obstacle.set_position(Vector2(10, 5))
+    obstacle.set_angle(0.7)
+
+    return obstacle, image
+
+
+def reference_hit_test(obstacle: ObstacleBase, image: Image, point: Vector2) -> bool:
+    # The original hit test, looking up the image pixel by pixel
+    offset = vector2_rotate(vector2_subtract(point, obstacle.get_position()), -obstacle.get_angle())
+    pixel_x = int(image.width * (0.5 + offset.x / obstacle.get_width()))
+    pixel_y = int(image.height * (0.5 + offset.y / obstacle.get_height()))
+
+    if pixel_x < 0 or pixel_x >= image.width or pixel_y < 0 or pixel_y >= image.height:
+        return False
+
+    return get_image_color(image, pixel_x, pixel_y).a != 0
+
+
+def test_hit_test_matches_image_lookup() -> None:
+    obstacle, image = create_obstacle()
+    rng = np.random.default_rng(0)
+
+    for angle in (0.7, 0, -2.5):
+        obstacle.set_angle(angle)
+        xs = rng.uniform(6, 14, 3000)
+        ys = rng.uniform(1, 9, 3000)
+        expected = [reference_hit_test(obstacle, image, Vector2(x, y)) for x, y in zip(xs, ys)]
+
+        assert any(expected)
+        assert [obstacle.hit_test(Vector2(x, y)) for x, y in zip(xs, ys)] == expected
+        assert obstacle.hit_test_batch(xs, ys).tolist() == expected
+
+
+def test_bounding_box_follows_pose() -> None:
+    obstacle, _ = create_obstacle()
+    obstacle.set_angle(0)
+    box = obstacle.get_bounding_box()
+
+    # The box is padded by one pixel on each side
+    assert abs(box.x - 7.5) < 1e-6 and abs(box.width - 5) < 1e-6
+    assert abs(box.y - 3.75) < 1e-6 and abs(box.height - 2.5) < 1e-6
+
+    obstacle.get_position().x = 20
+    obstacle.set_angle(np.pi / 2)
+    box = obstacle.get_bounding_box()
+
+    assert abs(box.x - 18.75) < 1e-6 and abs(box.width - 2.5) < 1e-6
+    assert obstacle.hit_test(Vector2(20, 5))
+    assert not obstacle.hit_test(Vector2(10, 5))
+
+
+def test_rays_stop_at_obstacles() -> None:
+    mask = np.ones((40, 80), dtype=bool)
+    track = Track()
+    track.set_size(Vector2(40, 20))
+    track.set_mask(mask)
+    track.get_obstacles().append(create_obstacle()[0])
+
+    rng = np.random.default_rng(1)
+    xs = rng.uniform(0, 40, 300)
+    ys = rng.uniform(0, 20, 300)
+    angles = rng.uniform(-np.pi, np.pi, 300)
+    distances = track.cast_rays(xs, ys, angles)
+
+    assert (distances > 0).any()
+
+    for x, y, angle, distance in zip(xs, ys, angles, distances):
+        pos = Vector2(x, y)
+        expected = vector2_length(vector2_subtract(track.ray_collision(pos, angle), pos))
+        assert abs(distance - expected) < 1e-3
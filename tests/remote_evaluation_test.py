@@ -0,0 +1,124 @@
+from src.remote_evaluation import RemoteEvaluator, run_worker, receive_message, send_message, _authenticate
+from src.evaluation import run_episode
+from src.simulation import Simulation
+import neat
+import copy
+import os
+import socket
+import threading
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), "..")
+TRACK_FILEPATH = os.path.join(ROOT_DIR, "assets/tracks/oval.xml")
+IMAGES_DIR = os.path.join(ROOT_DIR, "assets/images/")
+CONFIG_FILEPATH = os.path.join(ROOT_DIR, "assets/configs/config-feedforward.txt")
+AUTHKEY = b"test-key"
+
+
+def create_genomes() -> tuple[list[tuple[int, neat.DefaultGenome]], neat.Config]:
+    neat_types = (neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet, neat.DefaultStagnation)
+    config = neat.Config(*neat_types, CONFIG_FILEPATH)
+    population = neat.Population(config)
+
+    return list(population.population.items()), config
+
+
+def start_worker(evaluator: RemoteEvaluator, cache_dir: str) -> threading.Thread:
+    host, port = evaluator.get_address()
+    args = ("127.0.0.1", port, IMAGES_DIR, cache_dir, 60, AUTHKEY)
+    thread = threading.Thread(target=run_worker, args=args, daemon=True)
+    thread.start()
+
+    return thread
+
+
+def test_matches_local_evaluation(tmp_path) -> None:
+    genomes, config = create_genomes()
+    expected = copy.deepcopy(genomes)
+
+    simulation = Simulation()
+    simulation.load_compiled(TRACK_FILEPATH, IMAGES_DIR, str(tmp_path))
+    run_episode(simulation, expected, config, episode_time=1)
+
+    evaluator = RemoteEvaluator(TRACK_FILEPATH, "127.0.0.1", batch_size=4, episode_time=1, authkey=AUTHKEY)
+    workers = [start_worker(evaluator, str(tmp_path)) for _ in range(3)]
+    evaluator.evaluate(genomes, config)
+    evaluator.close()
+
+    for worker in workers:
+        worker.join(5)
+
+    assert [genome.fitness for _, genome in genomes] == [genome.fitness for _, genome in expected]
+
+
+def test_reassigns_work_of_dead_workers(tmp_path) -> None:
+    genomes, config = create_genomes()
+    evaluator = RemoteEvaluator(TRACK_FILEPATH, "127.0.0.1", batch_size=4, episode_time=1, authkey=AUTHKEY)
+
+    # A worker that takes the first batch and then dies without answering
+    def dying_worker() -> None:
+        with socket.create_connection(evaluator.get_address()) as sock:
+            _authenticate(sock, AUTHKEY, False)
+            receive_message(sock)
+            receive_message(sock)
+
+    dead = threading.Thread(target=dying_worker, daemon=True)
+    dead.start()
+
+    while evaluator.get_num_workers() == 0:
+        pass
+
+    start_worker(evaluator, str(tmp_path))
+    evaluator.evaluate(genomes, config)
+    evaluator.close()
+
+    assert all(genome.fitness is not None for _, genome in genomes)
+
+
+def test_rejects_unauthenticated_peers(tmp_path) -> None:
+    genomes, config = create_genomes()
+    evaluator = RemoteEvaluator(TRACK_FILEPATH, "127.0.0.1", batch_size=4, episode_time=1, authkey=AUTHKEY)
+
+    # A peer with the wrong key is turned away, and a peer skipping the handshake never gets a message unpickled
+    with socket.create_connection(evaluator.get_address()) as sock:
+        try:
+            _authenticate(sock, b"wrong-key", False)
+        except (OSError, PermissionError):
+            pass
+
+    with socket.create_connection(evaluator.get_address()) as sock:
+        send_message(sock, ("results", []))
+
+    start_worker(evaluator, str(tmp_path))
+    evaluator.evaluate(genomes, config)
+
+    # Connections are accepted in order, so both peers were turned away before the real worker joined
+    assert evaluator.get_num_workers() == 1
+    evaluator.close()
+
+    assert all(genome.fitness is not None for _, genome in genomes)
+
+
+def test_fails_batches_that_keep_raising(tmp_path) -> None:
+    genomes, config = create_genomes()
+    evaluator = RemoteEvaluator(
+        TRACK_FILEPATH, "127.0.0.1", batch_size=4, episode_time=1, authkey=AUTHKEY, max_attempts=2
+    )
+    worker = start_worker(evaluator, str(tmp_path))
+
+    # A genome that can't be turned into a network makes its batch raise on every attempt
+    broken = copy.deepcopy(genomes[:4])
+    broken[0][1].connections = None
+
+    try:
+        evaluator.evaluate(broken, config)
+    except RuntimeError as error:
+        assert "failed 2 times" in str(error)
+    else:
+        assert False, "the evaluation should have failed"
+
+    # The worker survives the error and keeps evaluating
+    evaluator.evaluate(genomes, config)
+    evaluator.close()
+    worker.join(5)
+
+    assert all(genome.fitness is not None for _, genome in genomes)
@@ -0,0 +1,91 @@
+from src.reproduction import ParallelReproduction
+from src.fitness_journal import genome_fingerprint
+from src.sweep import write_config
+import neat
+import os
+import pickle
+import random
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), "..")
+CONFIG_FILEPATH = os.path.join(ROOT_DIR, "assets/configs/config-feedforward.txt")
+
+
+def eval_genomes(genomes: list, config: neat.Config) -> None:
+    for _, genome in genomes:
+        genome.fitness = sum(c.weight for c in genome.connections.values()) + len(genome.nodes)
+
+
+def evolve(tmp_path, num_workers: int, batch_size: int) -> tuple[list, int]:
+    config_filepath = str(tmp_path / f"config-{num_workers}-{batch_size}.txt")
+    write_config(CONFIG_FILEPATH, {"pop_size": 40, "node_add_prob": 0.5}, config_filepath)
+
+    neat_types = (neat.DefaultGenome, ParallelReproduction, neat.DefaultSpeciesSet, neat.DefaultStagnation)
+    config = neat.Config(*neat_types, config_filepath)
+    random.seed(0)
+    population = neat.Population(config)
+    population.reproduction.set_num_workers(num_workers)
+    population.reproduction.set_batch_size(batch_size)
+
+    try:
+        population.run(eval_genomes, 6)
+    finally:
+        population.reproduction.close()
+
+    genomes = sorted((key, genome_fingerprint(genome)) for key, genome in population.population.items())
+    return genomes, next(config.genome_config.node_indexer)
+
+
+def test_offspring_do_not_depend_on_workers(tmp_path) -> None:
+    genomes, next_node_key = evolve(tmp_path, 1, 64)
+
+    assert evolve(tmp_path, 2, 7) == (genomes, next_node_key)
+    assert evolve(tmp_path, 3, 1) == (genomes, next_node_key)
+
+
+def test_new_nodes_are_unique(tmp_path) -> None:
+    config_filepath = str(tmp_path / "config.txt")
+    params = {"pop_size": 40, "node_add_prob": 1, "node_delete_prob": 0}
+    write_config(CONFIG_FILEPATH, params, config_filepath)
+
+    neat_types = (neat.DefaultGenome, ParallelReproduction, neat.DefaultSpeciesSet, neat.DefaultStagnation)
+    config = neat.Config(*neat_types, config_filepath)
+    random.seed(0)
+    population = neat.Population(config)
+    population.reproduction.set_num_workers(1)
+    population.run(eval_genomes, 1)
+
+    # Every child added a node with a key of its own, numbered in offspring order without gaps
+    num_outputs = config.genome_config.num_outputs
+    children = [genome for genome in population.population.values() if genome.fitness is None]
+    new_nodes = [key for child in children for key in child.nodes if key >= num_outputs]
+
+    assert new_nodes == list(range(num_outputs, num_outputs + len(children)))
+    assert next(config.genome_config.node_indexer) == num_outputs + len(children)
+
+    # The connections of the renumbered nodes follow them
+    for child in children:
+        assert all(key in child.nodes or key < 0 for connection in child.connections for key in connection)
+        assert all(connection.key == key for key, connection in child.connections.items())
+
+    # The worker processes are not pickled along with the reproduction
+    unpickled = pickle.loads(pickle.dumps(population.reproduction))
+    assert type(unpickled) is ParallelReproduction and unpickled._executor is None
+
+
+def test_close_stops_workers(tmp_path) -> None:
+    config_filepath = str(tmp_path / "config.txt")
+    write_config(CONFIG_FILEPATH, {"pop_size": 20}, config_filepath)
+
+    neat_types = (neat.DefaultGenome, ParallelReproduction, neat.DefaultSpeciesSet, neat.DefaultStagnation)
+    population = neat.Population(neat.Config(*neat_types, config_filepath))
+    population.reproduction.set_num_workers(2)
+    population.run(eval_genomes, 2)
+    processes = list(population.reproduction._executor._processes.values())
+
+    # The workers stop while the population is still alive, and start again if it keeps training
+    population.reproduction.close()
+
+    assert processes and not any(process.is_alive() for process in processes)
+
+    population.run(eval_genomes, 1)
+    population.reproduction.close()
@@ -0,0 +1,112 @@
+from src.sensors import PatchSensor, RaySensor, SensorTable, SparseRaySensor
+from src.tiled_mask import TiledMask
+from src.track import Track
+from pyray import *
+import numpy as np
+
+
+def create_track() -> Track:
+    # A 40x20 meter track with a valid rectangle in the middle of a 80x40 pixel map
+    image = gen_image_color(80, 40, BLANK)
+    image_draw_rectangle(image, 10, 5, 60, 30, WHITE)
+
+    track = Track()
+    track.set_size(Vector2(40, 20))
+    track.set_map(image)
+
+    return track
+
+
+def test_cast_rays_matches_ray_collision() -> None:
+    track = create_track()
+    rng = np.random.default_rng(0)
+    xs = rng.uniform(0, 40, 200)
+    ys = rng.uniform(0, 20, 200)
+    angles = rng.uniform(-np.pi, np.pi, 200)
+
+    distances = track.cast_rays(xs, ys, angles)
+
+    for x, y, angle, distance in zip(xs, ys, angles, distances):
+        pos = Vector2(x, y)
+        expected = vector2_length(vector2_subtract(track.ray_collision(pos, angle), pos))
+        assert abs(distance - expected) < 1e-3
+
+
+def test_sensor_table_matches_ray_sensor(tmp_path) -> None:
+    track = create_track()
+    table = SensorTable(track, stride=1, angle_bins=360, cache_dir=str(tmp_path))
+
+    # Sample exactly on the grid, facing along a sampled heading, where no interpolation takes place
+    pos = Vector2(20.25, 10.25)
+    expected = RaySensor().sense(track, pos, 0)
+
+    assert np.allclose(table.sense(track, pos, 0), expected, atol=1e-3)
+
+
+def test_sensor_table_is_cached(tmp_path) -> None:
+    track = create_track()
+    table = SensorTable(track, angle_bins=8, cache_dir=str(tmp_path))
+
+    assert len(list(tmp_path.iterdir())) == 1
+
+    # The same configuration reuses the cached file, a different configuration creates another
+    assert SensorTable(track, angle_bins=8, cache_dir=str(tmp_path)).get_filepath() == table.get_filepath()
+    assert SensorTable(track, angle_bins=16, cache_dir=str(tmp_path)).get_filepath() != table.get_filepath()
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_sensor_table_on_tiled_mask(tmp_path) -> None:
+    track = create_track()
+    tiled_track = Track()
+    tiled_track.set_size(Vector2(40, 20))
+    tiled_track.set_mask(TiledMask.create(str(tmp_path / "map.tiles"), track.get_mask(), tile_size=16))
+
+    # A tiled mask is keyed by its file, and its table holds the same distances as the table of the array mask
+    table = SensorTable(track, angle_bins=8, cache_dir=str(tmp_path / "cache"))
+    tiled_table = SensorTable(tiled_track, angle_bins=8, cache_dir=str(tmp_path / "cache"))
+
+    assert SensorTable(tiled_track, angle_bins=8, cache_dir=str(tmp_path / "cache")).get_filepath() == \
+        tiled_table.get_filepath()
+    assert np.array_equal(np.load(tiled_table.get_filepath()), np.load(table.get_filepath()))
+
+
+def test_patch_sensor() -> None:
+    track = create_track()
+    sensor = PatchSensor(rows=4, cols=3, length=8, width=6, offset=2, supersample=2)
+    assert sensor.get_num_inputs() == 12
+
+    # In the middle of the track the whole patch is on the track, facing the edge the cells ahead leave it
+    assert sensor.sense(track, Vector2(20, 10), 0) == [1.0] * 12
+    patch = np.array(sensor.sense(track, Vector2(32, 10), 0)).reshape(4, 3)
+    assert patch[0].tolist() == [1.0] * 3
+    assert patch[-1].tolist() == [0.0] * 3
+
+    # The patch turns with the heading of the driver
+    patch = np.array(sensor.sense(track, Vector2(20, 13), np.pi / 2)).reshape(4, 3)
+    assert patch[0].tolist() == [1.0] * 3
+    assert patch[-1].tolist() == [0.0] * 3
+
+    # A batch matches sensing every driver alone
+    rng = np.random.default_rng(0)
+    xs, ys, angles = rng.uniform(0, 40, 50), rng.uniform(0, 20, 50), rng.uniform(-np.pi, np.pi, 50)
+    patches = sensor.sense_batch(track, xs, ys, angles)
+    assert patches.shape == (50, 12)
+
+    for x, y, angle, patch in zip(xs, ys, angles, patches):
+        assert sensor.sense(track, Vector2(x, y), angle) == patch.tolist()
+
+
+def test_sparse_ray_sensor() -> None:
+    track = create_track()
+    pos = Vector2(17, 9)
+    expected = RaySensor().sense(track, pos, 0.3)
+
+    # Casting every ray is a plain ray sensor, casting fewer rays keeps the distances of the cast ones
+    assert SparseRaySensor(stride=1).sense(track, pos, 0.3) == expected
+
+    sensor = SparseRaySensor(stride=3)
+    distances = sensor.sense(track, pos, 0.3)
+    assert sensor.get_num_cast_rays() == 5
+    assert len(distances) == len(expected)
+    assert all(distances[i] == expected[i] for i in (0, 3, 6, 9, 11))
+    assert distances[1] == expected[0] + (expected[3] - expected[0]) / 3
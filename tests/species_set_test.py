@@ -0,0 +1,68 @@
+from src.species_set import FastSpeciesSet, _PackedGenomes
+import numpy as np
+import neat
+import random
+import pickle
+import re
+
+
+def run_speciation(species_set_type: type, tmp_path, generations: int = 8) -> list:
+    config_path = tmp_path / f"{species_set_type.__name__}.txt"
+    text = open("assets/configs/config-feedforward.txt").read()
+    config_path.write_text(re.sub(r"pop_size\s*=\s*\d+", "pop_size = 150", text))
+
+    config = neat.Config(
+        neat.DefaultGenome, neat.DefaultReproduction, species_set_type, neat.DefaultStagnation, str(config_path)
+    )
+
+    def eval_genomes(genomes: list, config: neat.Config) -> None:
+        for _, genome in genomes:
+            genome.fitness = sum(c.weight for c in genome.connections.values()) + 0.1 * len(genome.nodes)
+
+    # Record the species membership and representative of every generation
+    history = []
+
+    def record(genomes: list, config: neat.Config) -> None:
+        eval_genomes(genomes, config)
+        history.append({
+            sid: (s.representative.key, sorted(s.members)) for sid, s in population.species.species.items()
+        })
+
+    random.seed(1234)
+    population = neat.Population(config)
+    population.run(record, generations)
+
+    return history
+
+
+def test_matches_default_species_set(tmp_path) -> None:
+    assert run_speciation(FastSpeciesSet, tmp_path) == run_speciation(neat.DefaultSpeciesSet, tmp_path)
+
+
+def test_distances_match_genome_distance(tmp_path) -> None:
+    config = neat.Config(
+        neat.DefaultGenome, neat.DefaultReproduction, FastSpeciesSet, neat.DefaultStagnation,
+        "assets/configs/config-feedforward.txt"
+    )
+    random.seed(0)
+    population = neat.Population(config)
+    genomes = list(population.population.values())
+
+    # Mutate the genomes so they have disjoint genes, in place, so the cached encodings must be dropped
+    for genome in genomes:
+        for _ in range(5):
+            genome.mutate(config.genome_config)
+
+    species_set = population.species
+    species_set._reset_caches()
+    packed = _PackedGenomes(list(range(10)), [species_set._encode(genome) for genome in genomes[:10]])
+
+    for genome0 in genomes[:10]:
+        distances = species_set._distances_from(genome0, packed, np.arange(10))
+
+        for genome1, d in zip(genomes[:10], distances):
+            assert d == genome0.distance(genome1, config.genome_config)
+
+    # The caches are not pickled
+    restored = pickle.loads(pickle.dumps(species_set))
+    assert restored._distance_cache == {}
@@ -0,0 +1,88 @@
+from src.start_state_bank import StartStateBank
+from src.evaluation import run_episode, run_rollouts
+from src.simulation import Simulation
+from src.ai_driver import AiDriver
+from pyray import *
+import neat
+import os
+import random
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), "..")
+TRACK_FILEPATH = os.path.join(ROOT_DIR, "assets/tracks/oval.xml")
+IMAGES_DIR = os.path.join(ROOT_DIR, "assets/images/")
+CONFIG_FILEPATH = os.path.join(ROOT_DIR, "assets/configs/config-feedforward.txt")
+
+
+def create_simulation(cache_dir: str) -> tuple[Simulation, list[tuple[int, neat.DefaultGenome]], neat.Config]:
+    neat_types = (neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet, neat.DefaultStagnation)
+    config = neat.Config(*neat_types, CONFIG_FILEPATH)
+    random.seed(0)
+    population = neat.Population(config)
+
+    simulation = Simulation()
+    simulation.load_compiled(TRACK_FILEPATH, IMAGES_DIR, cache_dir)
+
+    return simulation, list(population.population.items()), config
+
+
+def test_snapshot_and_restore(tmp_path) -> None:
+    simulation, genomes, config = create_simulation(str(tmp_path))
+
+    for _, genome in genomes:
+        simulation.add_driver(AiDriver(simulation.get_track(), genome, config))
+
+    for _ in range(20):
+        simulation.update(1 / 20)
+
+    # Running again from a snapshot reproduces the same states and fitness
+    snapshot = simulation.snapshot()
+
+    for _ in range(40):
+        simulation.update(1 / 20)
+
+    expected = simulation.snapshot()
+    simulation.restore(snapshot)
+    assert simulation.snapshot() == snapshot
+
+    for _ in range(40):
+        simulation.update(1 / 20)
+
+    assert simulation.snapshot() == expected
+    assert expected != snapshot
+
+
+def test_record_and_sample(tmp_path) -> None:
+    simulation, genomes, config = create_simulation(str(tmp_path))
+    bank = StartStateBank(cell_size=20, states_per_cell=3, seed=0)
+    run_episode(simulation, genomes, config, episode_time=10, bank=bank, record_interval=0.5)
+
+    assert bank.get_num_cells() > 1
+    assert len(bank) <= 3 * bank.get_num_cells()
+
+    # Every sampled state is a state of a moving car on the track
+    for x, y, angle, speed, steering_angle in bank.sample(20):
+        assert speed > 0
+        assert not simulation.get_track().is_off_track(Vector2(x, y))
+
+    # The bank survives a round trip through a file
+    bank.save(str(tmp_path / "bank.npz"))
+    loaded = StartStateBank.load(str(tmp_path / "bank.npz"), seed=1)
+    assert len(loaded) == len(bank)
+    assert loaded.get_num_cells() == bank.get_num_cells()
+
+
+def test_rollouts_are_deterministic(tmp_path) -> None:
+    simulation, genomes, config = create_simulation(str(tmp_path))
+    genomes = genomes[:10]
+    bank = StartStateBank(cell_size=20, seed=0)
+    run_episode(simulation, genomes, config, episode_time=10, bank=bank, record_interval=0.5)
+    bank.save(str(tmp_path / "bank.npz"))
+
+    fitnesses = []
+
+    for _ in range(2):
+        run_rollouts(simulation, genomes, config, StartStateBank.load(str(tmp_path / "bank.npz"), seed=2), 3, 1)
+        fitnesses.append([genome.fitness for _, genome in genomes])
+
+    assert fitnesses[0] == fitnesses[1]
+    assert max(fitnesses[0]) > 0
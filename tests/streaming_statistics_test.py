@@ -0,0 +1,122 @@
+from src.streaming_statistics import StreamingStatisticsReporter
+from neat.math_util import mean, stdev
+import neat
+import os
+import random
+
+
+def eval_genomes(genomes: list, config: neat.Config) -> None:
+    for _, genome in genomes:
+        genome.fitness = sum(c.weight for c in genome.connections.values())
+
+
+def test_matches_statistics_reporter(tmp_path) -> None:
+    config = neat.Config(
+        neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet, neat.DefaultStagnation,
+        "assets/configs/config-feedforward.txt"
+    )
+    random.seed(0)
+    population = neat.Population(config)
+    statistics = neat.StatisticsReporter()
+    streaming = StreamingStatisticsReporter(str(tmp_path), window=3, num_best=4)
+    population.add_reporter(statistics)
+    population.add_reporter(streaming)
+
+    # Record every evaluated fitness to check the aggregates over the whole run
+    fitnesses = []
+
+    def evaluate(genomes: list, config: neat.Config) -> None:
+        eval_genomes(genomes, config)
+        fitnesses.extend(genome.fitness for _, genome in genomes)
+
+    population.run(evaluate, 6)
+
+    # Only the most recent generations are kept in memory
+    assert streaming.get_num_generations() == 6
+    for actual, expected in zip(streaming.get_fitness_mean(), statistics.get_fitness_mean()[-3:], strict=True):
+        assert abs(actual - expected) < 1e-9
+
+    assert streaming.get_fitness_median() == statistics.get_fitness_median()[-3:]
+    assert streaming.best_genome().fitness == statistics.best_genome().fitness
+    assert [g.fitness for g in streaming.best_genomes(4)] == [g.fitness for g in statistics.best_genomes(4)]
+    assert abs(streaming.get_overall_fitness_mean() - mean(fitnesses)) < 1e-9
+    assert abs(streaming.get_overall_fitness_stdev() - stdev(fitnesses)) < 1e-9
+
+    # Every generation and champion is on disk
+    assert [entry["generation"] for entry in streaming.iter_generations()] == list(range(6))
+    assert streaming.load_champion(2).fitness == statistics.most_fit_genomes[2].fitness
+
+
+def test_resume(tmp_path) -> None:
+    config = neat.Config(
+        neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet, neat.DefaultStagnation,
+        "assets/configs/config-feedforward.txt"
+    )
+    random.seed(1)
+    population = neat.Population(config)
+    streaming = StreamingStatisticsReporter(str(tmp_path), window=10)
+    population.add_reporter(streaming)
+    population.run(eval_genomes, 4)
+
+    # Simulate a run interrupted while writing a line
+    with open(streaming.get_statistics_filepath(), "a") as file:
+        file.write('{"generation": 4, "num_gen')
+
+    resumed = StreamingStatisticsReporter(str(tmp_path), window=10, resume_generation=4)
+    assert resumed.get_num_generations() == 4
+    assert resumed.get_fitness_mean() == streaming.get_fitness_mean()
+    assert resumed.best_genome().key == streaming.best_genome().key
+    assert resumed.get_overall_fitness_mean() == streaming.get_overall_fitness_mean()
+
+    population.remove_reporter(streaming)
+    population.add_reporter(resumed)
+    population.run(eval_genomes, 1)
+    assert [entry["generation"] for entry in resumed.iter_generations()] == list(range(5))
+
+
+def test_resume_drops_generations_run_again(tmp_path) -> None:
+    config = neat.Config(
+        neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet, neat.DefaultStagnation,
+        "assets/configs/config-feedforward.txt"
+    )
+    random.seed(2)
+    population = neat.Population(config)
+    streaming = StreamingStatisticsReporter(str(tmp_path), window=10)
+    population.add_reporter(streaming)
+    population.run(eval_genomes, 5)
+    expected = list(streaming.iter_generations())[:3]
+
+    # Resuming at generation 3 drops generations 3 and 4 and their champions, which are about to run again
+    champions_size = os.path.getsize(streaming.get_champions_filepath())
+    resumed = StreamingStatisticsReporter(str(tmp_path), window=10, resume_generation=3)
+
+    assert list(resumed.iter_generations()) == expected
+    assert resumed.get_num_generations() == 3
+    assert resumed.get_fitness_mean() == [entry["fitness_mean"] for entry in expected]
+    assert resumed.best_genome().fitness == max(entry["best_fitness"] for entry in expected)
+    assert os.path.getsize(resumed.get_champions_filepath()) < champions_size
+    assert resumed.load_champion(2).key == expected[2]["champion_key"]
+
+
+def test_new_run_starts_over(tmp_path) -> None:
+    config = neat.Config(
+        neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet, neat.DefaultStagnation,
+        "assets/configs/config-feedforward.txt"
+    )
+    random.seed(3)
+    population = neat.Population(config)
+    population.add_reporter(StreamingStatisticsReporter(str(tmp_path)))
+    population.run(eval_genomes, 3)
+
+    # A new population reporting into the same directory never sees the previous run
+    population = neat.Population(config)
+    streaming = StreamingStatisticsReporter(str(tmp_path))
+    assert streaming.get_num_generations() == 0
+    assert list(streaming.iter_generations()) == []
+
+    population.add_reporter(streaming)
+    population.run(eval_genomes, 1)
+    entries = list(streaming.iter_generations())
+    assert [entry["generation"] for entry in entries] == [0]
+    assert streaming.best_genome().fitness == entries[0]["best_fitness"]
+    assert abs(streaming.get_overall_fitness_mean() - entries[0]["fitness_mean"]) < 1e-9
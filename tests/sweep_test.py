@@ -0,0 +1,84 @@
+from src.sweep import _EarlyStop, _SweepReporter, grid_search, random_search, run_sweep, write_config
+from src.reproduction import ParallelReproduction
+from configparser import ConfigParser
+from types import SimpleNamespace
+import csv
+import neat
+import os
+import pytest
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), "..")
+TRACK_FILEPATH = os.path.join(ROOT_DIR, "assets/tracks/oval.xml")
+IMAGES_DIR = os.path.join(ROOT_DIR, "assets/images/")
+CONFIG_FILEPATH = os.path.join(ROOT_DIR, "assets/configs/config-feedforward.txt")
+
+
+def test_search_spaces() -> None:
+    runs = grid_search({"pop_size": [10, 20], "conn_add_prob": [0.1, 0.2, 0.3]})
+    assert len(runs) == 6
+    assert {"pop_size": 20, "conn_add_prob": 0.3} in runs
+
+    space = {"pop_size": {"low": 10, "high": 20}, "conn_add_prob": {"low": 0.1, "high": 0.5}, "track": ["a", "b"]}
+    runs = random_search(space, 8, seed=0)
+    assert runs == random_search(space, 8, seed=0)
+    assert all(isinstance(run["pop_size"], int) and 10 <= run["pop_size"] <= 20 for run in runs)
+    assert all(0.1 <= run["conn_add_prob"] <= 0.5 and run["track"] in ("a", "b") for run in runs)
+
+
+def test_write_config(tmp_path) -> None:
+    output_filepath = str(tmp_path / "config.txt")
+    write_config(CONFIG_FILEPATH, {"pop_size": 7, "DefaultGenome.conn_add_prob": 0.25, "track": "x"}, output_filepath)
+
+    parser = ConfigParser()
+    parser.read(output_filepath)
+    assert parser.get("NEAT", "pop_size") == "7"
+    assert parser.get("DefaultGenome", "conn_add_prob") == "0.25"
+
+    with pytest.raises(ValueError):
+        write_config(CONFIG_FILEPATH, {"no_such_key": 1}, output_filepath)
+
+
+def test_write_reproduction_config(tmp_path) -> None:
+    output_filepath = str(tmp_path / "config.txt")
+    write_config(CONFIG_FILEPATH, {"elitism": 1, "survival_threshold": 0.5}, output_filepath)
+
+    # Both reproduction schemes read the same section
+    for reproduction_type in (neat.DefaultReproduction, ParallelReproduction):
+        neat_types = (neat.DefaultGenome, reproduction_type, neat.DefaultSpeciesSet, neat.DefaultStagnation)
+        config = neat.Config(*neat_types, output_filepath)
+        assert (config.reproduction_config.elitism, config.reproduction_config.survival_threshold) == (1, 0.5)
+
+
+def test_stops_runs_behind_the_median() -> None:
+    progress = {0: [5, 6, 7], 1: [4, 5, 6], 2: [3, 4, 5]}
+    reporter = _SweepReporter(progress, 3, grace_generations=1, min_peers=3)
+
+    # The grace period and generations the other runs have not reached yet never stop a run
+    reporter.post_evaluate(None, {}, None, SimpleNamespace(fitness=0))
+    reporter.post_evaluate(None, {}, None, SimpleNamespace(fitness=5))
+    assert progress[3] == [0, 5]
+
+    with pytest.raises(_EarlyStop):
+        reporter.post_evaluate(None, {}, None, SimpleNamespace(fitness=1))
+
+    assert reporter.get_best_fitness() == 5
+    assert reporter.get_num_generations() == 3
+
+
+def test_run_sweep(tmp_path) -> None:
+    runs = grid_search({"pop_size": [4, 6], "track": [TRACK_FILEPATH]})
+    rows = run_sweep(
+        CONFIG_FILEPATH, runs, str(tmp_path / "sweep"), 2, max_concurrent_runs=2, seed=0, episode_time=1,
+        images_dir=IMAGES_DIR, cache_dir=str(tmp_path / "cache")
+    )
+
+    assert sorted(row["run_id"] for row in rows) == [0, 1]
+    assert all(row["status"] == "completed" and row["generations"] == 2 for row in rows)
+    assert all(os.path.exists(row["config"]) for row in rows)
+
+    with open(tmp_path / "sweep" / "summary.csv") as file:
+        table = list(csv.DictReader(file))
+
+    assert [int(row["run_id"]) for row in table] == [row["run_id"] for row in rows]
+    assert {row["pop_size"] for row in table} == {"4", "6"}
+    assert table[0]["track"] == "oval.xml"
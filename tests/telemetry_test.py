@@ -0,0 +1,85 @@
+from src.telemetry import Telemetry
+from src.simulation import Simulation
+from src.evaluation import run_episode
+import neat
+import http.client
+import json
+import os
+import random
+import socket
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), "..")
+TRACK_FILEPATH = os.path.join(ROOT_DIR, "assets/tracks/oval.xml")
+IMAGES_DIR = os.path.join(ROOT_DIR, "assets/images/")
+CONFIG_FILEPATH = os.path.join(ROOT_DIR, "assets/configs/config-feedforward.txt")
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str) -> None:
+        super().__init__("localhost")
+        self.path = path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.path)
+
+
+def fetch(connection: http.client.HTTPConnection, path: str) -> tuple[int, str]:
+    connection.request("GET", path)
+    response = connection.getresponse()
+    return response.status, response.read().decode()
+
+
+def test_serves_training_metrics(tmp_path) -> None:
+    neat_types = (neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet, neat.DefaultStagnation)
+    config = neat.Config(*neat_types, CONFIG_FILEPATH)
+    random.seed(0)
+    population = neat.Population(config)
+
+    simulation = Simulation()
+    simulation.load_compiled(TRACK_FILEPATH, IMAGES_DIR, str(tmp_path))
+
+    telemetry = Telemetry()
+    telemetry.watch_simulation(simulation)
+    host, port = telemetry.serve(("127.0.0.1", 0))
+    population.add_reporter(telemetry)
+
+    def evaluate(genomes: list, config: neat.Config) -> None:
+        run_episode(simulation, genomes, config, episode_time=1)
+
+    population.run(evaluate, 2)
+
+    # The json endpoint reports the last generation
+    connection = http.client.HTTPConnection(host, port)
+    status, body = fetch(connection, "/metrics.json")
+    metrics = json.loads(body)
+
+    assert status == 200
+    assert metrics["generation"] == 1
+    assert metrics["ticks_total"] == simulation.get_num_ticks() > 0
+    assert metrics["mean_fitness"] <= metrics["best_fitness"]
+    assert set(metrics["phase_seconds"]) == {"evaluation", "reproduction"}
+    assert metrics["live_drivers"] == sum(not driver.is_off_track() for driver in simulation.get_drivers())
+
+    # The Prometheus endpoint reports the same metrics
+    status, body = fetch(connection, "/metrics")
+    assert status == 200
+    assert f"neat_driver_ticks_total {simulation.get_num_ticks()}" in body
+    assert 'neat_driver_phase_seconds{phase="evaluation"}' in body
+    assert "neat_driver_worker_utilization" not in body
+
+    assert fetch(connection, "/missing")[0] == 404
+    connection.close()
+    telemetry.close()
+
+
+def test_serves_over_unix_socket(tmp_path) -> None:
+    telemetry = Telemetry()
+    path = telemetry.serve(str(tmp_path / "telemetry.sock"))
+
+    status, body = fetch(UnixHTTPConnection(path), "/")
+    assert status == 200
+    assert json.loads(body)["generation"] is None
+
+    telemetry.close()
+    assert not os.path.exists(path)
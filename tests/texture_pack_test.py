@@ -0,0 +1,56 @@
+from src.texture_pack import TexturePack
+from pyray import *
+import os
+
+IMAGES_DIR = os.path.join(os.path.dirname(__file__), "../assets/images/")
+
+
+def test_build_atlas() -> None:
+    car = load_image(os.path.join(IMAGES_DIR, "car.png"))
+    box = load_image(os.path.join(IMAGES_DIR, "box.png"))
+    square = gen_image_color(40, 40, RED)
+    sprites = {"car.png": car, "box.png": box, "square.png": square}
+
+    try:
+        atlas, rects = TexturePack._build_atlas(sprites)
+
+        # Every sprite lies inside the atlas and no two sprites overlap (padding included)
+        padding = TexturePack.ATLAS_PADDING
+        assert set(rects) == set(sprites)
+
+        for filename, rect in rects.items():
+            assert rect.x >= padding and rect.y >= padding
+            assert rect.x + rect.width + padding <= atlas.width and rect.y + rect.height + padding <= atlas.height
+
+            for other_filename, other in rects.items():
+                if other_filename != filename:
+                    assert (
+                        rect.x + rect.width + padding <= other.x or other.x + other.width + padding <= rect.x
+                        or rect.y + rect.height + padding <= other.y or other.y + other.height + padding <= rect.y
+                    )
+
+        # Small sprites are copied as is, oversized sprites are scaled down keeping their aspect ratio
+        assert (rects["car.png"].width, rects["car.png"].height) == (car.width, car.height)
+        assert max(rects["box.png"].width, rects["box.png"].height) == TexturePack.SPRITE_MAX_SIZE
+        assert abs(rects["box.png"].width / rects["box.png"].height - box.width / box.height) < 0.01
+
+        for x, y in [(0, 0), (50, 20), (108, 44)]:
+            expected = get_image_color(car, x, y)
+            actual = get_image_color(atlas, int(rects["car.png"].x) + x, int(rects["car.png"].y) + y)
+            assert (actual.r, actual.g, actual.b, actual.a) == (expected.r, expected.g, expected.b, expected.a)
+
+        color = get_image_color(atlas, int(rects["square.png"].x) + 20, int(rects["square.png"].y) + 20)
+        assert (color.r, color.g, color.b, color.a) == tuple(RED)
+
+        # The space between sprites is left transparent
+        assert get_image_color(atlas, 0, 0).a == 0
+
+        unload_image(atlas)
+    finally:
+        for image in sprites.values():
+            unload_image(image)
+
+
+def test_get_sprite_missing() -> None:
+    assert TexturePack.get_sprite("missing.png") is None
+    assert TexturePack.get_texture("missing.png") is None
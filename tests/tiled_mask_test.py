@@ -0,0 +1,59 @@
+from src.tiled_mask import TiledMask
+from src.track import Track
+from pyray import *
+import numpy as np
+
+
+def test_round_trip(tmp_path) -> None:
+    rng = np.random.default_rng(0)
+    mask = rng.random((70, 100)) > 0.5
+    tiled_mask = TiledMask.create(str(tmp_path / "map.tiles"), mask, tile_size=16)
+
+    assert tiled_mask.shape == mask.shape
+
+    # Compare every pixel at once, and a few pixels individually
+    ys, xs = np.indices(mask.shape)
+    assert np.array_equal(tiled_mask[ys, xs], mask)
+
+    for y, x in [(0, 0), (69, 99), (17, 33)]:
+        assert tiled_mask[y, x] == mask[y, x]
+
+
+def test_track_on_tiled_mask(tmp_path) -> None:
+    mask = np.zeros((40, 80), dtype=bool)
+    mask[5:35, 10:70] = True
+
+    track = Track()
+    track.set_size(Vector2(40, 20))
+    track.set_mask(mask)
+
+    tiled_track = Track()
+    tiled_track.set_size(Vector2(40, 20))
+    tiled_track.set_mask(TiledMask.create(str(tmp_path / "map.tiles"), mask, tile_size=32))
+
+    rng = np.random.default_rng(0)
+    xs = rng.uniform(0, 40, 100)
+    ys = rng.uniform(0, 20, 100)
+    angles = rng.uniform(-np.pi, np.pi, 100)
+
+    assert np.array_equal(tiled_track.cast_rays(xs, ys, angles), track.cast_rays(xs, ys, angles))
+    assert np.array_equal(tiled_track.is_off_track_batch(xs, ys), track.is_off_track_batch(xs, ys))
+
+    for x, y, angle in zip(xs[:10], ys[:10], angles[:10]):
+        pos = Vector2(x, y)
+        assert tiled_track.is_off_track(pos) == track.is_off_track(pos)
+        assert vector2_equals(tiled_track.ray_collision(pos, angle), track.ray_collision(pos, angle))
+
+
+def test_distance_field_of_tiled_mask(tmp_path) -> None:
+    rng = np.random.default_rng(0)
+    mask = rng.random((300, 90)) > 0.2
+
+    track = Track()
+    track.set_mask(mask)
+
+    tiled_track = Track()
+    tiled_track.set_mask(TiledMask.create(str(tmp_path / "map.tiles"), mask, tile_size=32))
+
+    # The field is read a strip of rows at a time, across more than one strip
+    assert np.array_equal(tiled_track.get_distance_field(), track.get_distance_field())
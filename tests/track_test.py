@@ -0,0 +1,83 @@
+from src.obstacle_base import ObstacleBase
+from src.track import Track
+from pyray import *
+import numpy as np
+
+
+def create_track() -> Track:
+    # A 200x100 pixel map holding a ring shaped track with a few notches along its edges
+    mask = np.zeros((100, 200), dtype=bool)
+    mask[10:90, 10:190] = True
+    mask[35:65, 40:160] = False
+    mask[10:14, 60:63] = False
+    mask[70:90, 120:121] = False
+
+    track = Track()
+    track.set_size(Vector2(100, 50))
+    track.set_mask(mask)
+
+    return track
+
+
+def test_pyramid() -> None:
+    track = create_track()
+    pyramid = track.get_pyramid()
+
+    assert pyramid[0].shape == (50, 100)
+    assert pyramid[-1].shape == (1, 1)
+    assert not pyramid[0][0, 0]
+    assert pyramid[0][5, 5]
+    assert not pyramid[1][2, 2]
+    assert pyramid[1][3, 3]
+
+
+def test_empty_space_skipping_matches_pixel_stepping() -> None:
+    track = create_track()
+    rng = np.random.default_rng(0)
+    xs = rng.uniform(0, 100, 2000)
+    ys = rng.uniform(0, 50, 2000)
+    angles = rng.uniform(-np.pi, np.pi, 2000)
+    angles[:100] = 0
+    angles[100:200] = np.pi / 2
+    angles[200:300] = np.pi / 4
+
+    track.set_skip_empty_space(False)
+    expected = track.cast_rays(xs, ys, angles)
+    expected_ends = [track.ray_collision(Vector2(x, y), angle) for x, y, angle in zip(xs, ys, angles)]
+
+    track.set_skip_empty_space(True)
+    assert np.allclose(track.cast_rays(xs, ys, angles), expected, rtol=0, atol=1e-9)
+
+    for x, y, angle, expected_end in zip(xs, ys, angles, expected_ends):
+        end = track.ray_collision(Vector2(x, y), angle)
+        assert abs(end.x - expected_end.x) < 1e-4 and abs(end.y - expected_end.y) < 1e-4
+
+
+def test_obstacles_placed_after_the_first_cast() -> None:
+    mask = np.ones((400, 800), dtype=bool)
+    track = Track()
+    track.set_size(Vector2(400, 200))
+    track.set_mask(mask)
+
+    xs = np.full(3, 10.0)
+    ys = np.full(3, 100.0)
+    angles = np.zeros(3)
+    track.cast_rays(xs, ys, angles)
+
+    # An obstacle (a solid rectangle without an image) added and then moved after the pyramid was first built
+    obstacle = ObstacleBase(Vector2(10, 10), "missing_obstacle.png")
+    obstacle.set_position(Vector2(200, 100))
+    track.get_obstacles().append(obstacle)
+
+    for position in (Vector2(200, 100), Vector2(300, 100)):
+        obstacle.set_position(position)
+        track.set_skip_empty_space(False)
+        expected = track.cast_rays(xs, ys, angles)
+        expected_end = track.ray_collision(Vector2(10, 100), 0)
+
+        track.set_skip_empty_space(True)
+        end = track.ray_collision(Vector2(10, 100), 0)
+
+        assert expected[0] < position.x - 10
+        assert np.allclose(track.cast_rays(xs, ys, angles), expected, rtol=0, atol=1e-9)
+        assert abs(end.x - expected_end.x) < 1e-4 and abs(end.y - expected_end.y) < 1e-4
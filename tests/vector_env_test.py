@@ -0,0 +1,75 @@
+from src.vector_env import VectorEnv
+from src.driver_base import DriverBase
+from src.sensors import RaySensor
+from src.simulation import Simulation
+import numpy as np
+import os
+
+TRACK_FILEPATH = os.path.join(os.path.dirname(__file__), "../assets/tracks/oval.xml")
+IMAGES_DIR = os.path.join(os.path.dirname(__file__), "../assets/images/")
+
+
+def test_matches_driver_base(tmp_path) -> None:
+    simulation = Simulation()
+    simulation.load_compiled(TRACK_FILEPATH, IMAGES_DIR, str(tmp_path))
+    track = simulation.get_track()
+
+    env = VectorEnv(track, 3)
+    observations = env.reset()
+
+    drivers = [DriverBase(track) for _ in range(3)]
+
+    for driver in drivers:
+        simulation.add_driver(driver)
+
+    sensor = RaySensor()
+    tick_time = 1 / 20
+
+    # Drive each car with a different fixed pattern of controls
+    for tick in range(60):
+        actions = np.zeros((3, 4))
+        actions[:, 0] = 1
+        actions[1, 2] = tick % 3 == 0
+        actions[2, 3] = tick % 2 == 0
+        observations, rewards, dones = env.step(actions)
+
+        for i, driver in enumerate(drivers):
+            driver.press_gas(tick_time)
+
+            if actions[i, 2] > 0.5:
+                driver.turn_left(tick_time)
+            if actions[i, 3] > 0.5:
+                driver.turn_right(tick_time)
+
+            prev_pos = driver.get_position()
+            driver.update(tick_time)
+
+            if dones[i]:
+                continue
+
+            pos = driver.get_position()
+            assert np.allclose(env.get_positions()[i], (pos.x, pos.y), atol=1e-2)
+            assert np.isclose(rewards[i], np.hypot(pos.x - prev_pos.x, pos.y - prev_pos.y), atol=1e-3)
+            assert np.isclose(observations[i, 0], driver.get_speed())
+            assert np.allclose(observations[i, 2:], sensor.sense(track, pos, driver.get_angle()), atol=0.5)
+
+
+def test_done_cars_are_frozen(tmp_path) -> None:
+    simulation = Simulation()
+    simulation.load_compiled(TRACK_FILEPATH, IMAGES_DIR, str(tmp_path))
+
+    # Without pressing the gas, every car is removed for being stagnant after two seconds
+    env = VectorEnv(simulation.get_track(), 4, tick_time=0.5)
+    env.reset()
+
+    for _ in range(4):
+        observations, rewards, dones = env.step(np.zeros((4, 4)))
+
+    assert dones.all()
+    assert not observations.any()
+    assert not rewards.any()
+
+    observations = env.reset(np.array([0, 2]))
+
+    assert observations[[0, 2]].any(axis=1).all()
+    assert not observations[[1, 3]].any()
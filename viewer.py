@@ -0,0 +1,19 @@
+from src.frame_stream import run_viewer
+import argparse
+
+
+def main() -> None:
+    """
+    Entry point into viewing a training run that publishes its drivers (see `run_with_viewer` in `main.py`)
+    """
+    parser = argparse.ArgumentParser(description="View the drivers published by a NEAT Driver training run")
+    parser.add_argument("name", help="name of the shared memory block printed by the training run")
+    parser.add_argument("--images-dir", default="assets/images/", help="directory holding the track images")
+    parser.add_argument("--cache-dir", default="assets/cache/", help="directory holding the compiled tracks")
+    args = parser.parse_args()
+
+    run_viewer(args.name, args.images_dir, args.cache_dir)
+
+
+if __name__ == "__main__":
+    main()